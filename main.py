@@ -1,15 +1,98 @@
 """Redis Roblox Visualization Tool.
 """
 
+import array
+import asyncio
+import base64
+import bisect
+import cProfile
+import fnmatch
+import gzip
+import heapq
+import io
+import itertools
+import json
+import math
+import mmap
+import pstats
+import statistics
 import redis
-from collections import defaultdict
-from fastapi import FastAPI, HTTPException
+import redis.asyncio as aioredis
+import struct
+import sys
+import threading
+import time
+import traceback
+import zlib
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from datetime import datetime
+from redis.client import NEVER_DECODE
+from redis.cluster import RedisCluster
+from pydantic import BaseModel
+from typing import List, Optional
 
-app = FastAPI(title="Redis Roblox Visualization API")
+# Optional speedups - faster JSON serialization and zstd response compression
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Open the async Redis pool and run the background keyspace scanner
+    (and notifier) for the lifetime of the app."""
+    global ar
+    pool = None
+    if REDIS_CLUSTER:
+        # The cluster client keeps one pool per node and routes each command by slot
+        ar = aioredis.RedisCluster(max_connections=ASYNC_POOL_MAX_CONNECTIONS, **REDIS_CONNECTION)
+    else:
+        pool = aioredis.BlockingConnectionPool(
+            max_connections=ASYNC_POOL_MAX_CONNECTIONS,
+            timeout=ASYNC_POOL_TIMEOUT,
+            **REDIS_CONNECTION
+        )
+        ar = aioredis.Redis(connection_pool=pool)
+    if RDB_PATH:
+        # Offline: load the dump in the background; the scanner only expires keys
+        scanner.static = True
+        threading.Thread(target=load_rdb_in_background, name="rdb-loader", daemon=True).start()
+    elif NOTIFY_ENABLED:
+        scanner.sweep_interval = NOTIFY_RECONCILE_INTERVAL
+        notifier.start()
+    history.start()
+    scanner.start()
+    broadcaster.start()
+    if TOP_ENABLED and not RDB_PATH:
+        analyzer.start()
+    yield
+    analyzer.stop()
+    broadcaster.stop()
+    history.stop()
+    notifier.stop()
+    scanner.stop()
+    shutdown_metadata_executor()
+    await ar.aclose()
+    if pool is not None:
+        await pool.disconnect()
+    ar = None
+
+
+app = FastAPI(title="Redis Roblox Visualization API", lifespan=lifespan)
 
 # Redis connection - UPDATE THESE VALUES FOR YOUR REDIS INSTANCE
-r = redis.Redis(
+REDIS_CONNECTION = dict(
     host='your-redis-host.com',
     port=6379,
     decode_responses=True,
@@ -17,132 +100,4410 @@ r = redis.Redis(
     password="your-password",
 )
 
+# Redis Cluster - set REDIS_CLUSTER to True and point REDIS_CONNECTION at any
+# cluster node. The primaries are discovered from the cluster and every shard
+# is scanned in parallel, with per-key commands sent to the node that owns the key.
+REDIS_CLUSTER = False
+CLUSTER_SCAN_WORKERS = 8    # Shards scanned at the same time
+
+# Sync client, used by the background scanner threads
+if REDIS_CLUSTER:
+    r = RedisCluster(**REDIS_CONNECTION)
+else:
+    r = redis.Redis(**REDIS_CONNECTION)
+
+# Async client for request handlers, backed by a bounded connection pool that
+# is created in the app lifespan. Requests wait up to ASYNC_POOL_TIMEOUT
+# seconds for a free connection once all of them are in use.
+ASYNC_POOL_MAX_CONNECTIONS = 50
+ASYNC_POOL_TIMEOUT = 5
+ar = None
+
+# Keyspace scanning - the keyspace is walked incrementally with SCAN in a
+# background thread, so HTTP requests never trigger a full keyspace sweep
+SCAN_MATCH = '*'            # Pattern passed to SCAN MATCH
+SCAN_COUNT = 1000           # COUNT hint passed to each SCAN call
+SCAN_BATCHES_PER_STEP = 10  # SCAN calls made per background step
+SCAN_STEP_INTERVAL = 0.1    # Seconds to pause between background steps
+SCAN_SWEEP_INTERVAL = 1.0   # Seconds to pause after a sweep completes
+SCAN_TYPE = None            # Only scan keys of this type (SCAN TYPE, Redis 6+)
+
+# Metadata pipelines - per-key commands are sent in pipelines of at most
+# METADATA_CHUNK_SIZE keys, so Redis never has to buffer one huge request and
+# reply. With METADATA_CONCURRENCY > 1 the chunks of a batch run at the same
+# time on separate pooled connections.
+METADATA_CHUNK_SIZE = 1000
+METADATA_CONCURRENCY = 1
+
+# Key expiry - each key's absolute expiry deadline is kept in the index (read
+# with PEXPIRETIME on Redis 7+, otherwise TTL plus the fetch time), so TTLs are
+# computed locally and keys are dropped from the snapshot as they expire
+# without asking Redis. Deadlines are also kept in a heap for /redis-keyspace/expiring.
+USE_PEXPIRETIME = True       # Use PEXPIRETIME when the server supports it
+# Each drop publishes one snapshot version, so the interval also bounds how
+# often expiry alone wakes push clients and uses up the delta history
+EXPIRY_CHECK_INTERVAL = 5.0  # Seconds between dropping expired keys
+EXPIRING_MAX_LIMIT = 1000    # Most keys /redis-keyspace/expiring returns
+
+# Key sizes - MEMORY USAGE is the most expensive per-key command, so sizes are
+# cached per key and only re-measured when the key's type or O(1) length
+# (STRLEN/LLEN/SCARD/ZCARD/HLEN) changes, or the cached size gets too old
+MEMORY_USAGE_SAMPLES = 5     # SAMPLES passed to MEMORY USAGE (0 = every element)
+SIZE_CACHE_MAX_AGE = 300.0   # Seconds before a cached size is re-measured anyway
+
+# Statistical size estimation - measure only a stable random sample of keys and
+# estimate each keyspace's total_size from it, with a 95% error bound
+SIZE_ESTIMATE = False
+SIZE_SAMPLE_RATE = 0.05      # Fraction of keys whose size is measured
+
+# Aggregation mode - /redis-keyspace?mode=aggregate returns per-keyspace
+# histograms instead of one record per key. Size bins are upper bounds in bytes;
+# larger keys fall in the last, open-ended bin.
+SIZE_HISTOGRAM_BINS = [64, 256, 1024, 4096, 16384, 65536, 262144, 1048576]
+AGGREGATE_MAX_TOP = 100      # Largest top-N a client may ask for
+
+# Keyspace tree - key names are indexed as a prefix tree split on
+# TREE_DELIMITER so /redis-keyspace/tree can browse large keyspaces level by
+# level. Segments past TREE_MAX_DEPTH count towards the deepest indexed prefix.
+TREE_DELIMITER = ':'
+TREE_MAX_DEPTH = 8
+TREE_MAX_CHILDREN = 1000     # Most children returned per node (largest first)
+TREE_MAX_RESPONSE_DEPTH = 3  # Most levels a client may ask for at once
+
+# Response cache - serialized /redis-keyspace responses are shared by every
+# client for RESPONSE_CACHE_TTL seconds. Concurrent misses are coalesced into a
+# single build, and clients sending If-None-Match get 304 while the snapshot
+# version is unchanged.
+RESPONSE_CACHE_TTL = 1.0
+RESPONSE_CACHE_MAX_ENTRIES = 256  # Least recently used responses are dropped beyond this
+
+# Wire formats - /redis-keyspace can also be sent in a compact columnar binary
+# format (?format=columnar or Accept: application/x-redis-keyspace-columnar)
+# and compressed with gzip or zstd when the client's Accept-Encoding allows it
+COLUMNAR_MEDIA_TYPE = "application/x-redis-keyspace-columnar"
+COMPRESS_MIN_BYTES = 1024    # Smaller responses are sent uncompressed
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+# Streaming - /redis-keyspace?format=ndjson streams one JSON line per key in
+# chunks of STREAM_BATCH_SIZE records instead of building the whole document,
+# so memory stays bounded by the batch size however large the keyspace is
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 1000
+
+# Key detail paging - values are returned one page at a time (LRANGE windows,
+# SSCAN/HSCAN/ZSCAN cursors, GETRANGE byte ranges) so a single click on a huge
+# key cannot stall Redis or produce a response the client cannot display
+KEY_PAGE_SIZE = 100                # Default elements per page
+KEY_PAGE_MAX_SIZE = 1000           # Largest page a client may ask for
+KEY_VALUE_MAX_BYTES = 64 * 1024    # Cap on the value bytes of one page, whatever the type
+KEY_ELEMENT_MAX_BYTES = 1024       # Longer collection elements are truncated
+
+# Keyspace queries - filters, sorting and cursor pagination on /redis-keyspace.
+# Snapshot queries filter the published index; live queries pass the pattern,
+# prefix, keyspace and type filters to SCAN MATCH/TYPE so Redis never returns
+# the excluded keys
+QUERY_PAGE_SIZE = 1000             # Default keys per page of a query
+QUERY_MAX_PAGE_SIZE = 10000        # Largest page a client may ask for
+QUERY_SORTS = ("name", "ttl", "size")
+
+# Push updates - /redis-keyspace/events (SSE), /redis-keyspace/ws (WebSocket)
+# and /redis-keyspace/delta?wait= (long poll) answer as soon as a new snapshot
+# version is published. Subscribers have no queue: once woken they are sent the
+# delta since the version they last received, so bursts and slow consumers are
+# coalesced into one update.
+PUSH_MAX_SUBSCRIBERS = 100         # Open streams plus waiting long polls
+PUSH_COALESCE_INTERVAL = 0.25      # Seconds to let a burst of changes settle
+PUSH_HEARTBEAT_INTERVAL = 15.0     # Seconds between SSE keepalives on idle streams
+LONG_POLL_MAX_WAIT = 25.0          # Longest ?wait= accepted on /redis-keyspace/delta
+
+# Counting - /redis-keyspace/counts reads keyspace counts off the key tree and
+# /counts/databases comes from INFO keyspace, both without touching any key.
+# Prefix counts are exact from the index for the scanned database and
+# estimated from RANDOMKEY samples elsewhere
+COUNTS_SAMPLE_SIZE = 1000          # RANDOMKEY samples per estimate
+COUNTS_CONFIDENCE = 0.95           # Confidence level of estimate intervals
+COUNTS_CACHE_TTL = 1.0             # Seconds an estimate is reused
+
+# World layout - /redis-keyspace/layout places keys the way roblox_server.lua
+# does (a grid LAYOUT_KEYS_PER_ROW wide per keyspace, keyspaces side by side)
+# and returns only what falls inside a viewport, merging cells beyond the
+# detail radius into blocks so the response size depends on the viewport
+LAYOUT_KEYS_PER_ROW = 5            # Grid width of a keyspace, in keys
+LAYOUT_KEY_SPACING = 15            # Studs between key cells (KEY_SPACING in Lua)
+LAYOUT_KEYSPACE_SPACING = 20       # Studs between keyspaces (KEYSPACE_SPACING in Lua)
+LAYOUT_DETAIL_RADIUS = 150         # Cells this close to the center are sent key by key
+LAYOUT_LOD_ROWS = 4                # Grid rows merged into one block further away
+LAYOUT_MAX_RADIUS = 5000           # Largest viewport radius (or half-size) accepted
+LAYOUT_MAX_ITEMS = 10000           # Most keys plus blocks in one response
+LAYOUT_MAX_AGE = 30.0              # Seconds before TTL drift triggers a rebuild
+LAYOUT_PATCH_MAX_CHANGES = 10000   # Larger deltas rebuild the layout instead of patching it
+
+# Keyspace history - per-keyspace statistics recorded after every sweep into
+# fixed-size ring buffers, averaged into coarser tiers as they age
+HISTORY_TIERS = [                  # (seconds per point, points kept)
+    (0, 600),                      # Raw: one point per sweep
+    (60, 1440),                    # 1 minute for a day
+    (600, 1008),                   # 10 minutes for a week
+]
+HISTORY_MAX_KEYSPACES = 100        # Keyspaces given a series (largest first)
+HISTORY_MAX_POINTS = 2000          # Most points in one response
+HISTORY_DEFAULT_RANGE = 3600       # Seconds returned when ?from= is omitted
+
+# Big and hot keys - a background job walks the keyspace with its own SCAN at a
+# limited rate and keeps the largest keys (MEMORY USAGE, element count) and,
+# under an LFU maxmemory-policy, the most accessed ones (OBJECT FREQ). Off by
+# default: its MEMORY USAGE calls come on top of those of the snapshot sweeps
+TOP_ENABLED = False
+TOP_K = 100                        # Keys kept per ranking
+TOP_SCAN_COUNT = 500               # COUNT hint passed to each SCAN call
+TOP_KEYS_PER_SECOND = 5000         # Most keys analyzed per second (0 = no limit)
+TOP_PASS_INTERVAL = 60.0           # Seconds to pause after a complete pass
+TOP_RANKINGS = ("memory", "length", "freq")
+
+# Offline mode - with RDB_PATH set the snapshot is loaded once from an RDB dump
+# file instead of scanned from a live server, and Redis is never contacted.
+# Endpoints that read values or query Redis directly answer 503 instead.
+RDB_PATH = None                    # e.g. "/backups/dump.rdb"
+RDB_DB = 0                         # Database of the dump to load
+
+# Batched key detail - POST /redis-keys reads the metadata and the first value
+# page of many keys in two pipelined round trips, for clients prefetching the
+# keys around the player instead of calling /redis-key once per key
+KEY_BATCH_MAX_KEYS = 500           # Most keys one request may ask for
+KEY_BATCH_PAGE_SIZE = 20           # Default elements per value in a batch
+KEY_BATCH_MAX_BYTES = 1024 * 1024  # Value bytes per batch response; later keys come without values
+
+# Commands returning the total element count per type (also used to detect
+# that a key changed without re-measuring it)
+LENGTH_COMMANDS = {
+    'string': 'STRLEN',
+    'list': 'LLEN',
+    'set': 'SCARD',
+    'zset': 'ZCARD',
+    'hash': 'HLEN',
+}
+
+# Delta history - number of sweep-to-sweep deltas kept for /redis-keyspace/delta.
+# Clients holding an older version receive a full snapshot instead.
+DELTA_HISTORY_SIZE = 50
+DELTA_HISTORY_MAX_RECORDS = 100000  # Changed keys kept across all deltas; a larger diff clears the history
+
+# Keyspace notifications - optional live index. When enabled, key changes are
+# applied as Redis reports them and SCAN sweeps only reconcile missed events.
+NOTIFY_ENABLED = False
+NOTIFY_CONFIGURE = True           # CONFIG SET notify-keyspace-events if needed
+NOTIFY_BATCH_INTERVAL = 0.2       # Seconds of events collected per refresh
+NOTIFY_RECONCILE_INTERVAL = 60.0  # Seconds between reconciling SCAN sweeps
+
+# Key events that mean the key is gone; any other event refreshes the key
+REMOVAL_EVENTS = {"del", "expired", "evicted", "rename_from", "move_from"}
+# Key events that leave the value alone, so the cached size stays valid; any
+# other event (hset, setrange, append, ...) has the size measured again
+SIZE_KEEPING_EVENTS = {"expire", "persist"}
+
+# Metrics - GET /metrics serves Prometheus text format histograms of the time
+# spent in each phase (SCAN, pipelines, grouping, serialization) and per key
+# type in /redis-key, plus counters for keys scanned, bytes sent and Redis errors
+METRICS_ENABLED = True
+METRICS_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Profiling - ?profile=1 on /redis-keyspace and /redis-key returns a cProfile
+# summary of that request instead of the response body
+PROFILE_ENABLED = True
+PROFILE_TOP = 30             # Functions listed in a profile, by cumulative time
+
+
+def utc_timestamp(ts=None):
+    """Format a unix timestamp (default: now) the way the API reports times."""
+    if ts is None:
+        moment = datetime.utcnow()
+    else:
+        moment = datetime.utcfromtimestamp(ts)
+    return moment.isoformat() + "Z"
+
+
+def get_keyspace_name(key):
+    """Extract the keyspace (first ':' segment) a key is grouped under."""
+    if ':' in key:
+        return key.split(':', 1)[0]
+    return 'default'
+
+
+def get_ttl_bucket(ttl):
+    """TTL color bucket, matching getTTLColor in roblox_server.lua."""
+    if ttl == -1:
+        return "no_expiry"
+    elif ttl > 86400:  # > 1 day
+        return "long"
+    elif ttl > 3600:   # > 1 hour
+        return "medium"
+    elif ttl > 60:     # > 1 minute
+        return "short"
+    else:
+        return "expiring"
+
+
+# TTL buckets in the order sortKeysByTTL in roblox_server.lua lays them out
+TTL_BUCKETS = ["no_expiry", "long", "medium", "short", "expiring"]
+
+
+def new_keyspace():
+    """Empty keyspace entry as returned by /redis-keyspace."""
+    return {"keys": [], "total_count": 0, "total_size": 0}
+
+
+def get_shard_clients(client):
+    """List (node name, client) for every shard the keyspace is spread over.
+
+    For a cluster these are the primaries, each with a client bound to that node
+    so SCAN and the per-key pipelines only see keys that node owns.
+    """
+    if isinstance(client, RedisCluster):
+        return [(node.name, client.get_redis_connection(node)) for node in client.get_primaries()]
+    kwargs = client.connection_pool.connection_kwargs
+    return [(f"{kwargs.get('host', 'localhost')}:{kwargs.get('port', 6379)}", client)]
+
+
+def current_ttl(entry, now):
+    """TTL in seconds of an index entry at time `now`, from its expiry deadline."""
+    if entry["expires_at"] is None:
+        return -1
+    return max(int(round(entry["expires_at"] - now)), 0)
+
+
+def entry_record(entry, now):
+    """Key record as returned by /redis-keyspace for an index entry."""
+    return {
+        "name": entry["name"],
+        "type": entry["type"],
+        "ttl": current_ttl(entry, now),
+        "size": entry["size"]
+    }
+
+
+def glob_escape(text):
+    """Escape glob special characters so SCAN MATCH treats `text` literally."""
+    return "".join("\\" + char if char in "*?[]\\" else char for char in text)
+
+
+class KeyQuery:
+    """Filters of a /redis-keyspace query, checked against index entries.
+
+    TTL bounds treat keys without expiry as never expiring, and size bounds
+    exclude keys whose size was not sampled.
+    """
+
+    def __init__(self, pattern=None, prefix=None, key_type=None, keyspace=None,
+                 ttl_min=None, ttl_max=None, size_min=None, size_max=None):
+        self.pattern = pattern
+        self.prefix = prefix
+        self.key_type = key_type
+        self.keyspace = keyspace
+        self.ttl_min = ttl_min
+        self.ttl_max = ttl_max
+        self.size_min = size_min
+        self.size_max = size_max
+        self.active = any(value is not None for value in self.describe().values())
+
+    def describe(self):
+        """The filters as given, for response metadata and cache keys."""
+        return {
+            "pattern": self.pattern,
+            "prefix": self.prefix,
+            "type": self.key_type,
+            "keyspace": self.keyspace,
+            "ttl_min": self.ttl_min,
+            "ttl_max": self.ttl_max,
+            "size_min": self.size_min,
+            "size_max": self.size_max,
+        }
+
+    def scan_match(self):
+        """Most selective SCAN MATCH glob for the query, or None to match everything."""
+        if self.pattern:
+            return self.pattern
+        if self.prefix:
+            return glob_escape(self.prefix) + "*"
+        if self.keyspace and self.keyspace != "default":
+            return glob_escape(self.keyspace) + ":*"
+        return None
+
+    def matches(self, entry, now):
+        if not self.active:
+            return True
+        name = entry["name"]
+        if self.prefix and not name.startswith(self.prefix):
+            return False
+        if self.pattern and not fnmatch.fnmatchcase(name, self.pattern):
+            return False
+        if self.keyspace and get_keyspace_name(name) != self.keyspace:
+            return False
+        if self.key_type and entry["type"] != self.key_type:
+            return False
+        if self.ttl_min is not None or self.ttl_max is not None:
+            ttl = current_ttl(entry, now)
+            remaining = math.inf if ttl == -1 else ttl
+            if self.ttl_min is not None and remaining < self.ttl_min:
+                return False
+            if self.ttl_max is not None and remaining > self.ttl_max:
+                return False
+        if self.size_min is not None or self.size_max is not None:
+            size = entry["size"]
+            if size is None:
+                return False
+            if self.size_min is not None and size < self.size_min:
+                return False
+            if self.size_max is not None and size > self.size_max:
+                return False
+        return True
+
+
+def query_sort_position(entry, sort):
+    """Sort position of an index entry; the last position of a page is its cursor."""
+    if sort == "ttl":
+        # By expiry deadline, which unlike the TTL does not move between pages;
+        # keys without expiry come after every deadline
+        return (entry["expires_at"] is None, entry["expires_at"] or 0, entry["name"])
+    if sort == "size":
+        # Unsampled sizes come before every measured size
+        return (entry["size"] is not None, entry["size"] or 0, entry["name"])
+    return (entry["name"],)
+
+
+def encode_query_cursor(position):
+    """Opaque, URL-safe page cursor for a sort or SCAN position."""
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def decode_query_cursor(cursor, sort):
+    """Position of a page cursor from encode_query_cursor, or None for the first page.
+
+    `sort` is the page's sort order, or None for a live [shard, SCAN cursor]
+    position; cursors of another kind of page are rejected.
+    """
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        position = None
+    if not isinstance(position, list):
+        valid = False
+    elif sort is None:
+        valid = len(position) == 2 and all(isinstance(value, int) for value in position)
+    elif sort == "name":
+        valid = len(position) == 1 and isinstance(position[0], str)
+    else:
+        valid = (
+            len(position) == 3 and isinstance(position[0], bool)
+            and isinstance(position[1], (int, float)) and isinstance(position[2], str)
+        )
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(position)
+
+
+class Metric:
+    """A Prometheus metric with at most one label; series are created on first use."""
+
+    kind = None
+
+    def __init__(self, name, description, label=None):
+        self.name = name
+        self.description = description
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def _labels(self, label_value, extra=""):
+        parts = [f'{self.label}="{label_value}"'] if self.label else []
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items(), key=lambda item: str(item[0]))
+            for label_value, value in series:
+                lines.extend(self._render_series(label_value, value))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, label_value=None):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._series[label_value] = self._series.get(label_value, 0) + amount
+
+    def _render_series(self, label_value, value):
+        return [f"{self.name}{self._labels(label_value)} {value}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, label=None, buckets=METRICS_BUCKETS):
+        super().__init__(name, description, label)
+        self.buckets = buckets
+
+    def observe(self, value, label_value=None):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then sum
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, label_value=None):
+        """Observe the duration of the `with` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, label_value)
+
+    def _render_series(self, label_value, series):
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + ["+Inf"], series):
+            cumulative += bucket_count
+            le = 'le="%s"' % bound
+            lines.append(f"{self.name}_bucket{self._labels(label_value, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(label_value)} {series[-1]}")
+        lines.append(f"{self.name}_count{self._labels(label_value)} {cumulative}")
+        return lines
+
+
+METRICS = []
+phase_seconds = Histogram(
+    "redis_keyspace_phase_seconds",
+    "Time spent per phase of building keyspace snapshots and responses.", "phase",
+)
+key_detail_seconds = Histogram(
+    "redis_key_detail_seconds", "Time spent serving /redis-key, by Redis type.", "type",
+)
+key_batch_seconds = Histogram("redis_key_batch_seconds", "Time spent serving POST /redis-keys.")
+keys_scanned_total = Counter("redis_keyspace_keys_scanned_total", "Keys returned by SCAN.")
+response_bytes_total = Counter(
+    "redis_keyspace_response_bytes_total", "Response body bytes sent, by endpoint.", "endpoint",
+)
+push_updates_total = Counter(
+    "redis_keyspace_push_updates_total", "Deltas sent to push subscribers, by channel.", "channel",
+)
+redis_errors_total = Counter("redis_errors_total", "Redis errors, by where they happened.", "source")
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    status = scanner.status()
+    lines.extend([
+        "# HELP redis_keyspace_snapshot_version Version of the published keyspace snapshot.",
+        "# TYPE redis_keyspace_snapshot_version gauge",
+        f"redis_keyspace_snapshot_version {status['version']}",
+        "# HELP redis_keyspace_snapshot_age_seconds Seconds since the last sweep completed.",
+        "# TYPE redis_keyspace_snapshot_age_seconds gauge",
+        f"redis_keyspace_snapshot_age_seconds {status['age_seconds'] if status['age_seconds'] is not None else 'NaN'}",
+        "# HELP redis_keyspace_keys Keys in the published keyspace snapshot.",
+        "# TYPE redis_keyspace_keys gauge",
+        f"redis_keyspace_keys {scanner.key_count()}",
+        "# HELP redis_keyspace_push_subscribers Open push streams and waiting long polls.",
+        "# TYPE redis_keyspace_push_subscribers gauge",
+        f"redis_keyspace_push_subscribers {broadcaster.subscribers}",
+    ])
+    for name in ("measured", "reused"):
+        lines.append(f"# HELP redis_keyspace_sizes_{name}_total Key sizes {name} (size cache).")
+        lines.append(f"# TYPE redis_keyspace_sizes_{name}_total counter")
+        lines.append(f"redis_keyspace_sizes_{name}_total {size_stats[name]}")
+    return "\n".join(lines) + "\n"
+
+
+def profile_report(profiler):
+    """Text summary of a cProfile run, heaviest cumulative time first."""
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return out.getvalue()
+
+
+# Size cache counters, reported in /redis-keyspace metadata
+size_stats = {"measured": 0, "reused": 0}
+
+
+def size_sampled(key):
+    """Whether a key's size is measured; stable per key so cached sizes stay valid."""
+    if not SIZE_ESTIMATE:
+        return True
+    return zlib.crc32(key.encode()) % 10000 < SIZE_SAMPLE_RATE * 10000
+
+
+# Size cache counters are updated from scanner, shard and pipeline threads
+size_stats_lock = threading.Lock()
+
+# Pipelines of one fetch_key_metadata call run here; shared by the scanner,
+# shard and notifier threads, so it is created under the lock
+metadata_executor = None
+metadata_executor_lock = threading.Lock()
+
+
+def get_metadata_executor():
+    global metadata_executor
+    with metadata_executor_lock:
+        if metadata_executor is None:
+            metadata_executor = ThreadPoolExecutor(
+                max_workers=METADATA_CONCURRENCY, thread_name_prefix="keyspace-metadata"
+            )
+        return metadata_executor
+
+
+def shutdown_metadata_executor():
+    """Stop the metadata pool's threads; a later fetch starts a new pool."""
+    global metadata_executor
+    with metadata_executor_lock:
+        executor, metadata_executor = metadata_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+# id(client) -> whether its server supports PEXPIRETIME
+pexpiretime_support = {}
+
+
+def has_pexpiretime(client):
+    """Whether the server behind `client` has PEXPIRETIME (Redis 7.0+); checked once per client."""
+    supported = pexpiretime_support.get(id(client))
+    if supported is None:
+        supported = False
+        if USE_PEXPIRETIME:
+            try:
+                version = str(client.info("server").get("redis_version", "0"))
+            except redis.ResponseError as e:
+                # INFO is often disabled on managed Redis; TTL works everywhere
+                print(f"Warning: cannot read the Redis version ({e}); using TTL instead of PEXPIRETIME")
+                version = "0"
+            supported = int(version.split(".")[0]) >= 7
+        pexpiretime_support[id(client)] = supported
+    return supported
+
+
+def fetch_key_metadata(keys, client=None, cached=None, known_type=None):
+    """Fetch ttl, type and memory usage for a batch of keys.
+
+    Returns index entries: key records plus the absolute `expires_at` deadline
+    (None for keys without expiry), the O(1) `length` and when the size was
+    measured. Sizes from `cached` (name -> entry) are reused while the key's type
+    and length are unchanged, so MEMORY USAGE only runs for new or changed keys.
+    `known_type` is the type of every key when SCAN already filtered by type.
+    Keys that disappeared between SCAN and the pipeline are skipped.
+
+    Keys are sent in pipelines of METADATA_CHUNK_SIZE, up to METADATA_CONCURRENCY
+    of them at a time.
+    """
+    client = client or r
+    if not keys:
+        return []
+    cached = cached or {}
+
+    chunks = [keys[i:i + METADATA_CHUNK_SIZE] for i in range(0, len(keys), METADATA_CHUNK_SIZE)]
+    if METADATA_CONCURRENCY > 1 and len(chunks) > 1:
+        results = list(get_metadata_executor().map(
+            lambda chunk: fetch_metadata_chunk(chunk, client, cached, known_type), chunks
+        ))
+    else:
+        results = [fetch_metadata_chunk(chunk, client, cached, known_type) for chunk in chunks]
+
+    records = []
+    measured = reused = 0
+    for chunk_records, chunk_measured, chunk_reused in results:
+        records.extend(chunk_records)
+        measured += chunk_measured
+        reused += chunk_reused
+    with size_stats_lock:
+        size_stats["measured"] += measured
+        size_stats["reused"] += reused
+    return records
+
+
+def fetch_metadata_chunk(keys, client, cached, known_type):
+    """One chunk of `fetch_key_metadata`; returns (records, measured, reused).
+
+    TYPE is only sent for keys whose type is not already known. A cached type is
+    confirmed by its length command, which fails with WRONGTYPE otherwise, and an
+    expiry of -2 means the key is gone.
+    """
+    # First pipeline: expiry of every key, the length of cached keys (confirming
+    # their type) and the type of all other keys unless SCAN TYPE answered it
+    exact_expiry = has_pexpiretime(client)
+    fetched_at = time.time()
+    pipe = client.pipeline(transaction=False)
+    checks = []  # (cached entry or None, whether its size may be reused)
+    for key in keys:
+        if exact_expiry:
+            pipe.execute_command('PEXPIRETIME', key)
+        else:
+            pipe.ttl(key)
+        entry = cached.get(key)
+        if entry is not None and entry["type"] in LENGTH_COMMANDS:
+            pipe.execute_command(LENGTH_COMMANDS[entry["type"]], key)
+            checks.append((entry, fetched_at - entry["size_at"] < SIZE_CACHE_MAX_AGE))
+        else:
+            if known_type is None:
+                pipe.type(key)
+            checks.append((None, False))
+    with phase_seconds.time("pipeline"):
+        results = pipe.execute(raise_on_error=False)
+
+    records = []
+    unmeasured = []
+    retype = []
+    reused = 0
+    i = 0
+    for key, (entry, reusable) in zip(keys, checks):
+        expiry = results[i]
+        i += 1
+        length = None
+        if entry is not None:
+            length = results[i]
+            i += 1
+            key_type = entry["type"]
+        elif known_type is None:
+            key_type = results[i]
+            i += 1
+        else:
+            key_type = known_type
+        if expiry == -2 or isinstance(expiry, Exception) or key_type == 'none' or isinstance(key_type, Exception):
+            continue
+        if isinstance(length, Exception):
+            # WRONGTYPE: the key was replaced by one of another type
+            retype.append(key)
+            continue
+
+        if expiry < 0:
+            ttl, expires_at = -1, None
+        elif exact_expiry:
+            expires_at = expiry / 1000
+            ttl = max(int(round(expires_at - fetched_at)), 0)
+        else:
+            ttl, expires_at = expiry, fetched_at + expiry
+
+        record = {
+            "name": key,
+            "type": key_type,
+            "ttl": ttl,
+            "size": None,
+            "expires_at": expires_at,
+            "length": None,
+            "size_at": fetched_at
+        }
+        if reusable and length == entry["length"]:
+            record["size"] = entry["size"]
+            record["length"] = entry["length"]
+            record["size_at"] = entry["size_at"]
+            reused += 1
+        else:
+            unmeasured.append(record)
+        records.append(record)
+
+    # Second pipeline: measure new or changed keys
+    measured = 0
+    if unmeasured:
+        pipe = client.pipeline(transaction=False)
+        for record in unmeasured:
+            if size_sampled(record["name"]):
+                pipe.memory_usage(record["name"], samples=MEMORY_USAGE_SAMPLES)
+            if record["type"] in LENGTH_COMMANDS:
+                pipe.execute_command(LENGTH_COMMANDS[record["type"]], record["name"])
+        with phase_seconds.time("pipeline"):
+            results = pipe.execute(raise_on_error=False)
+
+        i = 0
+        for record in unmeasured:
+            if size_sampled(record["name"]):
+                memory = results[i]
+                i += 1
+                record["size"] = memory if isinstance(memory, int) else 0  # Handle None memory usage
+                measured += 1
+            if record["type"] in LENGTH_COMMANDS:
+                length = results[i]
+                i += 1
+                record["length"] = length if isinstance(length, int) else None
+
+    if retype:
+        retyped, retyped_measured, _ = fetch_metadata_chunk(retype, client, {}, None)
+        records.extend(retyped)
+        measured += retyped_measured
+    return records, measured, reused
+
+
+def estimate_total_size(sizes, population):
+    """Estimate a keyspace's total size from a simple random sample of key sizes.
+
+    Returns (estimate, error) where error is the 95% confidence half-width, or
+    None when the sample is too small to bound it.
+    """
+    return estimate_from_moments(len(sizes), sum(sizes), sum(size * size for size in sizes), population)
+
+
+def estimate_from_moments(n, total, total_sq, population):
+    """`estimate_total_size` from the sample's count, sum and sum of squares,
+    so a streaming consumer can estimate without keeping every size."""
+    if n == 0:
+        return 0, None
+    if n >= population:
+        return total, 0
+    mean = total / n
+    if n == 1:
+        return mean * population, None
+    variance = max(total_sq - n * mean * mean, 0) / (n - 1)
+    # Finite population correction: the sample is drawn without replacement
+    fpc = math.sqrt((population - n) / (population - 1))
+    return mean * population, 1.96 * population * math.sqrt(variance / n) * fpc
+
+
+def group_by_keyspace(records):
+    """Group key records into the /redis-keyspace `keyspaces` mapping.
+
+    With SIZE_ESTIMATE, total_size is estimated from the sampled keys and
+    unsampled keys are given the keyspace's mean sampled size.
+    """
+    keyspaces = defaultdict(new_keyspace)
+    for record in records:
+        keyspace = keyspaces[get_keyspace_name(record["name"])]
+        keyspace["keys"].append(record)
+        keyspace["total_count"] += 1
+        if record["size"] is not None:
+            keyspace["total_size"] += record["size"]
+
+    if SIZE_ESTIMATE:
+        for keyspace in keyspaces.values():
+            sizes = [record["size"] for record in keyspace["keys"] if record["size"] is not None]
+            total, error = estimate_total_size(sizes, keyspace["total_count"])
+            mean = int(round(total / keyspace["total_count"]))
+            for record in keyspace["keys"]:
+                if record["size"] is None:
+                    record["size"] = mean
+            keyspace["total_size"] = int(round(total))
+            keyspace["total_size_error"] = int(round(error)) if error is not None else None
+            keyspace["size_samples"] = len(sizes)
+    return dict(keyspaces)
+
+
+def key_changed(old, new):
+    """Whether a key changed in a way the visualization can show.
+
+    TTL buckets are compared on the TTLs as fetched, so a key that drifted into
+    a shorter bucket is reported once it is fetched again.
+    """
+    return (
+        old["type"] != new["type"]
+        or old["size"] != new["size"]
+        or get_ttl_bucket(old["ttl"]) != get_ttl_bucket(new["ttl"])
+    )
+
+
+def diff_snapshots(old_index, new_index, now):
+    """Compute added, removed and changed keys between two name -> entry indexes."""
+    added = [
+        entry_record(entry, now) for name, entry in new_index.items()
+        if name not in old_index
+    ]
+    removed = [name for name in old_index if name not in new_index]
+    changed = [
+        entry_record(entry, now) for name, entry in new_index.items()
+        if name in old_index and key_changed(old_index[name], entry)
+    ]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+class KeyTreeNode:
+    """One prefix in the key tree: keys and bytes at or below it."""
+
+    __slots__ = ("count", "size", "keys", "children")
+
+    def __init__(self):
+        self.count = 0      # Keys under this prefix
+        self.size = 0       # Bytes under this prefix
+        self.keys = 0       # Keys whose name ends directly below this prefix
+        self.children = {}  # Next segment -> KeyTreeNode
+
+
+class KeyTree:
+    """Prefix tree of key names with per-node key counts and sizes.
+
+    Only prefixes get nodes; the last segment of a key name is counted in its
+    parent's `keys`, so memory grows with the number of distinct prefixes
+    rather than the number of keys.
+    """
+
+    def __init__(self, delimiter=TREE_DELIMITER, max_depth=TREE_MAX_DEPTH):
+        self.delimiter = delimiter
+        self.max_depth = max_depth
+        self.root = KeyTreeNode()
+
+    def add(self, name, size):
+        self._update(name, size or 0, 1)
+
+    def remove(self, name, size):
+        self._update(name, size or 0, -1)
+
+    def _update(self, name, size, sign):
+        prefixes = name.split(self.delimiter)[:-1][:self.max_depth]
+        node = self.root
+        node.count += sign
+        node.size += sign * size
+        for part in prefixes:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = KeyTreeNode()
+            child.count += sign
+            child.size += sign * size
+            if child.count <= 0:
+                # Nothing left below this prefix
+                del node.children[part]
+                return
+            node = child
+        node.keys += sign
+
+    def find(self, prefix):
+        """Node for a prefix such as "app:users" (a trailing delimiter is ignored)."""
+        node = self.root
+        prefix = prefix.rstrip(self.delimiter) if prefix else ""
+        if not prefix:
+            return node
+        for part in prefix.split(self.delimiter):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def describe(self, node, prefix, depth, limit):
+        """Children of `node` down to `depth` levels, largest `limit` per level first."""
+        children = heapq.nsmallest(
+            limit, node.children.items(), key=lambda item: (-item[1].count, item[0])
+        )
+        described = []
+        for part, child in children:
+            child_prefix = f"{prefix}{self.delimiter}{part}" if prefix else part
+            entry = {
+                "name": part,
+                "prefix": child_prefix,
+                "count": child.count,
+                "size": child.size,
+                "keys": child.keys,
+                "has_children": bool(child.children),
+            }
+            if depth > 1 and child.children:
+                entry.update(self.describe(child, child_prefix, depth - 1, limit))
+            described.append(entry)
+        return {"children": described, "children_total": len(node.children)}
+
+
+def node_timing_report(timings):
+    """Per-node sweep timings as reported in snapshot metadata, slowest node first."""
+    return sorted(
+        (dict(timing, seconds=round(timing["seconds"], 3)) for timing in timings),
+        key=lambda timing: timing["seconds"], reverse=True,
+    )
+
+
+class KeyspaceScanner:
+    """Incrementally walks the keyspace with SCAN and keeps the last complete snapshot.
+
+    Each call to `step` advances the current sweep by a bounded number of SCAN
+    calls. When the cursor wraps back to 0 the keys collected during the sweep
+    replace the published snapshot, so readers always see a complete view.
+    On a cluster every primary has its own cursor and the shards are stepped in
+    parallel; the sweep completes once all of them have wrapped.
+    Between sweeps, `apply_changes` lets a live source (keyspace notifications)
+    update the published index one key at a time, and `expire_due` drops keys
+    whose expiry deadline has passed.
+    """
+
+    def __init__(self, client, match=SCAN_MATCH, count=SCAN_COUNT, key_type=SCAN_TYPE):
+        self.client = client
+        self.match = match
+        self.count = count
+        self.key_type = key_type
+        self.sweep_interval = SCAN_SWEEP_INTERVAL
+        self.static = False    # Loaded once (from an RDB dump) instead of swept
+        self.source = "scan"
+        self.load_error = None  # Why loading from `source` failed or stopped early
+        self._lock = threading.Lock()
+        # Writers (sweeps, live changes, expiry) also hold this one, so a sweep
+        # can diff against the published index without blocking readers
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+        # Published snapshot; records and keyspaces are built lazily per version
+        self._records = None
+        self._keyspaces = None
+        self._index = {}
+        self._touched = {}  # name -> time of last live change during the sweep in progress
+        self._tree = KeyTree()
+        self._expiry_heap = []  # (expires_at, name); stale when the index deadline differs
+        self._version = 0
+        self._published = 0  # Publishes, including those that changed no key
+        self._history = deque(maxlen=DELTA_HISTORY_SIZE)  # (version, diff) per change
+        self._history_records = 0  # Keys changed across the diffs in `_history`
+        self._listeners = []  # Called with the new version after every change
+        self._sweep_listeners = []  # Called with (time, index) after every sweep
+        self._completed_at = None
+        self._sweep_duration = None
+        self._sweeps_completed = 0
+        self._last_node_timings = None
+
+        # Sweep in progress
+        self._shards = []
+        self._cursors = {}      # node name -> SCAN cursor, removed once the node wraps
+        self._node_timings = {}
+        self._pending = {}
+        self._sweep_started = None
+        self._expected_keys = 0
+        self._executor = None
+
+    def _begin_sweep(self):
+        self._shards = get_shard_clients(self.client)
+        self._cursors = {name: 0 for name, _ in self._shards}
+        self._node_timings = {
+            name: {"node": name, "keys": 0, "scan_calls": 0, "seconds": 0.0, "complete": False}
+            for name, _ in self._shards
+        }
+        self._pending = {}
+        with self._write_lock:
+            self._touched = {}
+            self._sweep_started = time.time()
+        self._expected_keys = sum(shard.dbsize() for _, shard in self._shards)
+
+    def _finish_sweep(self):
+        index = self._pending
+        tree = KeyTree()
+        for entry in index.values():
+            tree.add(entry["name"], entry["size"])
+        for listener in self._sweep_listeners:
+            listener(time.time(), index)
+
+        now = time.time()
+        with self._write_lock:
+            # Live changes made while the sweep ran are newer than what it saw
+            for name, touched_at in self._touched.items():
+                if touched_at < self._sweep_started:
+                    continue
+                if name in index:
+                    tree.remove(name, index.pop(name)["size"])
+                if name in self._index:
+                    index[name] = self._index[name]
+                    tree.add(name, index[name]["size"])
+            expiry_heap = [
+                (entry["expires_at"], name) for name, entry in index.items() if entry["expires_at"] is not None
+            ]
+            heapq.heapify(expiry_heap)
+            # No other writer can change the published index meanwhile
+            diff = diff_snapshots(self._index, index, now)
+
+            with self._lock:
+                self._touched = {}
+                self._tree = tree
+                self._expiry_heap = expiry_heap
+                self._publish(index, diff)
+                self._completed_at = now
+                self._sweep_duration = now - self._sweep_started
+                self._sweeps_completed += 1
+                self._last_node_timings = list(self._node_timings.values())
+                self._sweep_started = None
+        self._pending = {}
+
+    def _scan_shard(self, name, client, batches):
+        """Run up to `batches` SCAN calls on one shard; return (cursor, entries, calls)."""
+        cursor = self._cursors[name]
+        entries = []
+        seen = set()
+        calls = 0
+        while calls < batches:
+            with phase_seconds.time("scan"):
+                cursor, keys = client.scan(cursor=cursor, match=self.match, count=self.count, _type=self.key_type)
+            keys_scanned_total.inc(len(keys))
+            calls += 1
+            # SCAN may return a key more than once; skip keys already fetched
+            new_keys = [key for key in keys if key not in self._pending and key not in seen]
+            seen.update(new_keys)
+            entries.extend(fetch_key_metadata(new_keys, client, cached=self._index, known_type=self.key_type))
+            if cursor == 0:
+                break
+        return cursor, entries, calls
+
+    def _timed_scan_shard(self, name, client, batches):
+        started = time.perf_counter()
+        result = self._scan_shard(name, client, batches)
+        return result + (time.perf_counter() - started,)
+
+    def step(self, batches=SCAN_BATCHES_PER_STEP):
+        """Advance the current sweep by up to `batches` SCAN calls per shard.
+
+        Returns True when this step completed a sweep.
+        """
+        if self._sweep_started is None:
+            self._begin_sweep()
+
+        shards = [(name, client) for name, client in self._shards if name in self._cursors]
+        if len(shards) == 1:
+            results = [self._timed_scan_shard(shards[0][0], shards[0][1], batches)]
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=CLUSTER_SCAN_WORKERS, thread_name_prefix="keyspace-shard"
+                )
+            results = list(self._executor.map(
+                lambda shard: self._timed_scan_shard(shard[0], shard[1], batches), shards
+            ))
+
+        for (name, _), (cursor, entries, calls, elapsed) in zip(shards, results):
+            for record in entries:
+                self._pending[record["name"]] = record
+            timing = self._node_timings[name]
+            timing["keys"] += len(entries)
+            timing["scan_calls"] += calls
+            timing["seconds"] += elapsed
+            if cursor == 0:
+                timing["complete"] = True
+                del self._cursors[name]
+            else:
+                self._cursors[name] = cursor
+
+        if not self._cursors:
+            self._finish_sweep()
+            return True
+        return False
+
+    def sweep(self):
+        """Run steps until a full sweep has completed."""
+        while not self.step():
+            pass
+
+    def load(self, entries, source):
+        """Publish index entries from another source (an RDB dump) as a complete snapshot.
+
+        The scanner becomes static: its thread stops sweeping and only drops
+        keys as they expire.
+        """
+        self.static = True
+        self.source = source
+        self._node_timings = {}
+        self._touched = {}
+        self._pending = pending = {}
+        self._sweep_started = time.time()
+        for entry in entries:
+            pending[entry["name"]] = entry
+        self._finish_sweep()
+
+    def _publish(self, index, diff):
+        # Caller holds the lock
+        self._index = index
+        self._published += 1
+        self._records = None
+        self._keyspaces = None
+        if diff["added"] or diff["removed"] or diff["changed"] or not self._version:
+            self._version += 1
+            self._record_history(diff)
+            for listener in self._listeners:
+                listener(self._version)
+
+    def _record_history(self, diff):
+        """Keep `diff` as the delta to `_version`, within the history bounds.
+
+        The first version's diff holds every key and a client that far behind
+        gets the full snapshot anyway, so neither it nor any diff over
+        DELTA_HISTORY_MAX_RECORDS is kept: the history is cleared instead, as
+        deltas must stay consecutive.
+        """
+        # Caller holds the lock
+        size = self._diff_size(diff)
+        if self._version == 1 or size > DELTA_HISTORY_MAX_RECORDS:
+            self._history.clear()
+            self._history_records = 0
+            return
+        if len(self._history) == self._history.maxlen:
+            self._history_records -= self._diff_size(self._history[0][1])
+        self._history.append((self._version, diff))
+        self._history_records += size
+        while self._history_records > DELTA_HISTORY_MAX_RECORDS:
+            self._history_records -= self._diff_size(self._history.popleft()[1])
+
+    @staticmethod
+    def _diff_size(diff):
+        return len(diff["added"]) + len(diff["removed"]) + len(diff["changed"])
+
+    def add_listener(self, callback):
+        """Call `callback(version)` whenever a new version is published.
+
+        Callbacks run on the scanner or notifier thread with the lock held, so
+        they must only hand the version off, never block.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def add_sweep_listener(self, callback):
+        """Call `callback(timestamp, index)` with the index of every completed sweep.
+
+        Callbacks run on the scanner thread before the index is published, so
+        nothing else modifies it meanwhile; they must not keep a reference.
+        """
+        self._sweep_listeners.append(callback)
+
+    def remove_sweep_listener(self, callback):
+        if callback in self._sweep_listeners:
+            self._sweep_listeners.remove(callback)
+
+    def cached_entries(self, names):
+        """Index entries of `names` (those in the index), for reusing their sizes."""
+        with self._lock:
+            return {name: self._index[name] for name in names if name in self._index}
+
+    def invalidate_sizes(self, names):
+        """Have the next fetch of `names` measure their sizes instead of reusing them."""
+        with self._lock:
+            for name in names:
+                entry = self._index.get(name)
+                if entry is not None:
+                    entry["size_at"] = -math.inf
+
+    def apply_changes(self, entries, removed):
+        """Update the published index with freshly fetched entries and removed key names."""
+        now = time.time()
+        with self._write_lock, self._lock:
+            index = self._index
+            # Only a sweep in progress needs to know which keys it must not overwrite
+            touched = self._touched if self._sweep_started is not None else {}
+            diff = {"added": [], "removed": [], "changed": []}
+            for entry in entries:
+                old = index.get(entry["name"])
+                index[entry["name"]] = entry
+                touched[entry["name"]] = now
+                if old is not None:
+                    self._tree.remove(old["name"], old["size"])
+                self._tree.add(entry["name"], entry["size"])
+                if entry["expires_at"] is not None:
+                    heapq.heappush(self._expiry_heap, (entry["expires_at"], entry["name"]))
+                if old is None:
+                    diff["added"].append(entry_record(entry, now))
+                elif key_changed(old, entry):
+                    diff["changed"].append(entry_record(entry, now))
+            for name in removed:
+                touched[name] = now
+                old = index.pop(name, None)
+                if old is not None:
+                    self._tree.remove(name, old["size"])
+                    diff["removed"].append(name)
+            if diff["added"] or diff["removed"] or diff["changed"]:
+                self._publish(index, diff)
+
+    def expire_due(self, now=None):
+        """Drop keys whose expiry deadline has passed from the published index.
+
+        Redis has expired them logically, so no request to Redis is needed.
+        Returns the number of keys dropped.
+        """
+        now = time.time() if now is None else now
+        with self._write_lock, self._lock:
+            heap = self._expiry_heap
+            expired = []
+            while heap and heap[0][0] <= now:
+                deadline, name = heapq.heappop(heap)
+                entry = self._index.get(name)
+                if entry is not None and entry["expires_at"] == deadline:
+                    expired.append(name)
+            if not expired:
+                return 0
+            touched = self._touched if self._sweep_started is not None else {}
+            for name in expired:
+                self._tree.remove(name, self._index.pop(name)["size"])
+                touched[name] = now
+            self._publish(self._index, {"added": [], "removed": expired, "changed": []})
+            return len(expired)
+
+    def expiring(self, within, limit):
+        """Key records expiring in the next `within` seconds, soonest first.
+
+        Returns (records, truncated). Only the top of the deadline heap is
+        visited, so the cost depends on `limit`, not the number of keys.
+        """
+        now = time.time()
+        horizon = now + within
+        records = []
+        with self._lock:
+            heap = self._expiry_heap
+            # Best-first walk of the heap's implicit tree from the root
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier:
+                (deadline, name), i = heapq.heappop(frontier)
+                if deadline > horizon:
+                    break
+                entry = self._index.get(name)
+                if entry is not None and entry["expires_at"] == deadline and deadline > now:
+                    if len(records) == limit:
+                        return records, True
+                    records.append(entry_record(entry, now))
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+        return records, False
+
+    @property
+    def version(self):
+        """Version of the published snapshot (0 before the first sweep)."""
+        return self._version
+
+    def request_sweep(self):
+        """Skip the pause before the next background step."""
+        self._wake.set()
+
+    def _run(self):
+        next_step = 0.0
+        next_expiry = time.monotonic() + EXPIRY_CHECK_INTERVAL
+        while not self._stop.is_set():
+            if self.static:
+                self.expire_due()
+                self._stop.wait(EXPIRY_CHECK_INTERVAL)
+                continue
+            if self._wake.is_set() or time.monotonic() >= next_step:
+                self._wake.clear()
+                try:
+                    completed = self.step()
+                except redis.RedisError as e:
+                    print(f"Keyspace scan failed: {e}")
+                    redis_errors_total.inc(label_value="scanner")
+                    self._sweep_started = None
+                    completed = True
+                    if isinstance(self.client, RedisCluster):
+                        # A failover or resharding moves slots; rediscover the primaries
+                        try:
+                            self.client.nodes_manager.initialize()
+                        except redis.RedisError:
+                            pass
+                next_step = time.monotonic() + (self.sweep_interval if completed else SCAN_STEP_INTERVAL)
+            # Expired keys are dropped in batches, not after every step
+            if time.monotonic() >= next_expiry:
+                self.expire_due()
+                next_expiry = time.monotonic() + EXPIRY_CHECK_INTERVAL
+            self._wake.wait(max(0.0, min(next_step, next_expiry) - time.monotonic()))
+
+    def start(self):
+        """Start the background scanning thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="keyspace-scanner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background scanning thread."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def status(self):
+        """Metadata describing the published snapshot and the sweep in progress."""
+        now = time.time()
+        with self._lock:
+            completed_at = self._completed_at
+            sweep_duration = self._sweep_duration
+            sweeps_completed = self._sweeps_completed
+            last_nodes = self._last_node_timings
+
+        sweep = None
+        sweep_started = self._sweep_started
+        if sweep_started is not None:
+            scanned = len(self._pending)
+            expected = self._expected_keys
+            sweep = {
+                "started_at": utc_timestamp(sweep_started),
+                "keys_scanned": scanned,
+                "expected_keys": expected,
+                "progress": round(min(scanned / expected, 1.0), 4) if expected else 0.0,
+                "nodes": node_timing_report(list(self._node_timings.values())),
+            }
+
+        return {
+            "version": self._version,
+            "complete": completed_at is not None,
+            "completed_at": utc_timestamp(completed_at) if completed_at else None,
+            "age_seconds": round(now - completed_at, 3) if completed_at else None,
+            "sweep_duration_seconds": round(sweep_duration, 3) if sweep_duration is not None else None,
+            "sweeps_completed": sweeps_completed,
+            "source": self.source,
+            "load_error": self.load_error,
+            "match": self.match,
+            "count": self.count,
+            "type": self.key_type,
+            "nodes": node_timing_report(last_nodes) if last_nodes else None,
+            "current_sweep": sweep,
+        }
+
+    def snapshot(self):
+        """Return the last complete snapshot as (records, keyspaces, version).
+
+        Records and keyspaces are None before the first complete sweep. Records
+        are built outside the lock from a copy of the index references and kept
+        until the next publish; `version` is read together with the index.
+        """
+        with self._lock:
+            version = self._version
+            if self._completed_at is None:
+                return None, None, version
+            if self._records is not None:
+                return self._records, self._keyspaces, version
+            published = self._published
+            entries = list(self._index.values())
+        with phase_seconds.time("group"):
+            now = time.time()
+            records = [entry_record(entry, now) for entry in entries]
+            keyspaces = group_by_keyspace(records)
+        with self._lock:
+            if self._published == published and self._records is None:
+                self._records, self._keyspaces = records, keyspaces
+        return records, keyspaces, version
+
+    def key_count(self):
+        """Number of keys in the published index."""
+        return len(self._index)
+
+    def iter_snapshot(self, batch_size=STREAM_BATCH_SIZE, query=None):
+        """Yield the published snapshot's key records in lists of `batch_size`.
+
+        Only references to the index entries are copied up front; records are
+        built one batch at a time. With a `query`, only matching keys are yielded.
+        """
+        query = query or KeyQuery()
+        with self._lock:
+            if self._completed_at is None:
+                return
+            entries = list(self._index.values())
+        now = time.time()
+        for start in range(0, len(entries), batch_size):
+            yield [
+                entry_record(entry, now) for entry in entries[start:start + batch_size]
+                if query.matches(entry, now)
+            ]
+
+    def query(self, query, sort, descending, after, limit):
+        """One page of the published snapshot's keys matching `query`, in `sort` order.
+
+        Pages are keyset-paginated: `after` is the sort position of the last key
+        of the previous page, so keys added or removed in between never shift
+        the next page. Returns (records, keys matched, position of the page's
+        last key or None on the last page, version of the snapshot queried).
+        """
+        with self._lock:
+            version = self._version
+            if self._completed_at is None:
+                return [], 0, None, version
+            entries = list(self._index.values())
+        now = time.time()
+        matched = 0
+        candidates = []
+        for entry in entries:
+            if not query.matches(entry, now):
+                continue
+            matched += 1
+            position = query_sort_position(entry, sort)
+            if after is None or (position < after if descending else position > after):
+                candidates.append((position, entry))
+        select = heapq.nlargest if descending else heapq.nsmallest
+        page = select(limit + 1, candidates, key=lambda candidate: candidate[0])
+        last = page[limit - 1][0] if len(page) > limit else None
+        return [entry_record(entry, now) for _, entry in page[:limit]], matched, last, version
+
+    def _query_filter(self, query):
+        """SCAN MATCH and TYPE for `query`, and a check of everything SCAN cannot filter.
+
+        The query's own glob and type replace the scanner's in the SCAN call,
+        so the scanner's are checked on the results instead.
+        """
+        match = query.scan_match() or self.match
+        key_type = query.key_type or self.key_type
+
+        def accept(entry, now):
+            if match != self.match and not fnmatch.fnmatchcase(entry["name"], self.match):
+                return False
+            if self.key_type and entry["type"] != self.key_type:
+                return False
+            return query.matches(entry, now)
+
+        return match, key_type, accept
+
+    def iter_scan(self, query=None):
+        """Yield key records straight from a new SCAN of every shard, one SCAN batch at a time.
+
+        Cached sizes are reused as in a sweep. SCAN may return a key more than
+        once. A `query` is pushed down into SCAN MATCH/TYPE where possible.
+        """
+        match, key_type, accept = self._query_filter(query or KeyQuery())
+        for _, client in get_shard_clients(self.client):
+            cursor = None
+            while cursor != 0:
+                with phase_seconds.time("scan"):
+                    cursor, keys = client.scan(
+                        cursor=cursor or 0, match=match, count=self.count, _type=key_type
+                    )
+                keys_scanned_total.inc(len(keys))
+                entries = fetch_key_metadata(keys, client, cached=self._index, known_type=key_type)
+                now = time.time()
+                yield [entry_record(entry, now) for entry in entries if accept(entry, now)]
+
+    def scan_page(self, query, position, limit):
+        """One page of the keys matching `query` from a new SCAN, with MATCH/TYPE pushed down.
+
+        `position` is the [shard, SCAN cursor] returned for the previous page, or
+        None to start. SCAN returns whole batches, so a page can hold somewhat
+        more than `limit` keys, and a key may appear on two pages. Returns
+        (records, next position or None once every shard is done).
+        """
+        match, key_type, accept = self._query_filter(query)
+        shards = get_shard_clients(self.client)
+        shard, cursor = position or (0, 0)
+        records = []
+        while shard < len(shards) and len(records) < limit:
+            _, client = shards[shard]
+            with phase_seconds.time("scan"):
+                cursor, keys = client.scan(cursor=cursor, match=match, count=self.count, _type=key_type)
+            keys_scanned_total.inc(len(keys))
+            entries = fetch_key_metadata(keys, client, cached=self._index, known_type=key_type)
+            now = time.time()
+            records.extend(entry_record(entry, now) for entry in entries if accept(entry, now))
+            if cursor == 0:
+                shard += 1
+        return records, ([shard, cursor] if shard < len(shards) else None)
+
+    def aggregate(self, top=0):
+        """Per-keyspace aggregates of the published index, as (keyspaces, keys, version).
+
+        Aggregated straight from the index entries under the lock, so no copy
+        of the index and no per-key record is made.
+        """
+        with self._lock:
+            if self._completed_at is None:
+                return {}, 0, self._version
+            return aggregate_keyspaces(self._index.values(), top), len(self._index), self._version
+
+    def keyspace_counts(self):
+        """Keys per keyspace read off the key tree, or None before the first sweep."""
+        with self._lock:
+            if self._completed_at is None:
+                return None
+            root = self._tree.root
+            counts = {part: node.count for part, node in root.children.items()}
+            if root.keys:
+                # Names without a delimiter are grouped under "default"
+                counts["default"] = counts.get("default", 0) + root.keys
+            return counts
+
+    def prefix_count(self, prefix):
+        """Exact number of keys named `prefix` + delimiter + ..., or None before the first sweep.
+
+        Prefixes within TREE_MAX_DEPTH are read off the key tree; deeper ones
+        are counted over the index names.
+        """
+        delimiter = self._tree.delimiter
+        prefix = prefix.rstrip(delimiter)
+        with self._lock:
+            if self._completed_at is None:
+                return None
+            if len(prefix.split(delimiter)) <= self._tree.max_depth:
+                node = self._tree.find(prefix)
+                return node.count if node is not None else 0
+            names = list(self._index)
+        start = prefix + delimiter
+        return sum(1 for name in names if name.startswith(start))
+
+    def tree(self, prefix, depth, limit):
+        """Describe the key tree below `prefix`, or return None if there is no such prefix."""
+        with self._lock:
+            node = self._tree.find(prefix)
+            if node is None:
+                return None
+            result = {
+                "prefix": prefix.rstrip(self._tree.delimiter) if prefix else "",
+                "delimiter": self._tree.delimiter,
+                "count": node.count,
+                "size": node.size,
+                "keys": node.keys,
+            }
+            result.update(self._tree.describe(node, result["prefix"], depth, limit))
+            return result
+
+    def delta(self, since):
+        """Merge the recorded deltas after version `since` into one change set.
+
+        Returns (version, changes), where changes is None when `since` is older
+        than the retained history (or from the future) and a full snapshot is needed.
+        """
+        with self._lock:
+            version = self._version
+            history = list(self._history)
+
+        if since == version:
+            return version, {"added": [], "removed": [], "changed": []}
+        if since > version or not history or history[0][0] > since + 1:
+            return version, None
+
+        # name -> (existed at `since`, latest record or None if removed)
+        merged = {}
+        for delta_version, diff in history:
+            if delta_version <= since:
+                continue
+            for record in diff["added"]:
+                existed = merged[record["name"]][0] if record["name"] in merged else False
+                merged[record["name"]] = (existed, record)
+            for record in diff["changed"]:
+                existed = merged[record["name"]][0] if record["name"] in merged else True
+                merged[record["name"]] = (existed, record)
+            for name in diff["removed"]:
+                existed = merged[name][0] if name in merged else True
+                merged[name] = (existed, None)
+
+        changes = {"added": [], "removed": [], "changed": []}
+        for name, (existed, record) in merged.items():
+            if record is None:
+                if existed:
+                    changes["removed"].append(name)
+            elif existed:
+                changes["changed"].append(record)
+            else:
+                changes["added"].append(record)
+        return version, changes
+
+
+class KeyspaceNotifier:
+    """Keeps the scanner's index current from Redis keyspace notifications.
+
+    Subscribes to `__keyevent@<db>__:*`, collects the keys named by events for
+    NOTIFY_BATCH_INTERVAL seconds and refreshes only those keys, so Redis work
+    is proportional to the number of changes rather than the number of keys.
+    Cluster nodes only publish events for their own keys, so one listener
+    thread runs per primary.
+    """
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.client = scanner.client
+        self._stop = threading.Event()
+        self._threads = []
+        self.events_received = 0
+        self.keys_refreshed = 0
+        self.keys_removed = 0
+        self.last_event_at = None
+
+    @staticmethod
+    def db(client):
+        return client.connection_pool.connection_kwargs.get('db', 0)
+
+    def configure(self, client):
+        """Make sure Redis publishes keyevent notifications for all event classes."""
+        try:
+            flags = client.config_get('notify-keyspace-events').get('notify-keyspace-events', '')
+            missing = ''.join(flag for flag in 'EA' if flag not in flags)
+            if missing:
+                client.config_set('notify-keyspace-events', flags + missing)
+        except redis.ResponseError as e:
+            # Managed Redis services often disable CONFIG; notifications must be enabled there
+            print(f"Could not enable keyspace notifications: {e}")
+
+    def apply_events(self, events, client):
+        """Apply a batch of {key name: latest event} from `client`'s node to the scanner index."""
+        if self.scanner.match != '*':
+            events = {
+                name: event for name, event in events.items()
+                if fnmatch.fnmatchcase(name, self.scanner.match)
+            }
+        removed = [name for name, event in events.items() if event in REMOVAL_EVENTS]
+        refresh = [name for name, event in events.items() if event not in REMOVAL_EVENTS]
+
+        # A write can change a value without changing its length, which is all
+        # the size cache checks, so written keys are always measured again
+        self.scanner.invalidate_sizes(name for name in refresh if events[name] not in SIZE_KEEPING_EVENTS)
+        entries = fetch_key_metadata(refresh, client, cached=self.scanner.cached_entries(refresh))
+        if self.scanner.key_type is not None:
+            entries = [entry for entry in entries if entry["type"] == self.scanner.key_type]
+        found = {entry["name"] for entry in entries}
+        removed.extend(name for name in refresh if name not in found)
+
+        self.scanner.apply_changes(entries, removed)
+        self.keys_refreshed += len(entries)
+        self.keys_removed += len(removed)
+
+    def _collect(self, pubsub):
+        events = {}
+        deadline = time.monotonic() + NOTIFY_BATCH_INTERVAL
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = pubsub.get_message(timeout=remaining)
+            if message is None or message["type"] != "pmessage":
+                continue
+            # Channel is "__keyevent@<db>__:<event>", data is the key name
+            name, event = message["data"], message["channel"].rsplit(':', 1)[1]
+            # A later expiry change must not hide an earlier write to the value
+            if event not in SIZE_KEEPING_EVENTS or events.get(name, event) in SIZE_KEEPING_EVENTS:
+                events[name] = event
+            self.events_received += 1
+            self.last_event_at = time.time()
+        return events
+
+    def _run(self, client):
+        while not self._stop.is_set():
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f"__keyevent@{self.db(client)}__:*")
+                # Events may have been missed while (re)subscribing
+                self.scanner.request_sweep()
+                while not self._stop.is_set():
+                    events = self._collect(pubsub)
+                    if events:
+                        self.apply_events(events, client)
+            except redis.RedisError as e:
+                print(f"Keyspace notifications failed: {e}")
+                redis_errors_total.inc(label_value="notifier")
+                self._stop.wait(SCAN_SWEEP_INTERVAL)
+            finally:
+                pubsub.close()
+
+    def start(self):
+        """Start one notification listener thread per shard."""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop.clear()
+        self._threads = []
+        for name, client in get_shard_clients(self.client):
+            if NOTIFY_CONFIGURE:
+                self.configure(client)
+            thread = threading.Thread(
+                target=self._run, args=(client,), name=f"keyspace-notifier-{name}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the notification listener threads."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def status(self):
+        """Metadata describing the live index."""
+        return {
+            "enabled": bool(self._threads),
+            "events_received": self.events_received,
+            "keys_refreshed": self.keys_refreshed,
+            "keys_removed": self.keys_removed,
+            "last_event_at": utc_timestamp(self.last_event_at) if self.last_event_at else None,
+            "reconcile_interval_seconds": self.scanner.sweep_interval,
+        }
+
+
+class KeyAnalyzer:
+    """Background job ranking keys by memory, element count and access frequency.
+
+    It walks every shard with its own SCAN cursor, independent of the scanner.
+    For each batch it pipelines TYPE, MEMORY USAGE and OBJECT FREQ, then the
+    length of every collection. The TOP_K best keys per ranking are kept in
+    min-heaps, so memory stays bounded whatever the keyspace size. Results of
+    the last complete pass are served while the next one runs. The walk is
+    paced to TOP_KEYS_PER_SECOND.
+    """
+
+    def __init__(self, client, k=TOP_K):
+        self.client = client
+        self.k = k
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._results = None   # ranking -> entries of the last complete pass, largest first
+        self._completed_at = None
+        self._pass_duration = None
+        self._passes_completed = 0
+
+        # Pass in progress
+        self._pass_started = None
+        self._shards = []
+        self._shard = 0
+        self._cursor = 0
+        self._heaps = {}       # ranking -> [(value, name, entry)]
+        self._members = {}     # ranking -> names in the heap (SCAN may repeat keys)
+        self._analyzed = 0
+        self.lfu = None        # Whether OBJECT FREQ works; None until the first pass
+        self.policy = None
+
+    def _begin_pass(self):
+        self._shards = [client for _, client in get_shard_clients(self.client)]
+        self._shard = 0
+        self._cursor = 0
+        self._analyzed = 0
+        with self._lock:
+            self._heaps = {ranking: [] for ranking in TOP_RANKINGS}
+            self._members = {ranking: set() for ranking in TOP_RANKINGS}
+        try:
+            self.policy = self._shards[0].config_get("maxmemory-policy").get("maxmemory-policy")
+            self.lfu = "lfu" in (self.policy or "")
+        except redis.ResponseError:
+            # CONFIG is often disabled on managed Redis; probe with OBJECT FREQ instead
+            self.policy = None
+            self.lfu = True
+        self._pass_started = time.time()
+
+    def _finish_pass(self):
+        now = time.time()
+        with self._lock:
+            self._results = {
+                ranking: [entry for _, _, entry in sorted(heap, reverse=True)]
+                for ranking, heap in self._heaps.items()
+            }
+            self._completed_at = now
+            self._pass_duration = now - self._pass_started
+            self._passes_completed += 1
+        self._pass_started = None
+
+    def _push(self, ranking, value, entry):
+        # Caller holds the lock
+        heap = self._heaps[ranking]
+        members = self._members[ranking]
+        if entry["name"] in members:
+            return
+        if len(heap) < self.k:
+            heapq.heappush(heap, (value, entry["name"], entry))
+        elif (value, entry["name"]) > heap[0][:2]:
+            members.discard(heapq.heapreplace(heap, (value, entry["name"], entry))[1])
+        else:
+            return
+        members.add(entry["name"])
+
+    def analyze(self, client, keys):
+        """Measure `keys` on `client` in two pipelines and rank them; returns their entries."""
+        lfu = self.lfu
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.type(key)
+            pipe.memory_usage(key, samples=MEMORY_USAGE_SAMPLES)
+            if lfu:
+                pipe.object("freq", key)
+        results = pipe.execute(raise_on_error=False)
+
+        stride = 3 if lfu else 2
+        entries = []
+        freq_errors = 0
+        for i, key in enumerate(keys):
+            key_type, memory = results[i * stride], results[i * stride + 1]
+            if isinstance(key_type, Exception) or key_type == "none":
+                continue
+            freq = results[i * stride + 2] if lfu else None
+            if isinstance(freq, Exception):
+                freq_errors += 1
+                freq = None
+            entries.append({
+                "name": key,
+                "type": key_type,
+                "keyspace": get_keyspace_name(key),
+                "memory": memory if isinstance(memory, int) else None,
+                "length": None,
+                "freq": freq,
+            })
+        if lfu and entries and freq_errors == len(entries):
+            self.lfu = False  # Not an LFU policy; stop asking
+
+        # Element counts; STRLEN counts bytes, so strings are left out
+        counted = [entry for entry in entries if entry["type"] in LENGTH_COMMANDS and entry["type"] != "string"]
+        if counted:
+            pipe = client.pipeline(transaction=False)
+            for entry in counted:
+                pipe.execute_command(LENGTH_COMMANDS[entry["type"]], entry["name"])
+            for entry, length in zip(counted, pipe.execute(raise_on_error=False)):
+                entry["length"] = length if isinstance(length, int) else None
+
+        with self._lock:
+            for entry in entries:
+                for ranking in TOP_RANKINGS:
+                    if entry[ranking] is not None:
+                        self._push(ranking, entry[ranking], entry)
+        return entries
+
+    def step(self):
+        """Analyze one SCAN batch; returns (keys returned by SCAN, whether the pass completed)."""
+        if self._pass_started is None:
+            self._begin_pass()
+        client = self._shards[self._shard]
+        with phase_seconds.time("analyze"):
+            self._cursor, keys = client.scan(cursor=self._cursor, count=TOP_SCAN_COUNT)
+            if keys:
+                self.analyze(client, keys)
+        self._analyzed += len(keys)
+        if self._cursor == 0:
+            self._shard += 1
+            if self._shard == len(self._shards):
+                self._finish_pass()
+                return len(keys), True
+        return len(keys), False
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                count, completed = self.step()
+            except redis.RedisError as e:
+                print(f"Key analyzer failed: {e}")
+                redis_errors_total.inc(label_value="analyzer")
+                self._pass_started = None
+                self._stop.wait(SCAN_SWEEP_INTERVAL)
+                continue
+            if completed:
+                self._stop.wait(TOP_PASS_INTERVAL)
+            elif TOP_KEYS_PER_SECOND:
+                # Keep the average rate at TOP_KEYS_PER_SECOND
+                self._stop.wait(max(0.0, count / TOP_KEYS_PER_SECOND - (time.monotonic() - started)))
+
+    def start(self):
+        """Start the background analyzer thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="key-analyzer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background analyzer thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def top(self, ranking, limit, key_type=None):
+        """Best `limit` entries of `ranking`, and whether they come from a complete pass.
+
+        Before the first pass completes, the pass in progress is ranked instead.
+        """
+        with self._lock:
+            if self._results is not None:
+                entries, complete = self._results[ranking], True
+            else:
+                heap = self._heaps.get(ranking, [])
+                entries, complete = [entry for _, _, entry in sorted(heap, reverse=True)], False
+        if key_type is not None:
+            entries = [entry for entry in entries if entry["type"] == key_type]
+        return entries[:limit], complete
+
+    def status(self):
+        """Metadata describing the last complete pass and the one in progress."""
+        completed_at = self._completed_at
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "passes_completed": self._passes_completed,
+            "completed_at": utc_timestamp(completed_at) if completed_at else None,
+            "age_seconds": round(time.time() - completed_at, 3) if completed_at else None,
+            "pass_duration_seconds": round(self._pass_duration, 3) if self._pass_duration is not None else None,
+            "current_pass_keys": self._analyzed if self._pass_started is not None else None,
+            "keys_per_second": TOP_KEYS_PER_SECOND or None,
+            "k": self.k,
+            "maxmemory_policy": self.policy,
+            "lfu": self.lfu,
+        }
+
+
+RDB_TYPES = {
+    0: "string", 1: "list", 2: "set", 3: "zset", 4: "hash", 5: "zset",
+    9: "hash", 10: "list", 11: "set", 12: "zset", 13: "hash", 14: "list",
+    15: "stream", 16: "hash", 17: "zset", 18: "list", 19: "stream", 20: "set", 21: "stream",
+    22: "hash", 23: "hash", 24: "hash", 25: "hash",
+}
+# Single-blob encodings: type -> (blob format, whether entries come in pairs)
+RDB_BLOB_TYPES = {
+    9: ("zipmap", False), 10: ("ziplist", False), 11: ("intset", False), 12: ("ziplist", True),
+    13: ("ziplist", True), 16: ("listpack", True), 17: ("listpack", True), 20: ("listpack", False),
+}
+RDB_MODULE_CHARSET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+
+
+def lzf_decompress(data, limit=None):
+    """Decompress LZF data as Redis writes it, stopping once `limit` bytes are out."""
+    out = bytearray()
+    i = 0
+    while i < len(data) and (limit is None or len(out) < limit):
+        ctrl = data[i]
+        i += 1
+        if ctrl < 32:
+            out += data[i:i + ctrl + 1]
+            i += ctrl + 1
+            continue
+        length = ctrl >> 5
+        if length == 7:
+            length += data[i]
+            i += 1
+        ref = len(out) - ((ctrl & 0x1F) << 8) - data[i] - 1
+        i += 1
+        for _ in range(length + 2):
+            out.append(out[ref])
+            ref += 1
+    return bytes(out)
+
+
+def module_type_name(module_id):
+    """Type name ("ReJSON-RL", ...) encoded in the upper 54 bits of a module type id."""
+    module_id >>= 10
+    name = []
+    for _ in range(9):
+        name.append(RDB_MODULE_CHARSET[module_id & 63])
+        module_id >>= 6
+    return "".join(reversed(name))
+
+
+def blob_count(blob_format, header):
+    """Entries of a ziplist/listpack/intset/zipmap from its first bytes, or None."""
+    if blob_format == "ziplist" and len(header) >= 10:
+        count = int.from_bytes(header[8:10], "little")
+        return None if count == 0xFFFF else count
+    if blob_format == "listpack" and len(header) >= 6:
+        count = int.from_bytes(header[4:6], "little")
+        return None if count == 0xFFFF else count
+    if blob_format == "intset" and len(header) >= 8:
+        return int.from_bytes(header[4:8], "little")
+    if blob_format == "zipmap" and header and header[0] < 254:
+        return header[0]
+    return None
+
+
+class RdbUnsupportedType(ValueError):
+    """A value type the parser cannot step over."""
+
+
+class RdbParser:
+    """Streams the keys of an RDB dump file through a memory map.
+
+    Values are skipped, not decoded. Only their encoded size and element
+    count are read, and the count only where the encoding has it in a
+    header (compressed blobs are inflated just far enough to read it). Memory
+    use therefore does not grow with value sizes, and the OS pages the file
+    in and out as the parser moves through it. Iterating yields
+    (db, name, type, expiry in ms or None, encoded bytes, length or None);
+    `aux` fills with the dump's AUX fields (redis-ver, ctime, ...) as they
+    are met.
+
+    Values carry no length of their own, so nothing after a value of an
+    unknown type can be read. Iteration then stops early with a warning and
+    `stopped` says why; the keys before it are still yielded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self.aux = {}
+        self.buf = None
+        self.stopped = None
+
+    def __iter__(self):
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+            self.buf = buf
+            try:
+                yield from self._records()
+            finally:
+                self.buf = None
+
+    def _records(self):
+        buf = self.buf
+        if buf[:5] != b"REDIS":
+            raise ValueError(f"{self.path} is not an RDB file")
+        self.version = int(buf[5:9])
+        read_length = self.read_length
+        read_string = self.read_string
+        skip_value = self.skip_value
+        pos = 9
+        db = 0
+        expires = None
+        while True:
+            start = pos
+            opcode = buf[pos]
+            pos += 1
+            if opcode < 0xF4:
+                name, pos = read_string(pos)
+                try:
+                    pos, key_type, length = skip_value(opcode, pos)
+                except RdbUnsupportedType as e:
+                    self.stopped = f"{e} at key {name.decode('utf-8', 'replace')!r} (offset {start})"
+                    print(f"Warning: stopped reading {self.path}: {self.stopped}")
+                    return
+                yield db, name.decode("utf-8", "replace"), key_type, expires, pos - start, length
+                expires = None
+            elif opcode == 0xFF:    # EOF
+                return
+            elif opcode == 0xFE:    # SELECTDB
+                db, _, pos = read_length(pos)
+            elif opcode == 0xFD:    # EXPIRETIME (seconds)
+                expires = int.from_bytes(buf[pos:pos + 4], "little") * 1000
+                pos += 4
+            elif opcode == 0xFC:    # EXPIRETIME_MS
+                expires = int.from_bytes(buf[pos:pos + 8], "little")
+                pos += 8
+            elif opcode == 0xFB:    # RESIZEDB
+                _, _, pos = read_length(pos)
+                _, _, pos = read_length(pos)
+            elif opcode == 0xFA:    # AUX
+                key, pos = read_string(pos)
+                value, pos = read_string(pos)
+                self.aux[key.decode("utf-8", "replace")] = value.decode("utf-8", "replace")
+            elif opcode == 0xF9:    # FREQ
+                pos += 1
+            elif opcode == 0xF8:    # IDLE
+                _, _, pos = read_length(pos)
+            elif opcode == 0xF7:    # MODULE_AUX
+                _, _, pos = read_length(pos)
+                pos = self.skip_module(pos)
+            elif opcode == 0xF5:    # FUNCTION2
+                pos, _ = self.skip_string(pos)
+            elif opcode == 0xF4:    # SLOT_INFO
+                for _ in range(3):
+                    _, _, pos = read_length(pos)
+            else:
+                raise ValueError(f"Unsupported RDB opcode {opcode:#x} at offset {start}")
+
+    def read_length(self, pos):
+        """Decode a length at `pos`; returns (value, whether it is a special encoding, next position)."""
+        buf = self.buf
+        first = buf[pos]
+        kind = first >> 6
+        if kind == 0:
+            return first & 0x3F, False, pos + 1
+        if kind == 1:
+            return ((first & 0x3F) << 8) | buf[pos + 1], False, pos + 2
+        if first == 0x80:
+            return int.from_bytes(buf[pos + 1:pos + 5], "big"), False, pos + 5
+        if first == 0x81:
+            return int.from_bytes(buf[pos + 1:pos + 9], "big"), False, pos + 9
+        if kind == 3:
+            return first & 0x3F, True, pos + 1
+        raise ValueError(f"Bad RDB length encoding {first:#x} at offset {pos}")
+
+    def read_string(self, pos):
+        """Decode a string at `pos`; returns (bytes, next position)."""
+        length, special, pos = self.read_length(pos)
+        if not special:
+            return self.buf[pos:pos + length], pos + length
+        if length < 3:
+            size = 1 << length
+            value = int.from_bytes(self.buf[pos:pos + size], "little", signed=True)
+            return str(value).encode(), pos + size
+        if length == 3:
+            compressed, _, pos = self.read_length(pos)
+            _, _, pos = self.read_length(pos)
+            return lzf_decompress(self.buf[pos:pos + compressed]), pos + compressed
+        raise ValueError(f"Bad RDB string encoding {length} at offset {pos}")
+
+    def skip_string(self, pos):
+        """Step over a string at `pos`; returns (next position, its decoded length)."""
+        length, special, pos = self.read_length(pos)
+        if not special:
+            return pos + length, length
+        if length < 3:
+            size = 1 << length
+            return pos + size, len(str(int.from_bytes(self.buf[pos:pos + size], "little", signed=True)))
+        if length == 3:
+            compressed, _, pos = self.read_length(pos)
+            length, _, pos = self.read_length(pos)
+            return pos + compressed, length
+        raise ValueError(f"Bad RDB string encoding {length} at offset {pos}")
+
+    def skip_blob(self, pos, blob_format):
+        """Step over a serialized ziplist/listpack/intset/zipmap; returns (next position, entries)."""
+        length, special, pos = self.read_length(pos)
+        if not special:
+            return pos + length, blob_count(blob_format, self.buf[pos:pos + 10])
+        if length != 3:
+            raise ValueError(f"Bad RDB blob encoding {length} at offset {pos}")
+        compressed, _, pos = self.read_length(pos)
+        _, _, pos = self.read_length(pos)
+        header = lzf_decompress(self.buf[pos:pos + min(compressed, 32)], limit=10)
+        return pos + compressed, blob_count(blob_format, header)
+
+    def skip_module(self, pos):
+        """Step over module data saved as typed opcodes, up to its EOF opcode."""
+        while True:
+            opcode, _, pos = self.read_length(pos)
+            if opcode == 0:                 # EOF
+                return pos
+            if opcode in (1, 2):            # SINT, UINT
+                _, _, pos = self.read_length(pos)
+            elif opcode == 3:               # FLOAT
+                pos += 4
+            elif opcode == 4:               # DOUBLE
+                pos += 8
+            elif opcode == 5:               # STRING
+                pos, _ = self.skip_string(pos)
+            else:
+                raise ValueError(f"Bad RDB module opcode {opcode} at offset {pos}")
+
+    def skip_value(self, value_type, pos):
+        """Step over a value of `value_type`; returns (next position, type name, length or None)."""
+        skip_string = self.skip_string
+        read_length = self.read_length
+        if value_type == 0:
+            pos, length = skip_string(pos)
+            return pos, "string", length
+        if value_type in RDB_BLOB_TYPES:
+            blob_format, pairs = RDB_BLOB_TYPES[value_type]
+            pos, count = self.skip_blob(pos, blob_format)
+            if pairs and count is not None:
+                count //= 2
+            return pos, RDB_TYPES[value_type], count
+        if value_type in (1, 2, 4):         # Plain list, set, hash
+            count, _, pos = read_length(pos)
+            for _ in range(count * 2 if value_type == 4 else count):
+                pos, _ = skip_string(pos)
+            return pos, RDB_TYPES[value_type], count
+        if value_type in (3, 5):            # Skiplist zset, scores as strings or doubles
+            count, _, pos = read_length(pos)
+            buf = self.buf
+            for _ in range(count):
+                pos, _ = skip_string(pos)
+                if value_type == 5:
+                    pos += 8
+                else:
+                    size = buf[pos]
+                    pos += 1 + (size if size < 253 else 0)  # 253-255 are nan/+inf/-inf
+            return pos, "zset", count
+        if value_type in (14, 18):          # Quicklist of ziplists, or of plain/packed nodes
+            nodes, _, pos = read_length(pos)
+            total = 0
+            for _ in range(nodes):
+                if value_type == 18:
+                    container, _, pos = read_length(pos)
+                    if container == 1:
+                        pos, _ = skip_string(pos)
+                        total = total if total is None else total + 1
+                        continue
+                pos, count = self.skip_blob(pos, "ziplist" if value_type == 14 else "listpack")
+                total = None if total is None or count is None else total + count
+            return pos, "list", total
+        if value_type in (15, 19, 21):
+            return self.skip_stream(value_type, pos)
+        if value_type in (22, 24):          # Hash with field expiries (Redis 7.4)
+            if value_type == 24:
+                pos += 8                    # Earliest field expiry, ms
+            count, _, pos = read_length(pos)
+            for _ in range(count):
+                _, _, pos = read_length(pos)  # Field expiry
+                pos, _ = skip_string(pos)
+                pos, _ = skip_string(pos)
+            return pos, "hash", count
+        if value_type in (23, 25):          # Listpack of field, value, expiry triples
+            if value_type == 25:
+                pos += 8
+            pos, count = self.skip_blob(pos, "listpack")
+            return pos, "hash", None if count is None else count // 3
+        if value_type == 7:
+            module_id, _, pos = read_length(pos)
+            return self.skip_module(pos), module_type_name(module_id), None
+        raise RdbUnsupportedType(f"Unsupported RDB value type {value_type} (RDB version {self.version})")
+
+    def skip_stream(self, value_type, pos):
+        """Step over a stream; returns (next position, "stream", entries)."""
+        skip_string = self.skip_string
+        read_length = self.read_length
+        nodes, _, pos = read_length(pos)
+        for _ in range(nodes):
+            pos, _ = skip_string(pos)       # Master entry ID
+            pos, _ = skip_string(pos)       # Listpack of entries
+        length, _, pos = read_length(pos)
+        # Last ID, then (v2+) first ID, max deleted ID and entries added
+        for _ in range(2 if value_type == 15 else 7):
+            _, _, pos = read_length(pos)
+        groups, _, pos = read_length(pos)
+        for _ in range(groups):
+            pos, _ = skip_string(pos)       # Group name
+            for _ in range(2 if value_type == 15 else 3):  # Last ID (and entries read)
+                _, _, pos = read_length(pos)
+            pending, _, pos = read_length(pos)
+            for _ in range(pending):
+                pos += 16 + 8               # Entry ID, delivery time
+                _, _, pos = read_length(pos)  # Delivery count
+            consumers, _, pos = read_length(pos)
+            for _ in range(consumers):
+                pos, _ = skip_string(pos)   # Consumer name
+                pos += 8 if value_type != 21 else 16  # Seen (and active) time
+                pending, _, pos = read_length(pos)
+                pos += 16 * pending
+        return pos, "stream", length
+
+
+def load_rdb(path=None, db=None):
+    """Load the keys of database `db` of an RDB dump into the scanner as its snapshot.
+
+    Expiry deadlines are shifted by the time since the dump was written (its
+    `ctime` AUX field), so TTLs read as they were at dump time and count down
+    from the load. Keys already expired then are skipped, as Redis does.
+    Returns the number of keys loaded.
+    """
+    path = RDB_PATH if path is None else path
+    db = RDB_DB if db is None else db
+    parser = RdbParser(path)
+    started = time.time()
+
+    def entries():
+        shift = None
+        for key_db, name, key_type, expires_ms, size, length in parser:
+            if key_db != db:
+                continue
+            if scanner.match != '*' and not fnmatch.fnmatchcase(name, scanner.match):
+                continue
+            if scanner.key_type is not None and key_type != scanner.key_type:
+                continue
+            expires_at = None
+            if expires_ms is not None:
+                if shift is None:
+                    # AUX fields come before the first key
+                    shift = started - int(parser.aux.get("ctime", started))
+                expires_at = expires_ms / 1000 + shift
+                if expires_at <= started:
+                    continue
+            yield {
+                "name": name,
+                "type": key_type,
+                "ttl": -1 if expires_at is None else max(int(round(expires_at - started)), 0),
+                "size": size,
+                "expires_at": expires_at,
+                "length": length,
+                "size_at": started,
+            }
+
+    try:
+        with phase_seconds.time("rdb"):
+            scanner.load(entries(), f"rdb:{path}")
+    except Exception as e:
+        scanner.load_error = f"{type(e).__name__}: {e}"
+        print(f"Could not load RDB dump {path}: {scanner.load_error}")
+        redis_errors_total.inc(label_value="rdb")
+        raise
+    count = scanner.key_count()
+    if parser.stopped:
+        scanner.load_error = f"Only the keys before the stop were loaded: {parser.stopped}"
+        redis_errors_total.inc(label_value="rdb")
+    print(f"Loaded {count:,} keys from {path} in {time.time() - started:.1f}s")
+    return count
+
+
+def load_rdb_in_background():
+    """Thread target for load_rdb: failures are logged and reported in the snapshot status."""
+    try:
+        load_rdb()
+    except Exception:
+        traceback.print_exc()
+
+
+def check_live():
+    if RDB_PATH:
+        raise HTTPException(status_code=503, detail="Not available when serving an RDB dump (RDB_PATH)")
+
+
+def dump_json(data):
+    """Serialize a response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_varint(value, out):
+    """Append an unsigned LEB128 varint to a bytearray."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(buf, pos):
+    """Read an unsigned LEB128 varint; returns (value, new position)."""
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def shared_prefix_length(a, b):
+    """Length of the common prefix of two byte strings (binary search on slices)."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def pack_ints(typecode, values):
+    """Pack ints as a little-endian fixed-width array."""
+    packed = array.array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_ints(typecode, buf):
+    values = array.array(typecode)
+    values.frombytes(buf)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class ColumnarRangeError(ValueError):
+    """A document value does not fit a fixed-width field of the columnar format."""
+
+
+def encode_columnar(data):
+    """Encode a /redis-keyspace document in the columnar binary format.
+
+    Layout (little-endian):
+        b"RKSC", u8 format version (2)
+        u32 length + metadata JSON
+        u8 type count, then per type: u8 length + type name
+        u32 keyspace count, then per keyspace:
+            u16 length + keyspace name, u32 key count, u64 total size
+            names: per key varint shared-prefix length, varint suffix length,
+                   suffix bytes (names sorted and front-coded per keyspace)
+            types: u8 per key, index into the type table
+            ttls:  int64 per key
+            sizes: uint32 per key (clamped)
+    Key columns share the same (sorted by name) order. Raises ColumnarRangeError
+    for documents the fixed-width fields cannot hold.
+    """
+    keyspaces = data["keyspaces"]
+    types = sorted({record["type"] for keyspace in keyspaces.values() for record in keyspace["keys"]})
+    type_ids = {key_type: i for i, key_type in enumerate(types)}
+    if len(types) > 0xFF:
+        raise ColumnarRangeError(f"{len(types)} key types exceed the columnar limit of 255")
+
+    out = bytearray(b"RKSC\x02")
+    metadata = dump_json(data["metadata"])
+    out += struct.pack("<I", len(metadata)) + metadata
+    out.append(len(types))
+    for key_type in types:
+        name = key_type.encode()
+        if len(name) > 0xFF:
+            raise ColumnarRangeError(f"Type name '{key_type[:64]}' exceeds the columnar limit of 255 bytes")
+        out.append(len(name))
+        out += name
+
+    out += struct.pack("<I", len(keyspaces))
+    for keyspace_name, keyspace in keyspaces.items():
+        name = keyspace_name.encode()
+        records = sorted(keyspace["keys"], key=lambda record: record["name"])
+        if len(name) > 0xFFFF:
+            raise ColumnarRangeError(
+                f"Keyspace name '{keyspace_name[:64]}...' exceeds the columnar limit of 65535 bytes"
+            )
+        out += struct.pack("<H", len(name)) + name
+        out += struct.pack("<IQ", len(records), keyspace["total_size"])
+
+        previous = b""
+        for record in records:
+            key_name = record["name"].encode()
+            shared = shared_prefix_length(previous, key_name)
+            encode_varint(shared, out)
+            encode_varint(len(key_name) - shared, out)
+            out += key_name[shared:]
+            previous = key_name
+
+        out += bytes(type_ids[record["type"]] for record in records)
+        out += pack_ints("q", [record["ttl"] for record in records])
+        out += pack_ints("I", [min(record["size"] or 0, 0xFFFFFFFF) for record in records])
+    return bytes(out)
+
+
+def decode_columnar(buf):
+    """Decode the columnar binary format back into a /redis-keyspace document."""
+    if buf[:5] != b"RKSC\x02":
+        raise ValueError("Not a columnar keyspace document")
+    pos = 5
+    (length,) = struct.unpack_from("<I", buf, pos)
+    metadata = json.loads(buf[pos + 4:pos + 4 + length])
+    pos += 4 + length
+
+    types = []
+    type_count = buf[pos]
+    pos += 1
+    for _ in range(type_count):
+        length = buf[pos]
+        types.append(buf[pos + 1:pos + 1 + length].decode())
+        pos += 1 + length
+
+    keyspaces = {}
+    (keyspace_count,) = struct.unpack_from("<I", buf, pos)
+    pos += 4
+    for _ in range(keyspace_count):
+        (length,) = struct.unpack_from("<H", buf, pos)
+        keyspace_name = buf[pos + 2:pos + 2 + length].decode()
+        pos += 2 + length
+        count, total_size = struct.unpack_from("<IQ", buf, pos)
+        pos += 12
+
+        names = []
+        previous = b""
+        for _ in range(count):
+            shared, pos = decode_varint(buf, pos)
+            length, pos = decode_varint(buf, pos)
+            previous = previous[:shared] + buf[pos:pos + length]
+            pos += length
+            names.append(previous.decode())
+
+        type_column = buf[pos:pos + count]
+        pos += count
+        ttls = unpack_ints("q", buf[pos:pos + 8 * count])
+        pos += 8 * count
+        sizes = unpack_ints("I", buf[pos:pos + 4 * count])
+        pos += 4 * count
+
+        keyspaces[keyspace_name] = {
+            "keys": [
+                {"name": names[i], "type": types[type_column[i]], "ttl": ttls[i], "size": sizes[i]}
+                for i in range(count)
+            ],
+            "total_count": count,
+            "total_size": total_size,
+        }
+    return {"keyspaces": keyspaces, "metadata": metadata}
+
+
+def compress_body(body, encoding):
+    """Compress a response body with the negotiated content encoding."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def negotiate_format(request, fmt):
+    """Pick the response format from ?format= or the Accept header."""
+    if fmt:
+        if fmt not in ("json", "columnar", "ndjson"):
+            raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}'")
+        return fmt
+    accept = request.headers.get("accept", "")
+    if COLUMNAR_MEDIA_TYPE in accept:
+        return "columnar"
+    if NDJSON_MEDIA_TYPE in accept:
+        return "ndjson"
+    return "json"
+
+
+def negotiate_encoding(request):
+    """Pick a content encoding the client accepts: zstd (if installed), gzip or none."""
+    accepted = {
+        token.split(";")[0].strip().lower()
+        for token in request.headers.get("accept-encoding", "").split(",")
+    }
+    if "zstd" in accepted and zstandard is not None:
+        return "zstd"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or etag[2:] in candidates
+
+
+class ResponseCache:
+    """Serialized response cache with single-flight builds and ETags.
+
+    ETags are derived from the snapshot version, so a client holding the
+    current version is answered with 304 without building anything.
+    """
+
+    def __init__(self, scanner, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.scanner = scanner
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (built_at, etag, body, encoding), oldest use first
+        self._inflight = {}            # key -> asyncio.Task building the entry
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "not_modified": 0, "evicted": 0}
+
+    @staticmethod
+    def etag_for(key, version):
+        return f'W/"{version}-{zlib.crc32(repr(key).encode()):08x}"'
+
+    @staticmethod
+    def _serialize(build, fmt, encoding):
+        data = build()
+        with phase_seconds.time("serialize"):
+            try:
+                body = encode_columnar(data) if fmt == "columnar" else dump_json(data)
+            except ColumnarRangeError as error:
+                raise HTTPException(status_code=406, detail=f"{error}; use format=json") from None
+            if encoding and len(body) >= COMPRESS_MIN_BYTES:
+                body = compress_body(body, encoding)
+            else:
+                encoding = None
+        return data["metadata"]["snapshot"]["version"], body, encoding
+
+    async def _build(self, key, build, fmt, encoding):
+        version, body, encoding = await run_in_threadpool(self._serialize, build, fmt, encoding)
+        entry = (time.monotonic(), self.etag_for(key, version), body, encoding)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict(entry[0])
+        return entry
+
+    def _evict(self, now):
+        """Drop expired entries, then the least recently used beyond `max_entries`."""
+        before = len(self._entries)
+        for key in [key for key, entry in self._entries.items() if now - entry[0] >= self.ttl]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.stats["evicted"] += before - len(self._entries)
+
+    async def respond(self, request, key, build, fmt="json"):
+        """Serve `build()` for `key` from the cache, building it at most once at a time.
+
+        The body is serialized as JSON or the columnar format and compressed per
+        the request's Accept-Encoding; each representation is cached separately.
+        """
+        encoding = negotiate_encoding(request)
+        key = key + (fmt, encoding)
+        if etag_matches(request.headers.get("if-none-match"), self.etag_for(key, self.scanner.version)):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers={"ETag": self.etag_for(key, self.scanner.version)})
+
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            status = "HIT"
+        else:
+            task = self._inflight.get(key)
+            if task is not None:
+                self.stats["coalesced"] += 1
+                status = "COALESCED"
+            else:
+                self.stats["misses"] += 1
+                status = "MISS"
+                task = asyncio.ensure_future(self._build(key, build, fmt, encoding))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # Shield the shared build from a single client disconnecting
+            entry = await asyncio.shield(task)
+
+        response_bytes_total.inc(len(entry[2]), "keyspace")
+        headers = {"ETag": entry[1], "X-Cache": status, "Vary": "Accept, Accept-Encoding"}
+        if entry[3]:
+            headers["Content-Encoding"] = entry[3]
+        return Response(
+            content=entry[2],
+            media_type=COLUMNAR_MEDIA_TYPE if fmt == "columnar" else "application/json",
+            headers=headers,
+        )
+
+    def status(self):
+        return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries, ttl_seconds=self.ttl)
+
+
+class ChangeBroadcaster:
+    """Wakes push subscribers when the scanner publishes a new snapshot version.
+
+    Subscribers keep no queue of their own: each remembers the last version it
+    was sent and, once woken, is sent the merged delta since then. Changes
+    published while a subscriber is still sending end up in its next delta, so
+    a slow consumer holds one pending wake-up instead of a growing backlog.
+    Each delta is built and serialized once per (since, version) and shared by
+    every subscriber at that version.
+    """
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.subscribers = 0
+        self._loop = None
+        self._changed = None   # asyncio.Event, replaced after every publish
+        self._payloads = {}    # (since, version) -> (delta version, JSON body)
+        self._inflight = {}    # (since, version) -> task building the payload
+        self.stats = {"wakeups": 0, "sent": 0, "shared": 0, "coalesced_versions": 0}
+
+    def start(self):
+        """Start listening to the scanner; must be called on the event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self.scanner.add_listener(self._on_publish)
+
+    def stop(self):
+        self.scanner.remove_listener(self._on_publish)
+        self._loop = None
+
+    def _on_publish(self, version):
+        # Runs on the scanner/notifier thread
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        self.stats["wakeups"] += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    @property
+    def full(self):
+        return self.subscribers >= PUSH_MAX_SUBSCRIBERS
+
+    @contextmanager
+    def subscribe(self):
+        """Count a subscriber for the duration of the `with` block."""
+        self.subscribers += 1
+        try:
+            yield
+        finally:
+            self.subscribers -= 1
+
+    async def wait(self, since, timeout=None):
+        """Wait until the version moves past `since` or `timeout` seconds pass; return the version."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Take the event before checking, so a publish in between still wakes us
+            changed = self._changed
+            if self.scanner.version != since or changed is None:
+                return self.scanner.version
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return since
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return since
+
+    async def payload(self, since):
+        """The /redis-keyspace/delta body since `since` as (version, JSON bytes), shared per version."""
+        key = (since, self.scanner.version)
+        entry = self._payloads.get(key)
+        if entry is not None:
+            self.stats["shared"] += 1
+            return entry
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run_in_threadpool(self._build, since))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["shared"] += 1
+        entry = await asyncio.shield(task)
+        # Payloads of older versions are never asked for again
+        self._payloads = {cached: value for cached, value in self._payloads.items() if cached[1] == key[1]}
+        self._payloads[key] = entry
+        return entry
+
+    @staticmethod
+    def _build(since):
+        data = get_keyspace_delta(since)
+        return data["version"], dump_json(data)
+
+    async def updates(self, since, heartbeat=None):
+        """Yield (version, body) for the changes after `since`, one merged delta at a time.
+
+        With a `heartbeat`, None is yielded after that many idle seconds so
+        streams can send a keepalive.
+        """
+        while True:
+            version = await self.wait(since, heartbeat)
+            if version == since:
+                yield None
+                continue
+            await asyncio.sleep(PUSH_COALESCE_INTERVAL)
+            version, body = await self.payload(since)
+            if since and version - since > 1:
+                self.stats["coalesced_versions"] += version - since - 1
+            self.stats["sent"] += 1
+            since = version
+            yield version, body
+
+    def status(self):
+        return dict(self.stats, subscribers=self.subscribers, max_subscribers=PUSH_MAX_SUBSCRIBERS)
+
+
+# Columns of a history row after its timestamp; the first HISTORY_MEAN_FIELDS
+# are averaged when rows are merged
+HISTORY_FIELDS = ["count", "size"] + TTL_BUCKETS + ["count_min", "count_max", "samples"]
+HISTORY_MEAN_FIELDS = 2 + len(TTL_BUCKETS)
+
+
+def merge_history_rows(rows, timestamp):
+    """One row standing for `rows`: means weighted by samples, count extremes, total samples."""
+    samples = sum(row[-1] for row in rows)
+    merged = [timestamp]
+    for column in range(1, 1 + HISTORY_MEAN_FIELDS):
+        merged.append(sum(row[column] * row[-1] for row in rows) / samples)
+    merged.append(min(row[-3] for row in rows))
+    merged.append(max(row[-2] for row in rows))
+    merged.append(samples)
+    return merged
+
+
+class RingBuffer:
+    """The last `capacity` rows of `width` floats, stored in one flat array.
+
+    Rows are appended in timestamp order (column 0), so a time range is found
+    by binary search. The array only grows until it is full, then the oldest
+    row is overwritten in place.
+    """
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.width = width
+        self.data = array.array("d")
+        self.start = 0   # Row number of the oldest row once full
+        self.length = 0
+
+    def append(self, row):
+        if self.length < self.capacity:
+            self.data.extend(row)
+            self.length += 1
+            return
+        offset = self.start * self.width
+        self.data[offset:offset + self.width] = array.array("d", row)
+        self.start = (self.start + 1) % self.capacity
+
+    @property
+    def full(self):
+        return self.length == self.capacity
+
+    def _offset(self, i):
+        return ((self.start + i) % self.capacity) * self.width
+
+    def timestamp(self, i):
+        return self.data[self._offset(i)]
+
+    def _search(self, timestamp):
+        """Position of the oldest row at or after `timestamp`."""
+        low, high = 0, self.length
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def rows(self, start, end):
+        """Rows with a timestamp in [start, end], oldest first."""
+        rows = []
+        for i in range(self._search(start), self.length):
+            offset = self._offset(i)
+            if self.data[offset] > end:
+                break
+            rows.append(self.data[offset:offset + self.width].tolist())
+        return rows
+
+    @property
+    def nbytes(self):
+        return len(self.data) * self.data.itemsize
+
+
+class KeyspaceSeries:
+    """History of one keyspace: a ring buffer per HISTORY_TIERS entry.
+
+    Raw rows go to the first tier. Each coarser tier collects the rows of the
+    finer one falling in its current bucket and stores their merge once the
+    bucket closes, then passes that row on to the next tier.
+    """
+
+    def __init__(self):
+        width = 1 + len(HISTORY_FIELDS)
+        self.tiers = [RingBuffer(points, width) for _, points in HISTORY_TIERS]
+        self._buckets = [None] * len(HISTORY_TIERS)  # Start of each tier's open bucket
+        self._pending = [[] for _ in HISTORY_TIERS]  # Finer rows in each open bucket
+
+    def add(self, row):
+        self.tiers[0].append(row)
+        self._feed(1, row)
+
+    def _feed(self, tier, row):
+        if tier >= len(HISTORY_TIERS):
+            return
+        step = HISTORY_TIERS[tier][0]
+        bucket = row[0] - row[0] % step
+        if self._buckets[tier] is not None and bucket != self._buckets[tier]:
+            merged = merge_history_rows(self._pending[tier], self._buckets[tier])
+            self.tiers[tier].append(merged)
+            self._pending[tier] = []
+            self._feed(tier + 1, merged)
+        self._buckets[tier] = bucket
+        self._pending[tier].append(row)
+
+    def covers(self, tier, start):
+        """Whether `tier` still holds everything recorded since `start`."""
+        ring = self.tiers[tier]
+        return not ring.full or ring.timestamp(0) <= start
+
+    def rows(self, tier, start, end):
+        """Rows of `tier` in [start, end], including the bucket still open."""
+        rows = self.tiers[tier].rows(start, end)
+        bucket = self._buckets[tier]
+        if tier and bucket is not None and start <= bucket <= end:
+            rows.append(merge_history_rows(self._pending[tier], bucket))
+        return rows
+
+    @property
+    def nbytes(self):
+        return sum(ring.nbytes for ring in self.tiers)
+
+
+class KeyspaceHistory:
+    """Per-keyspace key count, total size and TTL bucket mix, recorded after every sweep.
+
+    The whole database always has a series (under None); the
+    HISTORY_MAX_KEYSPACES largest keyspaces seen get one of their own, and a
+    tracked keyspace that disappears keeps recording zeros.
+    """
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self._lock = threading.Lock()
+        self._series = {None: KeyspaceSeries()}
+        self.untracked = set()  # Keyspaces seen once the limit was reached
+
+    def start(self):
+        self.scanner.add_sweep_listener(self.record)
+
+    def stop(self):
+        self.scanner.remove_sweep_listener(self.record)
+
+    def record(self, timestamp, index):
+        """Add one raw row per keyspace for the sweep index `index`."""
+        with phase_seconds.time("history"):
+            order = {bucket: i for i, bucket in enumerate(TTL_BUCKETS)}
+            stats = defaultdict(lambda: [0] * HISTORY_MEAN_FIELDS)
+            for entry in index.values():
+                values = stats[get_keyspace_name(entry["name"])]
+                values[0] += 1
+                values[1] += entry["size"] or 0
+                values[2 + order[get_ttl_bucket(current_ttl(entry, timestamp))]] += 1
+            total = [sum(column) for column in zip(*stats.values())] or [0] * HISTORY_MEAN_FIELDS
+
+            with self._lock:
+                self._add(None, timestamp, total)
+                for name in sorted(stats, key=lambda name: -stats[name][0]):
+                    if name not in self._series:
+                        if len(self._series) > HISTORY_MAX_KEYSPACES:
+                            self.untracked.add(name)
+                            continue
+                        self._series[name] = KeyspaceSeries()
+                        self.untracked.discard(name)
+                    self._add(name, timestamp, stats[name])
+                for name in self._series:
+                    if name is not None and name not in stats:
+                        self._add(name, timestamp, [0] * HISTORY_MEAN_FIELDS)
+
+    def _add(self, name, timestamp, values):
+        # Caller holds the lock
+        self._series[name].add([timestamp] + values + [values[0], values[0], 1])
+
+    def tracked(self, keyspace):
+        return keyspace in self._series
+
+    def query(self, keyspace, start, end, step):
+        """Rows of `keyspace` in [start, end] and the tier resolution they come from.
+
+        Uses the finest tier (no coarser than `step`, when given) that still
+        reaches back to `start`, or the coarsest one when none does, then merges
+        its rows into `step`-second buckets when `step` is coarser than the tier.
+        """
+        with self._lock:
+            series = self._series[keyspace]
+            tiers = [tier for tier, (resolution, _) in enumerate(HISTORY_TIERS) if not step or resolution <= step]
+            tier = next((tier for tier in tiers if series.covers(tier, start)), tiers[-1])
+            rows = series.rows(tier, start, end)
+        resolution = HISTORY_TIERS[tier][0]
+        if step > resolution:
+            buckets = defaultdict(list)
+            for row in rows:
+                buckets[row[0] - row[0] % step].append(row)
+            rows = [merge_history_rows(buckets[bucket], bucket) for bucket in sorted(buckets)]
+        return rows, resolution
+
+    def status(self):
+        with self._lock:
+            return {
+                "keyspaces": len(self._series) - 1,
+                "untracked_keyspaces": len(self.untracked),
+                "bytes": sum(series.nbytes for series in self._series.values()),
+                "tiers": [{"resolution_seconds": resolution, "points": points} for resolution, points in HISTORY_TIERS],
+            }
+
+
+scanner = KeyspaceScanner(r)
+notifier = KeyspaceNotifier(scanner)
+response_cache = ResponseCache(scanner)
+broadcaster = ChangeBroadcaster(scanner)
+history = KeyspaceHistory(scanner)
+analyzer = KeyAnalyzer(r)
+
+
+def snapshot_metadata(total_keys, version=None):
+    """Metadata block shared by the /redis-keyspace response modes.
+
+    `version` is the snapshot version the response was built from; the ETag
+    is derived from it, so it must not be re-read after building.
+    """
+    snapshot = scanner.status()
+    if version is not None:
+        snapshot["version"] = version
+    return {
+        "total_keys": total_keys,
+        "timestamp": utc_timestamp(),
+        "snapshot": snapshot,
+        "notifications": notifier.status(),
+        "push": broadcaster.status(),
+        "sizes": {
+            "estimated": SIZE_ESTIMATE,
+            "measured": size_stats["measured"],
+            "reused": size_stats["reused"],
+        },
+    }
+
+
 def get_keyspace_data():
-    """Get detailed Redis key data grouped by keyspace using pipeline."""
-    # Get all keys
-    all_keys = r.keys('*')
-    
-    if not all_keys:
+    """Get detailed Redis key data grouped by keyspace from the latest SCAN snapshot."""
+    records, keyspaces, version = scanner.snapshot()
+
+    return {
+        "keyspaces": keyspaces or {},
+        "metadata": snapshot_metadata(len(records) if records else 0, version)
+    }
+
+
+def get_keyspace_page(query, sort, descending, after, limit):
+    """One page of the snapshot's keys matching `query`, grouped by keyspace.
+
+    Keys keep the page's sort order within each keyspace; keyspace totals
+    cover the page only, `metadata.query.matched` counts every matching key.
+    """
+    records, matched, last, version = scanner.query(query, sort, descending, after, limit)
+    data = {
+        "keyspaces": group_by_keyspace(records),
+        "metadata": snapshot_metadata(len(records), version),
+    }
+    data["metadata"]["query"] = dict(
+        query.describe(), sort=sort, desc=descending, limit=limit, live=False,
+        returned=len(records), matched=matched,
+        next_cursor=encode_query_cursor(last) if last is not None else None,
+    )
+    return data
+
+
+def get_keyspace_live_page(query, position, limit):
+    """One page of a new SCAN for the keys matching `query`, grouped by keyspace."""
+    records, next_position = scanner.scan_page(query, position, limit)
+    data = {
+        "keyspaces": group_by_keyspace(records),
+        "metadata": snapshot_metadata(len(records)),
+    }
+    data["metadata"]["query"] = dict(
+        query.describe(), sort=None, desc=False, limit=limit, live=True,
+        returned=len(records), matched=None,
+        next_cursor=encode_query_cursor(next_position) if next_position is not None else None,
+    )
+    return data
+
+
+async def uncached_response(request, build, fmt):
+    """Serialize `build()` like ResponseCache.respond, for responses that are never cached."""
+    _, body, encoding = await run_in_threadpool(
+        ResponseCache._serialize, build, fmt, negotiate_encoding(request)
+    )
+    response_bytes_total.inc(len(body), "keyspace")
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=body,
+        media_type=COLUMNAR_MEDIA_TYPE if fmt == "columnar" else "application/json",
+        headers=headers,
+    )
+
+
+def iter_keyspace_ndjson(live=False, query=None):
+    """Stream /redis-keyspace as NDJSON chunks.
+
+    The first line is {"metadata": ...}, then one key record (with its
+    `keyspace`) per line, and a closing {"keyspaces": ..., "total_keys": N} line
+    with per-keyspace totals. Records come from the published snapshot, or with
+    `live` from a new SCAN as its batches return; a `query` filters them.
+    Memory is bounded by one batch plus the per-keyspace totals.
+    """
+    metadata = snapshot_metadata(None)
+    if query is not None and query.active:
+        metadata["query"] = query.describe()
+    yield dump_json({"metadata": metadata}) + b"\n"
+
+    totals = defaultdict(lambda: {"total_count": 0, "total_size": 0, "n": 0, "sq": 0})
+    total_keys = 0
+    batches = scanner.iter_scan(query) if live else scanner.iter_snapshot(query=query)
+    for batch in batches:
+        lines = []
+        for record in batch:
+            keyspace = get_keyspace_name(record["name"])
+            keyspace_totals = totals[keyspace]
+            keyspace_totals["total_count"] += 1
+            if record["size"] is not None:
+                keyspace_totals["total_size"] += record["size"]
+                keyspace_totals["n"] += 1
+                keyspace_totals["sq"] += record["size"] * record["size"]
+            record["keyspace"] = keyspace
+            lines.append(dump_json(record))
+        total_keys += len(batch)
+        if lines:
+            chunk = b"\n".join(lines) + b"\n"
+            response_bytes_total.inc(len(chunk), "keyspace_stream")
+            yield chunk
+
+    keyspaces = {}
+    for name, keyspace_totals in totals.items():
+        keyspace = {"total_count": keyspace_totals["total_count"], "total_size": keyspace_totals["total_size"]}
+        if SIZE_ESTIMATE:
+            # Unsampled keys were streamed with a null size; estimate the total
+            total, error = estimate_from_moments(
+                keyspace_totals["n"], keyspace_totals["total_size"], keyspace_totals["sq"],
+                keyspace_totals["total_count"],
+            )
+            keyspace["total_size"] = int(round(total))
+            keyspace["total_size_error"] = int(round(error)) if error is not None else None
+            keyspace["size_samples"] = keyspace_totals["n"]
+        keyspaces[name] = keyspace
+    yield dump_json({"keyspaces": keyspaces, "total_keys": total_keys}) + b"\n"
+
+
+def size_bin_labels():
+    """Labels of the size histogram bins, e.g. "<=64" ... ">1048576"."""
+    return [f"<={bound}" for bound in SIZE_HISTOGRAM_BINS] + [f">{SIZE_HISTOGRAM_BINS[-1]}"]
+
+
+def new_aggregate():
+    """Empty per-keyspace aggregate; heaps are dropped when the result is built."""
+    return {
+        "total_count": 0,
+        "total_size": 0,
+        "ttl_buckets": dict.fromkeys(TTL_BUCKETS, 0),
+        "types": defaultdict(int),
+        "size_bins": [0] * (len(SIZE_HISTOGRAM_BINS) + 1),
+        "largest": [],   # min-heap of (size, name), at most `top` entries
+        "expiring": [],  # min-heap of (-ttl, name), at most `top` entries
+    }
+
+
+def aggregate_keyspaces(entries, top=0, now=None):
+    """Aggregate index entries per keyspace in a single pass.
+
+    No per-key record is built: memory is bounded by the number of keyspaces,
+    types and bins plus two heaps of `top` entries per keyspace, independent
+    of the number of keys.
+    """
+    now = time.time() if now is None else now
+    aggregates = {}
+    for entry in entries:
+        key = entry["name"]
+        name = get_keyspace_name(key)
+        aggregate = aggregates.get(name)
+        if aggregate is None:
+            aggregate = aggregates[name] = new_aggregate()
+
+        size = entry["size"] or 0
+        ttl = current_ttl(entry, now)
+        aggregate["total_count"] += 1
+        aggregate["total_size"] += size
+        aggregate["ttl_buckets"][get_ttl_bucket(ttl)] += 1
+        aggregate["types"][entry["type"]] += 1
+        aggregate["size_bins"][bisect.bisect_left(SIZE_HISTOGRAM_BINS, size)] += 1
+
+        if top:
+            largest = aggregate["largest"]
+            if len(largest) < top:
+                heapq.heappush(largest, (size, key))
+            elif size > largest[0][0]:
+                heapq.heapreplace(largest, (size, key))
+            if ttl >= 0:
+                expiring = aggregate["expiring"]
+                if len(expiring) < top:
+                    heapq.heappush(expiring, (-ttl, key))
+                elif -ttl > expiring[0][0]:
+                    heapq.heapreplace(expiring, (-ttl, key))
+
+    labels = size_bin_labels()
+    result = {}
+    for name, aggregate in aggregates.items():
+        result[name] = {
+            "total_count": aggregate["total_count"],
+            "total_size": aggregate["total_size"],
+            "ttl_buckets": aggregate["ttl_buckets"],
+            "types": dict(aggregate["types"]),
+            "size_histogram": dict(zip(labels, aggregate["size_bins"])),
+        }
+        if top:
+            result[name]["largest"] = [
+                {"name": key, "size": size}
+                for size, key in sorted(aggregate["largest"], reverse=True)
+            ]
+            result[name]["expiring_soonest"] = [
+                {"name": key, "ttl": -neg_ttl}
+                for neg_ttl, key in sorted(aggregate["expiring"], reverse=True)
+            ]
+    return result
+
+
+def get_keyspace_aggregates(top: int = 0):
+    """Get per-keyspace histograms (TTL bucket, type, size) from the latest snapshot."""
+    top = max(0, min(top, AGGREGATE_MAX_TOP))
+    with phase_seconds.time("aggregate"):
+        keyspaces, total_keys, version = scanner.aggregate(top)
+
+    return {
+        "keyspaces": keyspaces,
+        "metadata": dict(snapshot_metadata(total_keys, version), mode="aggregate")
+    }
+
+
+class Viewport:
+    """Area of the world a client asks for: a circle, or a box centered on (x, z)."""
+
+    def __init__(self, x, z, radius=None, half_x=None, half_z=None):
+        self.x = x
+        self.z = z
+        self.radius = radius
+        self.half_x = radius if radius is not None else half_x
+        self.half_z = radius if radius is not None else half_z
+
+    def distance(self, left, right, near, far):
+        """Distance from the center to the nearest point of a rectangle."""
+        dx = max(left - self.x, 0, self.x - right)
+        dz = max(near - self.z, 0, self.z - far)
+        return math.hypot(dx, dz)
+
+    def contains(self, x, z):
+        if self.radius is not None:
+            return math.hypot(x - self.x, z - self.z) <= self.radius
+        return abs(x - self.x) <= self.half_x and abs(z - self.z) <= self.half_z
+
+    def overlaps(self, left, right, near, far):
+        if self.radius is not None:
+            return self.distance(left, right, near, far) <= self.radius
+        return (left <= self.x + self.half_x and right >= self.x - self.half_x
+                and near <= self.z + self.half_z and far >= self.z - self.half_z)
+
+    def describe(self):
+        if self.radius is not None:
+            return {"x": self.x, "z": self.z, "radius": self.radius}
         return {
-            "keyspaces": {},
-            "metadata": {
-                "total_keys": 0,
-                "timestamp": datetime.utcnow().isoformat() + "Z"
-            }
+            "min_x": self.x - self.half_x, "max_x": self.x + self.half_x,
+            "min_z": self.z - self.half_z, "max_z": self.z + self.half_z,
+        }
+
+
+def layout_order(record):
+    """Sort key of a record within its keyspace's grid: TTL bucket index, then name."""
+    return TTL_BUCKETS.index(get_ttl_bucket(record["ttl"])), record["name"]
+
+
+class KeyspaceLayout:
+    """Grid position of every key of a snapshot, as roblox_server.lua lays them out.
+
+    Keyspaces sit side by side along +X in name order, each a grid
+    LAYOUT_KEYS_PER_ROW keys wide growing along +Z, keys ordered by TTL bucket
+    then name like sortKeysByTTL. Running size totals and the TTL bucket runs
+    of each keyspace summarize any range of rows in O(1), so level-of-detail
+    blocks cost the same however many keys they stand for.
+
+    A layout is never modified once built: `patched` returns a new layout
+    sharing every keyspace the changes did not touch.
+    """
+
+    def __init__(self, records, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        grouped = defaultdict(list)
+        for record in records:
+            grouped[get_keyspace_name(record["name"])].append(record)
+        keyspaces = []
+        for name in sorted(grouped):
+            keyed = sorted(((layout_order(record), record) for record in grouped[name]), key=lambda item: item[0])
+            keyspaces.append(self._keyspace(name, [key for key, _ in keyed], [record for _, record in keyed]))
+        self._place(keyspaces)
+
+    @staticmethod
+    def _keyspace(name, order, keys, sizes=None, edited_from=0):
+        """Keyspace entry for `keys`, sorted by their `order` (bucket index, name) pairs.
+
+        Running sizes are reused from `sizes` up to index `edited_from`, where
+        the keys were first edited.
+        """
+        # Keys are sorted by bucket, so each bucket is one run of indexes
+        runs = {}
+        for i, bucket in enumerate(TTL_BUCKETS):
+            start, end = bisect.bisect_left(order, (i,)), bisect.bisect_left(order, (i + 1,))
+            if end > start:
+                runs[bucket] = (start, end)
+        if sizes is None:
+            sizes, edited_from = array.array("q", [0]), 0
+        tail = itertools.accumulate((record["size"] or 0 for record in keys[edited_from:]), initial=sizes[edited_from])
+        return {
+            "name": name,
+            "x": 0,
+            "keys": keys,
+            "order": order,
+            "sizes": sizes[:edited_from] + array.array("q", tail),
+            "runs": runs,
         }
-    
-    # Use pipeline for efficient batch operations
-    pipe = r.pipeline()
-    for key in all_keys:
-        pipe.ttl(key)
-        pipe.memory_usage(key)
-        pipe.type(key)
-    
-    # Execute all commands at once
-    results = pipe.execute()
-    
-    # Group results by keyspace
-    keyspaces = defaultdict(lambda: {"keys": [], "total_count": 0, "total_size": 0})
-    
-    # Process results (3 results per key: ttl, memory, type)
-    for i, key in enumerate(all_keys):
-        ttl_idx = i * 3
-        memory_idx = i * 3 + 1
-        type_idx = i * 3 + 2
-        
-        ttl = results[ttl_idx]
-        memory = results[memory_idx] or 0  # Handle None memory usage
-        key_type = results[type_idx]
-        
-        # Extract keyspace
-        if ':' in key:
-            keyspace = key.split(':', 1)[0]
+
+    def _place(self, keyspaces):
+        """Set the keyspaces side by side, copying the entries that move."""
+        stride = LAYOUT_KEYS_PER_ROW * LAYOUT_KEY_SPACING + LAYOUT_KEYSPACE_SPACING
+        self.keyspaces = [
+            keyspace if keyspace["x"] == i * stride else dict(keyspace, x=i * stride)
+            for i, keyspace in enumerate(keyspaces)
+        ]
+        self.total_keys = sum(len(keyspace["keys"]) for keyspace in keyspaces)
+
+    def patched(self, changes, version):
+        """A copy of the layout with a scanner delta applied.
+
+        Only the keyspaces holding changed keys are re-summarized; keys are
+        moved with bisection, so the cost does not depend on the other keyspaces.
+        """
+        current = {keyspace["name"]: keyspace for keyspace in self.keyspaces}
+        edited = {}  # keyspace name -> [order, keys, lowest edited index]
+
+        def keys_of(name):
+            if name not in edited:
+                keyspace = current.get(name)
+                edited[name] = [[], [], 0] if keyspace is None else [
+                    list(keyspace["order"]), list(keyspace["keys"]), len(keyspace["keys"])
+                ]
+            return edited[name]
+
+        def remove(name):
+            edit = keys_of(get_keyspace_name(name))
+            order, keys = edit[0], edit[1]
+            # The bucket the key was placed in is not known, so try each
+            for i in range(len(TTL_BUCKETS)):
+                index = bisect.bisect_left(order, (i, name))
+                if index < len(order) and order[index] == (i, name):
+                    del order[index], keys[index]
+                    edit[2] = min(edit[2], index)
+                    return
+
+        for name in changes["removed"]:
+            remove(name)
+        for record in changes["changed"] + changes["added"]:
+            remove(record["name"])
+            edit = keys_of(get_keyspace_name(record["name"]))
+            key = layout_order(record)
+            index = bisect.bisect_left(edit[0], key)
+            edit[0].insert(index, key)
+            edit[1].insert(index, record)
+            edit[2] = min(edit[2], index)
+
+        for name, (order, keys, start) in edited.items():
+            if keys:
+                sizes = current[name]["sizes"] if name in current else None
+                current[name] = self._keyspace(name, order, keys, sizes, start)
+            else:
+                current.pop(name, None)
+        layout = object.__new__(KeyspaceLayout)
+        layout.version = version
+        layout.built_at = self.built_at
+        layout._place([current[name] for name in sorted(current)])
+        return layout
+
+    def query(self, viewport, detail, lod_rows, limit):
+        """Keys near the viewport center, blocks of `lod_rows` rows further out.
+
+        A block is sent key by key when its nearest point is within `detail`
+        of the center, otherwise as one summary. Returns (keyspaces, keys,
+        blocks, truncated) for everything overlapping the viewport.
+        """
+        spacing = LAYOUT_KEY_SPACING
+        per_row = LAYOUT_KEYS_PER_ROW
+        half_width = (per_row - 1) / 2 * spacing
+        min_z = viewport.z - viewport.half_z
+        max_z = viewport.z + viewport.half_z
+        keyspaces, keys, blocks = [], [], []
+        for keyspace in self.keyspaces:
+            count = len(keyspace["keys"])
+            rows = -(-count // per_row)
+            left, right = keyspace["x"] - half_width, keyspace["x"] + half_width
+            if not rows or not viewport.overlaps(left, right, 0, (rows - 1) * spacing):
+                continue
+            keyspaces.append({
+                "name": keyspace["name"],
+                "x": keyspace["x"],
+                "anchor": [keyspace["x"], 15, -15],
+                "count": count,
+                "size": keyspace["sizes"][-1],
+                "rows": rows,
+            })
+            first_row = max(0, math.ceil(min_z / spacing))
+            last_row = min(rows - 1, math.floor(max_z / spacing))
+            for block_row in range(first_row - first_row % lod_rows, last_row + 1, lod_rows):
+                block_rows = min(lod_rows, rows - block_row)
+                near, far = block_row * spacing, (block_row + block_rows - 1) * spacing
+                if not viewport.overlaps(left, right, near, far):
+                    continue
+                if len(keys) + len(blocks) >= limit:
+                    return keyspaces, keys, blocks, True
+                if viewport.distance(left, right, near, far) <= detail:
+                    for row in range(max(block_row, first_row), min(block_row + block_rows - 1, last_row) + 1):
+                        for col in range(per_row):
+                            index = row * per_row + col
+                            if index >= count:
+                                break
+                            x = keyspace["x"] + (col - (per_row - 1) / 2) * spacing
+                            z = row * spacing
+                            if viewport.contains(x, z):
+                                keys.append(dict(keyspace["keys"][index], keyspace=keyspace["name"], x=x, z=z))
+                    continue
+                start, end = block_row * per_row, min((block_row + block_rows) * per_row, count)
+                buckets = {
+                    bucket: max(0, min(end, run_end) - max(start, run_start))
+                    for bucket, (run_start, run_end) in keyspace["runs"].items()
+                }
+                buckets = {bucket: n for bucket, n in buckets.items() if n}
+                blocks.append({
+                    "keyspace": keyspace["name"],
+                    "x": keyspace["x"],
+                    "z": (near + far) / 2,
+                    "width": per_row * spacing,
+                    "depth": block_rows * spacing,
+                    "first_row": block_row,
+                    "rows": block_rows,
+                    "count": end - start,
+                    "size": keyspace["sizes"][end] - keyspace["sizes"][start],
+                    "ttl_buckets": buckets,
+                    "ttl_bucket": max(buckets, key=buckets.get),
+                })
+        return keyspaces, keys, blocks, False
+
+
+layout_lock = threading.Lock()
+current_layout = None
+
+
+def get_layout():
+    """Layout of the current snapshot.
+
+    A new version is applied to the previous layout from the scanner's delta
+    history; the layout is rebuilt from the snapshot when the delta is missing
+    or large, and once TTLs have drifted.
+    """
+    global current_layout
+    with layout_lock:
+        layout = current_layout
+        if layout is not None and time.monotonic() - layout.built_at <= LAYOUT_MAX_AGE:
+            if layout.version == scanner.version:
+                return layout
+            version, changes = scanner.delta(layout.version)
+            if changes is not None and sum(map(len, changes.values())) <= LAYOUT_PATCH_MAX_CHANGES:
+                with phase_seconds.time("layout"):
+                    layout = current_layout = layout.patched(changes, version)
+                return layout
+        with phase_seconds.time("layout"):
+            version = scanner.version
+            records = [record for batch in scanner.iter_snapshot() for record in batch]
+            layout = current_layout = KeyspaceLayout(records, version)
+        return layout
+
+
+def get_keyspace_layout(viewport, detail=LAYOUT_DETAIL_RADIUS, lod_rows=LAYOUT_LOD_ROWS):
+    """Keys and level-of-detail blocks inside `viewport`, with their world positions."""
+    layout = get_layout()
+    keyspaces, keys, blocks, truncated = layout.query(viewport, detail, lod_rows, LAYOUT_MAX_ITEMS)
+    return {
+        "viewport": viewport.describe(),
+        "grid": {
+            "keys_per_row": LAYOUT_KEYS_PER_ROW,
+            "key_spacing": LAYOUT_KEY_SPACING,
+            "keyspace_spacing": LAYOUT_KEYSPACE_SPACING,
+            "detail_radius": detail,
+            "lod_rows": lod_rows,
+        },
+        "keyspaces": keyspaces,
+        "keys": keys,
+        "blocks": blocks,
+        "metadata": {
+            "version": layout.version,
+            "total_keys": layout.total_keys,
+            "returned_keys": len(keys),
+            "returned_blocks": len(blocks),
+            "truncated": truncated,
+            "layout_age_seconds": round(time.monotonic() - layout.built_at, 3),
+            "timestamp": utc_timestamp(),
+        },
+    }
+
+
+def get_keyspace_history(keyspace: Optional[str] = None, start: Optional[float] = None,
+                         end: Optional[float] = None, step: float = 0):
+    """Count, size and TTL bucket series of one keyspace (or the whole database)."""
+    if not history.tracked(keyspace):
+        raise HTTPException(status_code=404, detail=f"No history for keyspace '{keyspace}'")
+    now = time.time()
+    # Zero or negative times are relative to now
+    end = now if end is None else (now + end if end <= 0 else end)
+    start = end - HISTORY_DEFAULT_RANGE if start is None else (now + start if start <= 0 else start)
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    step = max(step, 0)
+    if step and (end - start) / step > HISTORY_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"More than {HISTORY_MAX_POINTS} points; use a larger step")
+
+    rows, resolution = history.query(keyspace, start, end, step)
+    columns = list(zip(*rows)) or [()] * (1 + len(HISTORY_FIELDS))
+    series = {"timestamp": [round(value, 3) for value in columns[0]]}
+    buckets = {}
+    for field, values in zip(HISTORY_FIELDS, columns[1:]):
+        values = [round(value, 2) for value in values]
+        if field in TTL_BUCKETS:
+            buckets[field] = values
         else:
-            keyspace = 'default'
-        
-        # Add key data
-        keyspaces[keyspace]["keys"].append({
-            "name": key,
-            "type": key_type,
-            "ttl": ttl,
-            "size": memory
-        })
-        keyspaces[keyspace]["total_count"] += 1
-        keyspaces[keyspace]["total_size"] += memory
-    
+            series[field] = values
+    series["ttl_buckets"] = buckets
+    return {
+        "keyspace": keyspace,
+        "from": utc_timestamp(start),
+        "to": utc_timestamp(end),
+        "step_seconds": max(step, resolution),
+        "resolution_seconds": resolution,
+        "points": len(rows),
+        "series": series,
+        "metadata": {
+            "timestamp": utc_timestamp(),
+            "history": history.status(),
+        },
+    }
+
+
+def get_keyspace_top(by: str = "memory", limit: int = 20, key_type: Optional[str] = None):
+    """Largest or most accessed keys found by the background analyzer."""
+    check_live()
+    if not TOP_ENABLED:
+        raise HTTPException(status_code=503, detail="Key analyzer is disabled (TOP_ENABLED)")
+    if by not in TOP_RANKINGS:
+        raise HTTPException(status_code=400, detail=f"Unknown ranking '{by}'")
+    if by == "freq" and analyzer.lfu is False:
+        raise HTTPException(
+            status_code=400,
+            detail=f"OBJECT FREQ needs an LFU maxmemory-policy (currently '{analyzer.policy}')",
+        )
+    keys, complete = analyzer.top(by, max(0, min(limit, analyzer.k)), key_type)
+    return {
+        "by": by,
+        "keys": keys,
+        "complete": complete,
+        "metadata": {
+            "timestamp": utc_timestamp(),
+            "analyzer": analyzer.status(),
+        },
+    }
+
+
+def get_keyspace_delta(since: int):
+    """Get keys added, removed or changed since snapshot version `since`.
+
+    Falls back to the full /redis-keyspace document (with "full": true) when the
+    version is no longer covered by the delta history.
+    """
+    version, changes = scanner.delta(since)
+    if changes is None:
+        data = get_keyspace_data()
+        data.update({"version": version, "since": since, "full": True})
+        return data
+
+    def with_keyspace(record):
+        return dict(record, keyspace=get_keyspace_name(record["name"]))
+
+    return {
+        "version": version,
+        "since": since,
+        "full": False,
+        "added": [with_keyspace(record) for record in changes["added"]],
+        "removed": changes["removed"],
+        "changed": [with_keyspace(record) for record in changes["changed"]],
+        "metadata": {
+            "timestamp": utc_timestamp(),
+            "snapshot": scanner.status(),
+        }
+    }
+
+
+def get_keyspace_tree(prefix: str = "", depth: int = 1, limit: int = TREE_MAX_CHILDREN):
+    """Get one level (or `depth` levels) of the key prefix tree below `prefix`."""
+    depth = max(1, min(depth, TREE_MAX_RESPONSE_DEPTH))
+    limit = max(1, min(limit, TREE_MAX_CHILDREN))
+    tree = scanner.tree(prefix, depth, limit)
+    if tree is None:
+        raise HTTPException(status_code=404, detail=f"Prefix '{prefix}' not found")
+
+    tree["metadata"] = {
+        "timestamp": utc_timestamp(),
+        "snapshot": scanner.status(),
+    }
+    return tree
+
+
+def get_keyspace_expiring(within: float = 60, limit: int = 100):
+    """Get the keys expiring in the next `within` seconds, soonest first."""
+    within = max(0.0, within)
+    limit = max(1, min(limit, EXPIRING_MAX_LIMIT))
+    records, truncated = scanner.expiring(within, limit)
     return {
-        "keyspaces": dict(keyspaces),
+        "within_seconds": within,
+        "keys": [dict(record, keyspace=get_keyspace_name(record["name"])) for record in records],
+        "truncated": truncated,
         "metadata": {
-            "total_keys": len(all_keys),
-            "timestamp": datetime.utcnow().isoformat() + "Z"
+            "timestamp": utc_timestamp(),
+            "snapshot": scanner.status(),
         }
     }
 
+
 def get_keyspace_counts():
-    """Count Redis keys grouped by keyspace (legacy function)."""
+    """Count Redis keys grouped by keyspace, from the key tree when it splits on ':'."""
+    counts = scanner.keyspace_counts() if TREE_DELIMITER == ':' and TREE_MAX_DEPTH > 0 else None
+    if counts is not None:
+        return counts
     data = get_keyspace_data()
     return {keyspace: info["total_count"] for keyspace, info in data["keyspaces"].items()}
 
-def get_single_key_data(key_name: str):
-    """Get detailed data for a single Redis key."""
-    # Check if key exists
-    if not r.exists(key_name):
-        raise HTTPException(status_code=404, detail=f"Key '{key_name}' not found")
-    
-    # Get key metadata
-    key_type = r.type(key_name)
-    ttl = r.ttl(key_name)
-    memory = r.memory_usage(key_name) or 0
-    
-    # Get the actual data based on type
+
+def scanned_db():
+    """Logical database the scanner indexes (always 0 on a cluster)."""
+    if RDB_PATH:
+        return RDB_DB
+    return 0 if REDIS_CLUSTER else REDIS_CONNECTION.get("db", 0)
+
+
+db_clients = {}  # db -> client for databases other than the scanned one
+
+
+def get_db_client(db):
+    check_live()
+    if db == scanned_db():
+        return r
+    if REDIS_CLUSTER:
+        raise HTTPException(status_code=400, detail="A cluster only has database 0")
+    client = db_clients.get(db)
+    if client is None:
+        client = db_clients[db] = redis.Redis(**dict(REDIS_CONNECTION, db=db))
+    return client
+
+
+def get_database_counts():
+    """Keys per logical database from INFO keyspace, summed over every shard.
+
+    INFO keyspace is answered from counters Redis keeps anyway, so this costs
+    one command per shard however many keys there are.
+    """
+    check_live()
+    databases = {}
+    shards = get_shard_clients(r)
+    for _, client in shards:
+        for db, info in client.info("keyspace").items():
+            totals = databases.setdefault(db, {"keys": 0, "expires": 0, "avg_ttl_ms": 0})
+            # avg_ttl is per shard; weight it by the keys with an expiry
+            expires = totals["expires"] + info.get("expires", 0)
+            if expires:
+                totals["avg_ttl_ms"] = int(round(
+                    (totals["avg_ttl_ms"] * totals["expires"] + info.get("avg_ttl", 0) * info.get("expires", 0))
+                    / expires
+                ))
+            totals["keys"] += info.get("keys", 0)
+            totals["expires"] = expires
+    return {
+        "databases": dict(sorted(databases.items(), key=lambda item: int(item[0][2:]))),
+        "total_keys": sum(totals["keys"] for totals in databases.values()),
+        "scanned_db": scanned_db(),
+        "nodes": len(shards),
+        "timestamp": utc_timestamp(),
+    }
+
+
+def estimate_prefix_count(client, prefix, samples=COUNTS_SAMPLE_SIZE):
+    """Estimate the keys named `prefix` + ':' + ... from RANDOMKEY samples.
+
+    Samples are split over the shards by their DBSIZE (stratified sampling);
+    shards holding no more keys than their share of samples are counted
+    exactly with SCAN MATCH instead. The interval uses the Agresti-Coull
+    adjusted proportion, so it stays meaningful when no sample matches.
+    Returns (estimate, low, high, samples taken, keys in the database, whether
+    every shard holding keys was counted exactly).
+    """
+    start = prefix + TREE_DELIMITER if prefix else ""
+    shards = [(shard, shard.dbsize()) for _, shard in get_shard_clients(client)]
+    population = sum(size for _, size in shards)
+    z = statistics.NormalDist().inv_cdf((1 + COUNTS_CONFIDENCE) / 2)
+    estimate = variance = 0.0
+    taken = unsampled = 0
+    exact = True
+    for shard, size in shards:
+        if not size:
+            continue
+        n = max(1, round(samples * size / population))
+        if size <= n:
+            estimate += sum(1 for _ in shard.scan_iter(match=glob_escape(start) + "*", count=SCAN_COUNT))
+            continue
+        exact = False
+        pipe = shard.pipeline(transaction=False)
+        for _ in range(n):
+            pipe.randomkey()
+        names = [name for name in pipe.execute() if name is not None]
+        if not names:
+            # The keys expired meanwhile: any number of them may match
+            unsampled += size
+            continue
+        matched = sum(1 for name in names if name.startswith(start))
+        taken += len(names)
+        estimate += size * matched / len(names)
+        adjusted = (matched + 2) / (len(names) + 4)
+        variance += size * size * adjusted * (1 - adjusted) / (len(names) + 4)
+    margin = z * math.sqrt(variance)
+    low, high = max(0.0, estimate - margin), min(float(population), estimate + margin + unsampled)
+    return estimate, low, high, taken, population, exact
+
+
+estimate_cache = {}  # (db, prefix) -> (built_at, result)
+
+
+def get_prefix_count(prefix: str = "", db: Optional[int] = None, method: str = "auto"):
+    """Count the keys under `prefix` in database `db` (default: the scanned one).
+
+    `method=index` counts exactly from the scanner's index, `sample` estimates
+    from RANDOMKEY samples, and `auto` uses the index when it covers `db`.
+    """
+    if method not in ("auto", "index", "sample"):
+        raise HTTPException(status_code=400, detail=f"Unknown method '{method}'")
+    db = scanned_db() if db is None else db
+    prefix = prefix.rstrip(TREE_DELIMITER)
+    result = {"prefix": prefix, "db": db}
+    if method != "sample" and db == scanned_db():
+        count = scanner.prefix_count(prefix)
+        if count is not None:
+            result.update({
+                "method": "index", "count": count, "exact": True,
+                "snapshot_version": scanner.version, "timestamp": utc_timestamp(),
+            })
+            return result
+        if method == "index":
+            raise HTTPException(status_code=503, detail="No keyspace snapshot yet")
+    elif method == "index":
+        raise HTTPException(status_code=400, detail=f"Only database {scanned_db()} is indexed")
+
+    client = get_db_client(db)
+    cached = estimate_cache.get((db, prefix))
+    if cached is not None and time.monotonic() - cached[0] < COUNTS_CACHE_TTL:
+        return cached[1]
+    estimate, low, high, taken, population, exact = estimate_prefix_count(client, prefix)
+    result.update({
+        "method": "sample",
+        "count": int(round(estimate)),
+        "exact": exact,
+        "interval": [int(math.floor(low)), int(math.ceil(high))],
+        "confidence": COUNTS_CONFIDENCE,
+        "samples": taken,
+        "population": population,
+        "timestamp": utc_timestamp(),
+    })
+    if len(estimate_cache) >= 1000:
+        estimate_cache.clear()
+    estimate_cache[(db, prefix)] = (time.monotonic(), result)
+    return result
+
+
+def truncate_element(value):
+    """Cap a collection element at KEY_ELEMENT_MAX_BYTES; returns (value, truncated)."""
+    if not isinstance(value, str) or len(value) <= KEY_ELEMENT_MAX_BYTES:
+        return value, False
+    return value[:KEY_ELEMENT_MAX_BYTES] + "…", True
+
+
+def fit_elements(elements):
+    """Truncate the parts of each element and keep elements while they fit KEY_VALUE_MAX_BYTES.
+
+    Elements are tuples: (item,), (member, score) or (field, value). The first
+    element is always kept. Returns (kept, an element was truncated, all kept).
+    """
+    kept = []
+    page_bytes = 0
+    truncated = False
+    for element in elements:
+        parts = []
+        for part in element:
+            part, cut = truncate_element(part)
+            truncated = truncated or cut
+            parts.append(part)
+        page_bytes += sum(len(part) for part in parts if isinstance(part, str))
+        if kept and page_bytes > KEY_VALUE_MAX_BYTES:
+            return kept, truncated, False
+        kept.append(parts)
+    return kept, truncated, True
+
+
+def decode_string_window(raw):
+    """Decode a GETRANGE window, leaving a multi-byte character cut at the end for the next page.
+
+    Returns (text, bytes consumed).
+    """
+    try:
+        return raw.decode(), len(raw)
+    except UnicodeDecodeError as e:
+        if e.reason == 'unexpected end of data':
+            return raw[:e.start].decode(errors='replace'), e.start
+        return raw.decode(errors='replace'), len(raw)
+
+
+# Reads a JSON document (or the part at a path) only when its size is within the
+# cap; replies {1, text} or {0, size}
+JSON_PAGE_SCRIPT = """
+local size = redis.call('JSON.DEBUG', 'MEMORY', KEYS[1], ARGV[1])
+if type(size) == 'table' then
+    local total = 0
+    for _, part in ipairs(size) do total = total + part end
+    size = total
+end
+if size > tonumber(ARGV[2]) then
+    return {0, size}
+end
+return {1, redis.call('JSON.GET', KEYS[1], ARGV[1])}
+"""
+
+
+def json_too_large(size):
+    return (f"JSON value is about {size:,} bytes, over the {KEY_VALUE_MAX_BYTES:,} byte limit; "
+            f"pass a path to read part of it")
+
+
+def queue_value_page(pipe, key_name, key_type, cursor, count, path=None):
+    """Queue the read of one page of a key's value on `pipe`.
+
+    Returns False for types that cannot be read. The reply is turned into a
+    page by `finish_value_page`.
+    """
     if key_type == 'string':
-        value = r.get(key_name)
+        # Cursor is a byte offset into the string
+        pipe.execute_command(
+            'GETRANGE', key_name, cursor, cursor + KEY_VALUE_MAX_BYTES - 1,
+            **{NEVER_DECODE: []}
+        )
     elif key_type == 'list':
-        value = r.lrange(key_name, 0, -1)
+        # Cursor is an index; the window is cut short once it exceeds the byte cap
+        pipe.lrange(key_name, cursor, cursor + count - 1)
     elif key_type == 'set':
-        value = list(r.smembers(key_name))
+        pipe.sscan(key_name, cursor=cursor, count=count)
     elif key_type == 'zset':
-        value = r.zrange(key_name, 0, -1, withscores=True)
+        pipe.zscan(key_name, cursor=cursor, count=count)
     elif key_type == 'hash':
-        value = r.hgetall(key_name)
+        pipe.hscan(key_name, cursor=cursor, count=count)
     elif key_type == 'ReJSON-RL':
-        # Handle ReJSON (JSON document) data type
-        try:
-            value = r.execute_command('JSON.GET', key_name)
-        except Exception as e:
-            value = f"Error reading JSON: {str(e)}"
+        # Documents over the byte cap are never sent; a path narrows them down
+        pipe.eval(JSON_PAGE_SCRIPT, 1, key_name, path or '.', KEY_VALUE_MAX_BYTES)
+    else:
+        return False
+    return True
+
+
+def finish_value_page(key_type, reply, length, cursor):
+    """Turn the reply queued by `queue_value_page` into (value, next_cursor, truncated).
+
+    `next_cursor` is 0 once the value has been read completely, matching SCAN
+    cursor semantics.
+    """
+    if isinstance(reply, Exception):
+        if key_type == 'ReJSON-RL':
+            return f"Error reading JSON: {str(reply)}", 0, False
+        raise reply
+
+    if key_type == 'string':
+        value, consumed = decode_string_window(reply)
+        next_cursor = cursor + consumed
+        return value, (next_cursor if next_cursor < length else 0), False
+
+    if key_type == 'list':
+        # A list page cut at the byte cap resumes at the first element left out
+        items, truncated, _ = fit_elements((item,) for item in reply)
+        value = [item for item, in items]
+        next_cursor = cursor + len(value)
+        return value, (next_cursor if next_cursor < length else 0), truncated
+
+    # A SCAN page cannot resume part-way, so elements past the byte cap are
+    # left out of it and the page is flagged as truncated
+    if key_type == 'set':
+        next_cursor, members = reply
+        members, truncated, complete = fit_elements((member,) for member in members)
+        return [member for member, in members], next_cursor, truncated or not complete
+
+    if key_type == 'zset':
+        next_cursor, members = reply
+        members, truncated, complete = fit_elements(members)
+        return [tuple(member) for member in members], next_cursor, truncated or not complete
+
+    if key_type == 'hash':
+        next_cursor, fields = reply
+        fields, truncated, complete = fit_elements(fields.items())
+        return dict(fields), next_cursor, truncated or not complete
+
+    # ReJSON-RL: the text itself can still exceed the cap the memory size was checked against
+    found, value = reply
+    if not found:
+        return json_too_large(value), 0, True
+    if value is not None and len(value) > KEY_VALUE_MAX_BYTES:
+        return json_too_large(len(value)), 0, True
+    return value, 0, False
+
+
+def value_page_response(key_name, key_type, ttl, size, length, cursor, page):
+    """Key detail record shared by /redis-key and POST /redis-keys."""
+    value, next_cursor, truncated = page
+    if key_type in ('list', 'set', 'zset', 'hash'):
+        returned = len(value)
     else:
-        value = f"Unsupported type: {key_type}"
-    
+        returned = len(value) if isinstance(value, str) else 0
     return {
         "key": key_name,
         "type": key_type,
         "ttl": ttl,
-        "size": memory,
+        "size": size,
+        "length": length,
         "value": value,
+        "page": {
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+            "returned": returned,
+            "truncated": truncated,
+        },
+    }
+
+
+async def get_key_value_page(key_name, key_type, length, cursor, count, path):
+    """Read one page of a key's value; returns (value, next_cursor, truncated)."""
+    pipe = ar.pipeline(transaction=False)
+    if not queue_value_page(pipe, key_name, key_type, cursor, count, path):
+        return f"Unsupported type: {key_type}", 0, False
+    reply, = await pipe.execute(raise_on_error=False)
+    return finish_value_page(key_type, reply, length, cursor)
+
+
+async def get_single_key_data(key_name: str, cursor: int = 0, count: int = KEY_PAGE_SIZE,
+                              path: Optional[str] = None):
+    """Get detailed data for a single Redis key, one page of its value at a time."""
+    started = time.perf_counter()
+    # Check if key exists
+    if not await ar.exists(key_name):
+        raise HTTPException(status_code=404, detail=f"Key '{key_name}' not found")
+
+    count = max(1, min(count, KEY_PAGE_MAX_SIZE))
+
+    # Get key metadata
+    key_type = await ar.type(key_name)
+    ttl = await ar.ttl(key_name)
+    memory = await ar.memory_usage(key_name) or 0
+    length = None
+    if key_type in LENGTH_COMMANDS:
+        length = await ar.execute_command(LENGTH_COMMANDS[key_type], key_name)
+
+    page = await get_key_value_page(key_name, key_type, length, cursor, count, path)
+    key_detail_seconds.observe(time.perf_counter() - started, key_type)
+
+    data = value_page_response(key_name, key_type, ttl, memory, length, cursor, page)
+    data["metadata"] = {
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+    return data
+
+
+async def get_multiple_key_data(names, count: int = KEY_BATCH_PAGE_SIZE):
+    """Get detailed data for many keys in two pipelined round trips.
+
+    The first pipeline reads TYPE, TTL and MEMORY USAGE of every key (TYPE
+    "none" doubles as the existence check); the second reads the length and
+    the first page of each value, grouped by type. Errors on one key are
+    reported on its record instead of failing the batch. Once the values add
+    up to KEY_BATCH_MAX_BYTES, the remaining keys are returned without theirs.
+    """
+    started = time.perf_counter()
+    names = list(dict.fromkeys(names))
+    count = max(1, min(count, KEY_PAGE_MAX_SIZE))
+
+    pipe = ar.pipeline(transaction=False)
+    for name in names:
+        pipe.type(name)
+        pipe.ttl(name)
+        pipe.memory_usage(name)
+    replies = await pipe.execute(raise_on_error=False)
+
+    metadata = {}
+    errors = {}
+    missing = []
+    for i, name in enumerate(names):
+        key_type, ttl, memory = replies[3 * i:3 * i + 3]
+        failed = next((reply for reply in (key_type, ttl, memory) if isinstance(reply, Exception)), None)
+        if failed is not None:
+            errors[name] = str(failed)
+        elif key_type == "none":
+            missing.append(name)
+        else:
+            metadata[name] = (key_type, ttl, memory or 0)
+
+    by_type = defaultdict(list)
+    for name, (key_type, _, _) in metadata.items():
+        by_type[key_type].append(name)
+
+    pipe = ar.pipeline(transaction=False)
+    queued = []
+    for key_type, type_names in by_type.items():
+        for name in type_names:
+            has_length = key_type in LENGTH_COMMANDS
+            if has_length:
+                pipe.execute_command(LENGTH_COMMANDS[key_type], name)
+            readable = queue_value_page(pipe, name, key_type, 0, count)
+            queued.append((name, has_length, readable))
+    replies = iter(await pipe.execute(raise_on_error=False))
+
+    records = {}
+    for name, has_length, readable in queued:
+        key_type, ttl, memory = metadata[name]
+        length = next(replies) if has_length else None
+        reply = next(replies) if readable else None
+        try:
+            if isinstance(length, Exception):
+                raise length
+            if readable:
+                page = finish_value_page(key_type, reply, length, 0)
+            else:
+                page = (f"Unsupported type: {key_type}", 0, False)
+        except redis.RedisError as e:
+            # Typically the key changed type between the two round trips
+            errors[name] = str(e)
+            continue
+        records[name] = value_page_response(name, key_type, ttl, memory, length, 0, page)
+
+    # Values are budgeted in request order, so the first keys asked for win
+    budget = KEY_BATCH_MAX_BYTES
+    omitted = []
+    for name in names:
+        record = records.get(name)
+        if record is None:
+            continue
+        value_bytes = len(dump_json(record["value"]))
+        if value_bytes > budget:
+            budget = 0
+            record["value"] = None
+            record["page"].update(next_cursor=0, returned=0, truncated=True)
+            omitted.append(name)
+        else:
+            budget -= value_bytes
+
+    if errors:
+        redis_errors_total.inc(len(errors), label_value="key_batch")
+    key_batch_seconds.observe(time.perf_counter() - started)
+
+    return {
+        "keys": [records[name] for name in names if name in records],
+        "missing": missing,
+        "errors": errors,
         "metadata": {
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "requested": len(names),
+            "found": len(records),
+            "omitted": omitted,
+        },
     }
 
+
+def profile_call(func, *args):
+    """Run `func(*args)` under cProfile and return the summary as the response."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        func(*args)
+    finally:
+        profiler.disable()
+    return PlainTextResponse(profile_report(profiler))
+
+
+def check_profile_enabled():
+    if not PROFILE_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled (PROFILE_ENABLED)")
+
+
 @app.get("/redis-keyspace")
-def get_redis_keyspace():
-    """Get detailed Redis keyspace data for Roblox visualization."""
-    return get_keyspace_data()
+async def get_redis_keyspace(request: Request, mode: str = "keys", top: int = 0,
+                             format: Optional[str] = None, live: bool = False,
+                             profile: bool = False, pattern: Optional[str] = None,
+                             prefix: Optional[str] = None, type: Optional[str] = None,
+                             keyspace: Optional[str] = None, ttl_min: Optional[float] = None,
+                             ttl_max: Optional[float] = None, size_min: Optional[int] = None,
+                             size_max: Optional[int] = None, sort: Optional[str] = None,
+                             desc: bool = False, limit: Optional[int] = None,
+                             cursor: Optional[str] = None):
+    """Get detailed Redis keyspace data for Roblox visualization.
+
+    `mode=aggregate` returns per-keyspace histograms instead of per-key records,
+    with the `top` largest and soonest-expiring keys of each keyspace.
+    `format=columnar` (or the columnar Accept type) returns per-key records in
+    the compact binary format. Responses are shared through the response cache
+    and carry an ETag. `format=ndjson` streams one line per key instead, from a
+    new SCAN as it runs when `live` is set. `profile=1` builds the response
+    uncached under cProfile and returns the profile instead.
+
+    The filters (`pattern`, `prefix`, `type`, `keyspace`, `ttl_min`/`ttl_max`,
+    `size_min`/`size_max`) select keys in keys mode. `sort`, `desc`, `limit`
+    and `cursor` return one page at a time; pass `metadata.query.next_cursor`
+    as `cursor` for the next page. With `live`, pages come from a new SCAN with
+    the filters pushed down into SCAN MATCH/TYPE, in SCAN order.
+    """
+    if profile:
+        check_profile_enabled()
+    if live:
+        check_live()
+    query = KeyQuery(pattern, prefix, type, keyspace, ttl_min, ttl_max, size_min, size_max)
+    paged = sort is not None or limit is not None or cursor is not None
+    if mode == "aggregate":
+        if query.active or paged:
+            raise HTTPException(status_code=400, detail="Filters and paging apply to mode=keys only")
+        top = max(0, min(top, AGGREGATE_MAX_TOP))
+
+        def build():
+            return get_keyspace_aggregates(top)
+
+        if profile:
+            return await run_in_threadpool(
+                profile_call, response_cache._serialize, build, "json", negotiate_encoding(request)
+            )
+        return await response_cache.respond(request, ("aggregate", top), build)
+    if mode != "keys":
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'")
+    fmt = negotiate_format(request, format)
+    if fmt == "ndjson":
+        if paged:
+            raise HTTPException(status_code=400, detail="sort, limit and cursor do not apply to format=ndjson")
+        if profile:
+            return await run_in_threadpool(profile_call, lambda: sum(map(len, iter_keyspace_ndjson(live, query))))
+        # Streamed responses are neither cached nor compressed; the sync
+        # generator runs in the threadpool so SCAN never blocks the event loop
+        return StreamingResponse(iter_keyspace_ndjson(live, query), media_type=NDJSON_MEDIA_TYPE)
+
+    cache_key = ("keys",)
+    build = get_keyspace_data
+    if query.active or paged or live:
+        if sort is not None and sort not in QUERY_SORTS:
+            raise HTTPException(status_code=400, detail=f"Unknown sort '{sort}'")
+        limit = max(1, min(limit or QUERY_PAGE_SIZE, QUERY_MAX_PAGE_SIZE))
+        if live:
+            if sort is not None:
+                raise HTTPException(status_code=400, detail="live pages come in SCAN order; drop sort")
+            position = decode_query_cursor(cursor, None)
+            cache_key = None
+
+            def build():
+                return get_keyspace_live_page(query, position, limit)
+        else:
+            sort = sort or "name"
+            after = decode_query_cursor(cursor, sort)
+            cache_key = ("query", tuple(query.describe().values()), sort, desc, limit, cursor)
+
+            def build():
+                return get_keyspace_page(query, sort, desc, after, limit)
+
+    if profile:
+        return await run_in_threadpool(
+            profile_call, response_cache._serialize, build, fmt, negotiate_encoding(request)
+        )
+    if cache_key is None:
+        return await uncached_response(request, build, fmt)
+    return await response_cache.respond(request, cache_key, build, fmt)
+
+
+@app.get("/redis-keyspace/cache")
+async def get_redis_keyspace_cache():
+    """Get response cache hit/miss/coalesced counters."""
+    return response_cache.status()
+
+
+@app.get("/redis-keyspace/delta")
+async def get_redis_keyspace_delta(since: int = 0, wait: float = 0):
+    """Get only the keys that changed since a snapshot version.
+
+    With `wait`, long-poll: answer as soon as a version after `since` is
+    published, or with an empty delta after `wait` seconds (at most
+    LONG_POLL_MAX_WAIT).
+    """
+    if wait <= 0:
+        return await run_in_threadpool(get_keyspace_delta, since)
+    if broadcaster.full:
+        raise HTTPException(status_code=503, detail="Too many push subscribers")
+    with broadcaster.subscribe():
+        if await broadcaster.wait(since, min(wait, LONG_POLL_MAX_WAIT)) != since:
+            await asyncio.sleep(PUSH_COALESCE_INTERVAL)
+    _, body = await broadcaster.payload(since)
+    push_updates_total.inc(label_value="long_poll")
+    return Response(content=body, media_type="application/json")
+
+
+async def iter_keyspace_events(since):
+    """Server-Sent Events: one `delta` event per merged change set, id = its version."""
+    with broadcaster.subscribe():
+        async for update in broadcaster.updates(since, PUSH_HEARTBEAT_INTERVAL):
+            if update is None:
+                yield b": keepalive\n\n"
+                continue
+            version, body = update
+            chunk = b"event: delta\nid: %d\ndata: " % version + body + b"\n\n"
+            response_bytes_total.inc(len(chunk), "keyspace_events")
+            push_updates_total.inc(label_value="sse")
+            yield chunk
+
+
+@app.get("/redis-keyspace/events")
+async def get_redis_keyspace_events(request: Request, since: int = 0):
+    """Stream keyspace deltas as Server-Sent Events.
+
+    The first event brings the client from `since` (0: a full snapshot) to the
+    current version; reconnecting clients resume from Last-Event-ID.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    if broadcaster.full:
+        raise HTTPException(status_code=503, detail="Too many push subscribers")
+    return StreamingResponse(
+        iter_keyspace_events(since), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def send_keyspace_updates(websocket, since):
+    async for version, body in broadcaster.updates(since):
+        await websocket.send_text(body.decode("utf-8"))
+        response_bytes_total.inc(len(body), "keyspace_ws")
+        push_updates_total.inc(label_value="websocket")
+
+
+async def drain_websocket(websocket):
+    """Read (and ignore) client messages until the client disconnects."""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@app.websocket("/redis-keyspace/ws")
+async def redis_keyspace_ws(websocket: WebSocket, since: int = 0):
+    """Push keyspace deltas over a WebSocket, one JSON message per merged change set."""
+    if broadcaster.full:
+        await websocket.close(code=1013)  # Try again later
+        return
+    await websocket.accept()
+    with broadcaster.subscribe():
+        sender = asyncio.ensure_future(send_keyspace_updates(websocket, since))
+        receiver = asyncio.ensure_future(drain_websocket(websocket))
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if sender in done and sender.exception() is not None:
+            if isinstance(sender.exception(), redis.RedisError):
+                redis_errors_total.inc(label_value="push")
+            try:
+                await websocket.close(code=1011)  # Internal error
+            except RuntimeError:
+                pass  # The client closed first
+
+
+@app.get("/redis-keyspace/tree")
+async def get_redis_keyspace_tree(prefix: str = "", depth: int = 1, limit: int = TREE_MAX_CHILDREN):
+    """Browse the keyspace as a prefix tree, one level of children at a time."""
+    return await run_in_threadpool(get_keyspace_tree, prefix, depth, limit)
+
+
+@app.get("/redis-keyspace/layout")
+async def get_redis_keyspace_layout(x: Optional[float] = None, z: Optional[float] = None,
+                                    radius: Optional[float] = None, min_x: Optional[float] = None,
+                                    max_x: Optional[float] = None, min_z: Optional[float] = None,
+                                    max_z: Optional[float] = None, detail: float = LAYOUT_DETAIL_RADIUS,
+                                    lod: int = LAYOUT_LOD_ROWS):
+    """Get world positions of the keys inside a viewport, far cells merged into blocks.
+
+    The viewport is a circle (`x`, `z`, `radius`) or a box (`min_x`, `max_x`,
+    `min_z`, `max_z`). Cells within `detail` studs of its center are returned
+    key by key; further ones as blocks of `lod` grid rows.
+    """
+    if None not in (x, z, radius):
+        if not 0 <= radius <= LAYOUT_MAX_RADIUS:
+            raise HTTPException(status_code=400, detail=f"radius must be within 0..{LAYOUT_MAX_RADIUS}")
+        viewport = Viewport(x, z, radius=radius)
+    elif None not in (min_x, max_x, min_z, max_z):
+        half_x, half_z = (max_x - min_x) / 2, (max_z - min_z) / 2
+        if not (0 <= half_x <= LAYOUT_MAX_RADIUS and 0 <= half_z <= LAYOUT_MAX_RADIUS):
+            raise HTTPException(status_code=400, detail=f"Box sides must be within 0..{2 * LAYOUT_MAX_RADIUS}")
+        viewport = Viewport(min_x + half_x, min_z + half_z, half_x=half_x, half_z=half_z)
+    else:
+        raise HTTPException(status_code=400, detail="Pass x, z and radius, or min_x, max_x, min_z and max_z")
+    return await run_in_threadpool(get_keyspace_layout, viewport, max(0.0, detail), max(1, lod))
+
+
+@app.get("/redis-keyspace/history")
+async def get_redis_keyspace_history(keyspace: Optional[str] = None,
+                                     start: Optional[float] = Query(None, alias="from"),
+                                     end: Optional[float] = Query(None, alias="to"), step: float = 0):
+    """Get how a keyspace's key count, size and TTL bucket mix changed over time.
+
+    `from` and `to` are Unix timestamps, or seconds relative to now when zero
+    or negative (`from=-3600` is the last hour). `step` merges points into
+    buckets of that many seconds. Without `keyspace`, the whole database.
+    """
+    return await run_in_threadpool(get_keyspace_history, keyspace, start, end, step)
+
+
+@app.get("/redis-keyspace/top")
+async def get_redis_keyspace_top(by: str = "memory", limit: int = 20, type: Optional[str] = None):
+    """Get the biggest keys (`by=memory` or `by=length`) or the hottest (`by=freq`, LFU only).
+
+    Served from the background analyzer's last complete pass; no key is read
+    on request.
+    """
+    return await run_in_threadpool(get_keyspace_top, by, limit, type)
+
+
+@app.get("/redis-keyspace/expiring")
+async def get_redis_keyspace_expiring(within: float = 60, limit: int = 100):
+    """Get the keys that expire in the next `within` seconds, soonest first."""
+    return await run_in_threadpool(get_keyspace_expiring, within, limit)
+
 
 @app.get("/redis-keyspace/counts")
-def get_redis_keyspace_counts():
+async def get_redis_keyspace_counts():
     """Get Redis keyspace counts only."""
-    return get_keyspace_counts()
+    return await run_in_threadpool(get_keyspace_counts)
+
+
+@app.get("/redis-keyspace/counts/databases")
+async def get_redis_keyspace_database_counts():
+    """Get key counts of every logical database from INFO keyspace."""
+    return await run_in_threadpool(get_database_counts)
+
+
+@app.get("/redis-keyspace/counts/prefix")
+async def get_redis_keyspace_prefix_count(prefix: str = "", db: Optional[int] = None, method: str = "auto"):
+    """Get the number of keys under a prefix, exact from the index or estimated by sampling."""
+    return await run_in_threadpool(get_prefix_count, prefix, db, method)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: per-phase timings, counters and snapshot gauges."""
+    return PlainTextResponse(await run_in_threadpool(render_metrics), media_type="text/plain; version=0.0.4")
+
+
+class KeyBatchRequest(BaseModel):
+    keys: List[str]
+    count: int = KEY_BATCH_PAGE_SIZE
+
+
+@app.post("/redis-keys")
+async def get_redis_keys(batch: KeyBatchRequest, profile: bool = False):
+    """Get detailed data for up to KEY_BATCH_MAX_KEYS keys at once.
+
+    Each record matches /redis-key with the first `count` elements of the
+    value; read further pages from /redis-key with its `next_cursor`. Keys that
+    do not exist are listed under `missing`.
+    """
+    check_live()
+    if len(batch.keys) > KEY_BATCH_MAX_KEYS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {KEY_BATCH_MAX_KEYS} keys per request"
+        )
+    profiler = None
+    if profile:
+        check_profile_enabled()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        data = await get_multiple_key_data(batch.keys, batch.count)
+    except redis.RedisError:
+        redis_errors_total.inc(label_value="key_batch")
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    if profiler is not None:
+        return PlainTextResponse(profile_report(profiler))
+    return data
+
 
 @app.get("/redis-key/{key_name:path}")
-def get_redis_key(key_name: str):
-    """Get detailed data for a specific Redis key."""
-    return get_single_key_data(key_name)
+async def get_redis_key(key_name: str, cursor: int = 0, count: int = KEY_PAGE_SIZE,
+                        path: Optional[str] = None, profile: bool = False):
+    """Get detailed data for a specific Redis key.
+
+    Pass `next_cursor` from the previous response as `cursor` to read the next page.
+    `profile=1` returns a cProfile summary of the request instead; other requests
+    running on the event loop meanwhile show up in it too.
+    """
+    check_live()
+    profiler = None
+    if profile:
+        check_profile_enabled()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        data = await get_single_key_data(key_name, cursor, count, path)
+    except redis.RedisError:
+        redis_errors_total.inc(label_value="key_detail")
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    if profiler is not None:
+        return PlainTextResponse(profile_report(profiler))
+    return data
+
 
 if __name__ == "__main__":
+    # No background thread when run as a script - do one sweep (or load) up front
+    if RDB_PATH:
+        load_rdb()
+    else:
+        scanner.sweep()
     keyspace_counts = get_keyspace_counts()
-    
+
     print("Keyspace Counts:")
     for keyspace, count in keyspace_counts.items():
         print(f"{keyspace}: {count} keys")
@@ -169,6 +169,15 @@ local function createKeyDataModal(keyData)
     dataText = dataText .. "│ Type: " .. keyData.type .. "\n"
     dataText = dataText .. "│ TTL: " .. (keyData.ttl == -1 and "No Expiry" or keyData.ttl .. " seconds") .. "\n"
     dataText = dataText .. "│ Size: " .. string.format("%.1f KB", keyData.size / 1024) .. "\n"
+    if keyData.length and keyData.page then
+        -- Large values are paged by the API; show how much of the key is displayed
+        local unit = keyData.type == "string" and "bytes" or "elements"
+        dataText = dataText .. "│ Showing: " .. keyData.page.returned .. " of " .. keyData.length .. " " .. unit
+        if keyData.page.next_cursor ~= 0 or keyData.page.truncated then
+            dataText = dataText .. " (truncated)"
+        end
+        dataText = dataText .. "\n"
+    end
     dataText = dataText .. "│ Updated: " .. keyData.metadata.timestamp .. "\n"
     dataText = dataText .. "└────────────────────────────────────────────────────┘\n\n"
     
@@ -9,12 +9,14 @@ local Workspace = game.Workspace
 
 -- Configuration - UPDATE THESE URLs TO YOUR SERVER
 local API_URL = "https://your-ngrok-url.app/redis-keyspace"  -- Update this to your server URL
+local DELTA_API_URL = "https://your-ngrok-url.app/redis-keyspace/delta"  -- URL for incremental updates
 local KEY_API_URL = "https://your-ngrok-url.app/redis-key/"  -- URL for individual key data
 local VISUALIZATION_FOLDER = "RedisVisualization"
 local PART_SIZE = 8       -- Fixed size for all parts
 local KEYSPACE_SPACING = 20  -- Distance between keyspaces
 local KEY_SPACING = 15    -- Distance between keys within a keyspace
-local REFRESH_INTERVAL = 3  -- Seconds between updates
+local REFRESH_INTERVAL = 3  -- Seconds to wait before retrying a failed update
+local LONG_POLL_WAIT = 20  -- Seconds the server may hold a delta request open until something changes
 
 -- Create RemoteEvents for client communication
 local showKeyDataRemote = Instance.new("RemoteEvent")
@@ -25,6 +27,17 @@ showKeyDataRemote.Parent = ReplicatedStorage
 local existingParts = {}  -- keyName -> part instance
 local existingKeyspaceAnchors = {}  -- keyspaceName -> anchor part
 
+-- Local copy of the keyspace, kept current by applying deltas from the API.
+-- Keys are kept grouped by keyspace so a delta only touches the keyspaces it names.
+local knownVersion = 0  -- Snapshot version the local copy matches
+local knownKeyspaces = {}  -- keyspaceName -> {keys = {keyName -> keyData}, total_count, total_size}
+local knownKeyCount = 0
+
+-- Changes applied to the local copy but not yet rendered
+local dirtyKeyspaces = {}  -- keyspaceName -> true when its keys must be laid out again
+local removedKeys = {}  -- keyName -> true for keys whose parts must be removed
+local keyspacesMoved = false  -- A keyspace appeared or disappeared, so the others shift along X
+
 -- TTL-based color mapping
 local TTL_COLORS = {
     NO_EXPIRY = Color3.fromRGB(0, 100, 255),    -- Blue for ttl = -1
@@ -393,10 +406,101 @@ local function createOrUpdateKeyspaceVisualization(keyspaceName, keyspaceData, b
     return folder, totalRows
 end
 
--- Fetch data from Redis API
+-- Keyspace of a key name, the same way /redis-keyspace groups keys
+local function getKeyspaceName(keyName)
+    return string.match(keyName, "^([^:]*):") or "default"
+end
+
+-- Remove a key from the local copy
+local function forgetKey(keyName)
+    local keyspaceName = getKeyspaceName(keyName)
+    local keyspace = knownKeyspaces[keyspaceName]
+    local keyData = keyspace and keyspace.keys[keyName]
+    if not keyData then
+        return
+    end
+    keyspace.keys[keyName] = nil
+    keyspace.total_count = keyspace.total_count - 1
+    keyspace.total_size = keyspace.total_size - (keyData.size or 0)
+    knownKeyCount = knownKeyCount - 1
+    if keyspace.total_count == 0 then
+        knownKeyspaces[keyspaceName] = nil
+        keyspacesMoved = true
+    end
+    dirtyKeyspaces[keyspaceName] = true
+    removedKeys[keyName] = true
+end
+
+-- Add or replace a key in the local copy
+local function storeKey(keyData)
+    local keyspaceName = getKeyspaceName(keyData.name)
+    local keyspace = knownKeyspaces[keyspaceName]
+    if not keyspace then
+        keyspace = {keys = {}, total_count = 0, total_size = 0}
+        knownKeyspaces[keyspaceName] = keyspace
+        keyspacesMoved = true
+    end
+    local oldData = keyspace.keys[keyData.name]
+    if oldData then
+        keyspace.total_size = keyspace.total_size - (oldData.size or 0)
+    else
+        keyspace.total_count = keyspace.total_count + 1
+        knownKeyCount = knownKeyCount + 1
+    end
+    keyspace.keys[keyData.name] = keyData
+    keyspace.total_size = keyspace.total_size + (keyData.size or 0)
+    dirtyKeyspaces[keyspaceName] = true
+    removedKeys[keyData.name] = nil
+end
+
+-- Apply a delta (or full snapshot) response to the local key copy,
+-- marking the keyspaces it touches for the next render
+local function applyKeyspaceDelta(delta)
+    if delta.full then
+        local previousKeyspaces = knownKeyspaces
+        knownKeyspaces = {}
+        knownKeyCount = 0
+        for _, keyspaceData in pairs(delta.keyspaces) do
+            for _, keyData in ipairs(keyspaceData.keys) do
+                storeKey(keyData)
+            end
+        end
+        for keyspaceName, keyspace in pairs(previousKeyspaces) do
+            dirtyKeyspaces[keyspaceName] = true
+            for keyName in pairs(keyspace.keys) do
+                local current = knownKeyspaces[keyspaceName]
+                if not (current and current.keys[keyName]) then
+                    removedKeys[keyName] = true
+                end
+            end
+        end
+        keyspacesMoved = true
+    else
+        for _, keyName in ipairs(delta.removed) do
+            forgetKey(keyName)
+        end
+        for _, keyData in ipairs(delta.added) do
+            storeKey(keyData)
+        end
+        for _, keyData in ipairs(delta.changed) do
+            storeKey(keyData)
+        end
+    end
+    knownVersion = delta.version
+end
+
+-- Whether a delta response changes the local key copy
+local function deltaHasChanges(delta)
+    return delta.full or #delta.added > 0 or #delta.removed > 0 or #delta.changed > 0
+end
+
+-- Fetch data from Redis API (only the changes since the last fetch).
+-- The request is a long poll: the server answers as soon as the keyspace
+-- changes, or with an empty delta after LONG_POLL_WAIT seconds.
+-- Returns true when the local copy changed, false when nothing changed, or nil on failure.
 local function fetchRedisData()
     local success, response = pcall(function()
-        return HttpService:GetAsync(API_URL)
+        return HttpService:GetAsync(DELTA_API_URL .. "?since=" .. knownVersion .. "&wait=" .. LONG_POLL_WAIT)
     end)
     
     if not success then
@@ -413,11 +517,14 @@ local function fetchRedisData()
         return nil
     end
     
-    return data
+    local changed = deltaHasChanges(data)
+    applyKeyspaceDelta(data)
+    return changed
 end
 
--- Smart update of the visualization
-local function updateVisualizationSmart(data)
+-- Smart update of the visualization: only keyspaces marked dirty are laid
+-- out again, unless a keyspace appeared or disappeared and the rest moved
+local function updateVisualizationSmart()
     -- Get or create main folder
     local mainFolder = Workspace:FindFirstChild(VISUALIZATION_FOLDER)
     if not mainFolder then
@@ -426,37 +533,20 @@ local function updateVisualizationSmart(data)
         mainFolder.Parent = Workspace
     end
     
-    -- Keep track of current keys to identify removed ones
-    local currentKeys = {}
-    for keyspaceName, keyspaceData in pairs(data.keyspaces) do
-        for _, keyData in ipairs(keyspaceData.keys) do
-            currentKeys[keyData.name] = true
-        end
-    end
-    
-    -- Remove parts for keys that no longer exist (with animation)
-    local partsToRemove = {}
-    for keyName, part in pairs(existingParts) do
-        if not currentKeys[keyName] then
-            table.insert(partsToRemove, {keyName = keyName, part = part})
-        end
-    end
-    
-    -- Animate removal of expired parts
-    for _, removeData in ipairs(partsToRemove) do
-        if removeData.part and removeData.part.Parent then
-            -- Animate removal, then clean up tracking
-            animatePartRemoval(removeData.part, function()
-                existingParts[removeData.keyName] = nil
-            end)
-        else
-            existingParts[removeData.keyName] = nil
+    -- Animate removal of parts for keys that no longer exist
+    for keyName in pairs(removedKeys) do
+        local part = existingParts[keyName]
+        -- Stop tracking right away, so a key that comes back gets a new part
+        existingParts[keyName] = nil
+        if part and part.Parent then
+            animatePartRemoval(part)
         end
     end
+    removedKeys = {}
     
     -- Remove keyspace anchors that no longer exist
     for keyspaceName, anchor in pairs(existingKeyspaceAnchors) do
-        if not data.keyspaces[keyspaceName] then
+        if not knownKeyspaces[keyspaceName] then
             if anchor and anchor.Parent then
                 anchor:Destroy()
             end
@@ -470,51 +560,60 @@ local function updateVisualizationSmart(data)
         end
     end
     
-    -- Create or update visualization for each keyspace
-    local currentXOffset = 0
-    
-    for keyspaceName, keyspaceData in pairs(data.keyspaces) do
-        local basePosition = Vector3.new(currentXOffset, 0, 0)
-        createOrUpdateKeyspaceVisualization(keyspaceName, keyspaceData, basePosition, mainFolder)
-        
-        -- Calculate next X offset based on the grid width (5 keys per row)
-        local keysPerRow = 5
-        local keyspaceWidth = keysPerRow * KEY_SPACING
-        currentXOffset = currentXOffset + keyspaceWidth + KEYSPACE_SPACING
+    -- Keyspaces sit side by side in name order, like /redis-keyspace/layout places them
+    local keyspaceNames = {}
+    for keyspaceName in pairs(knownKeyspaces) do
+        table.insert(keyspaceNames, keyspaceName)
     end
+    table.sort(keyspaceNames)
+    
+    local keysPerRow = 5
+    local keyspaceWidth = keysPerRow * KEY_SPACING
+    local rendered = 0
+    for i, keyspaceName in ipairs(keyspaceNames) do
+        if keyspacesMoved or dirtyKeyspaces[keyspaceName] then
+            local keys = {}
+            for _, keyData in pairs(knownKeyspaces[keyspaceName].keys) do
+                table.insert(keys, keyData)
+            end
+            local basePosition = Vector3.new((i - 1) * (keyspaceWidth + KEYSPACE_SPACING), 0, 0)
+            createOrUpdateKeyspaceVisualization(keyspaceName, {keys = keys}, basePosition, mainFolder)
+            rendered = rendered + 1
+        end
+    end
+    dirtyKeyspaces = {}
+    keyspacesMoved = false
     
-    local keyspaceCount = 0
-    for _ in pairs(data.keyspaces) do keyspaceCount = keyspaceCount + 1 end
-    
-    print(string.format("Redis visualization updated: %d keyspaces, %d total keys", 
-                       keyspaceCount, data.metadata.total_keys))
+    print(string.format("Redis visualization updated: %d of %d keyspaces redrawn, %d total keys",
+                       rendered, #keyspaceNames, knownKeyCount))
 end
 
--- Main update function
+-- Main update function; returns false if the update failed
 local function updateVisualization()
-    print("Fetching Redis data...")
-    local data = fetchRedisData()
+    local changed = fetchRedisData()
     
-    if data then
-        updateVisualizationSmart(data)
-    else
+    if changed then
+        updateVisualizationSmart()
+    elseif changed == nil then
         warn("Failed to update Redis visualization")
+        return false
     end
+    return true
 end
 
--- Initial visualization
-updateVisualization()
-
--- Set up periodic updates
+-- Initial visualization and updates: each request waits on the server until
+-- the keyspace changes, so updates arrive as they happen instead of every few seconds
 spawn(function()
     while true do
-        wait(REFRESH_INTERVAL)
-        updateVisualization()
+        if not updateVisualization() then
+            wait(REFRESH_INTERVAL)
+        end
     end
 end)
 
 print("Redis Keyspace Visualizer Server initialized!")
 print("Configuration:")
 print("  API URL: " .. API_URL)
-print("  Refresh Interval: " .. REFRESH_INTERVAL .. " seconds")
+print("  Delta API URL: " .. DELTA_API_URL)
+print("  Long Poll Wait: " .. LONG_POLL_WAIT .. " seconds")
 print("  Part Size: " .. PART_SIZE .. " studs")
\ No newline at end of file
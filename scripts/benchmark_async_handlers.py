@@ -0,0 +1,165 @@
+"""
+Async vs Sync Handler Benchmark
+Compares requests/sec and latency percentiles of the async API handlers
+(redis.asyncio + bounded connection pool) against the previous sync handlers
+(`def` endpoints sharing one redis.Redis client in the threadpool).
+
+Both apps are served by uvicorn on local ports and loaded with the same number
+of concurrent clients. Requires httpx and uvicorn.
+
+Usage:
+    python scripts/benchmark_async_handlers.py --requests 2000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main  # noqa: E402
+
+
+def create_sync_app():
+    """The handlers as they were before the async code path: sync `def`s on `main.r`."""
+    sync_app = FastAPI(title="Sync baseline")
+    r = main.r
+
+    @sync_app.get("/redis-keyspace")
+    def get_redis_keyspace():
+        return main.get_keyspace_data()
+
+    @sync_app.get("/redis-key/{key_name:path}")
+    def get_redis_key(key_name: str):
+        if not r.exists(key_name):
+            raise HTTPException(status_code=404, detail=f"Key '{key_name}' not found")
+
+        key_type = r.type(key_name)
+        ttl = r.ttl(key_name)
+        memory = r.memory_usage(key_name) or 0
+
+        if key_type == 'string':
+            value = r.get(key_name)
+        elif key_type == 'list':
+            value = r.lrange(key_name, 0, -1)
+        elif key_type == 'set':
+            value = list(r.smembers(key_name))
+        elif key_type == 'zset':
+            value = r.zrange(key_name, 0, -1, withscores=True)
+        elif key_type == 'hash':
+            value = r.hgetall(key_name)
+        else:
+            value = f"Unsupported type: {key_type}"
+
+        return {"key": key_name, "type": key_type, "ttl": ttl, "size": memory, "value": value}
+
+    return sync_app
+
+
+def serve(app, port):
+    """Run an app with uvicorn in a background thread and wait until it is up."""
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def run_load(base_url, paths, total_requests, concurrency):
+    """Issue `total_requests` GETs over `concurrency` workers; return latencies and wall time."""
+    latencies = []
+    errors = 0
+    counter = iter(range(total_requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                response = await client.get(paths[i % len(paths)])
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, elapsed, errors
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def report(label, latencies, elapsed, errors):
+    print(
+        f"  {label:<6} {len(latencies) / elapsed:>9.1f} req/s"
+        f"  p50 {statistics.median(latencies) * 1000:>7.2f} ms"
+        f"  p99 {percentile(latencies, 99) * 1000:>7.2f} ms"
+        f"  errors {errors}"
+    )
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark async vs sync API handlers")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent clients")
+    parser.add_argument("--keys", type=int, default=200, help="Sample keys used for /redis-key")
+    parser.add_argument("--port", type=int, default=8701, help="First local port to listen on")
+    args = parser.parse_args()
+
+    # Sample real key names for the key-detail scenario
+    sample_keys = []
+    for key in main.r.scan_iter(match=main.SCAN_MATCH, count=main.SCAN_COUNT):
+        sample_keys.append(key)
+        if len(sample_keys) >= args.keys:
+            break
+    if not sample_keys:
+        print("❌ No keys found - generate some data first (scripts/bicycle_data_generator.py)")
+        return
+
+    scenarios = {
+        "/redis-key": [f"/redis-key/{key}" for key in sample_keys],
+        "/redis-keyspace": ["/redis-keyspace"],
+    }
+
+    servers = {
+        "sync": serve(create_sync_app(), args.port),
+        "async": serve(main.app, args.port + 1),
+    }
+    ports = {"sync": args.port, "async": args.port + 1}
+
+    # Wait for the app's background scanner to publish its first snapshot
+    while not main.scanner.status()["complete"]:
+        time.sleep(0.1)
+
+    print("=" * 60)
+    print(f"Handler benchmark - {args.requests} requests, concurrency {args.concurrency}")
+    print("=" * 60)
+    for name, paths in scenarios.items():
+        print(f"\n{name}")
+        for label in ("sync", "async"):
+            base_url = f"http://127.0.0.1:{ports[label]}"
+            # Warm up connections and pools
+            asyncio.run(run_load(base_url, paths, args.concurrency, args.concurrency))
+            report(label, *asyncio.run(run_load(base_url, paths, args.requests, args.concurrency)))
+
+    for server, thread in servers.values():
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main_benchmark()
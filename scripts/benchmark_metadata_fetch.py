@@ -0,0 +1,109 @@
+"""
+Metadata Fetch Benchmark
+Sweeps METADATA_CHUNK_SIZE and METADATA_CONCURRENCY and reports how fast
+`fetch_key_metadata` reads ttl/type/size for a batch of keys, both cold (every
+key measured with MEMORY USAGE) and warm (cached sizes and types reused).
+
+Keys are written under a throwaway prefix and deleted afterwards. Uses the
+REDIS_CONNECTION settings from main.py.
+
+Usage:
+    python scripts/benchmark_metadata_fetch.py --keys 100000 --chunks 100 1000 5000 --concurrency 1 2 4 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main  # noqa: E402
+
+PREFIX = "benchmark_metadata"
+
+
+def populate(r, key_count, seed=42):
+    """Write `key_count` keys of mixed types under PREFIX and return their names."""
+    rng = random.Random(seed)
+    names = []
+    pipe = r.pipeline(transaction=False)
+    for i in range(key_count):
+        name = f"{PREFIX}:{i:08d}"
+        kind = i % 4
+        if kind == 0:
+            pipe.set(name, "x" * rng.randint(8, 512))
+        elif kind == 1:
+            pipe.hset(name, mapping={f"f{j}": j for j in range(rng.randint(1, 20))})
+        elif kind == 2:
+            pipe.rpush(name, *range(rng.randint(1, 20)))
+        else:
+            pipe.sadd(name, *range(rng.randint(1, 20)))
+        if rng.random() < 0.5:
+            pipe.expire(name, rng.randint(600, 86400))
+        names.append(name)
+        if len(pipe) >= 5000:
+            pipe.execute()
+    pipe.execute()
+    return names
+
+
+def cleanup(r):
+    batch = []
+    for name in r.scan_iter(match=f"{PREFIX}:*", count=1000):
+        batch.append(name)
+        if len(batch) >= 1000:
+            r.unlink(*batch)
+            batch = []
+    if batch:
+        r.unlink(*batch)
+
+
+def run(names, chunk_size, concurrency, cached=None):
+    """Time one fetch of all `names`; return (seconds, entries)."""
+    main.METADATA_CHUNK_SIZE = chunk_size
+    main.METADATA_CONCURRENCY = concurrency
+    if main.metadata_executor is not None:
+        main.metadata_executor.shutdown()
+        main.metadata_executor = None
+    started = time.perf_counter()
+    entries = main.fetch_key_metadata(names, main.r, cached=cached)
+    return time.perf_counter() - started, entries
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark chunked/parallel metadata pipelines")
+    parser.add_argument("--keys", type=int, default=100_000, help="Keys to write and fetch")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[100, 500, 1000, 5000, 20000],
+                        help="METADATA_CHUNK_SIZE values to try")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="METADATA_CONCURRENCY values to try")
+    args = parser.parse_args()
+
+    r = main.r
+    print(f"Writing {args.keys:,} keys under '{PREFIX}:*'...")
+    names = populate(r, args.keys)
+    try:
+        # Warm-cache runs reuse one cold fetch as the cache
+        _, cold_entries = run(names, max(args.chunks), 1)
+        cached = {entry["name"]: entry for entry in cold_entries}
+
+        print("=" * 64)
+        print(f"Metadata fetch benchmark - {args.keys:,} keys")
+        print("=" * 64)
+        print(f"  {'chunk':>7} {'workers':>8} {'cold keys/s':>14} {'warm keys/s':>14}")
+        for chunk_size in args.chunks:
+            for concurrency in args.concurrency:
+                cold, _ = run(names, chunk_size, concurrency)
+                warm, _ = run(names, chunk_size, concurrency, cached)
+                print(
+                    f"  {chunk_size:>7} {concurrency:>8}"
+                    f" {args.keys / cold:>14,.0f} {args.keys / warm:>14,.0f}"
+                )
+    finally:
+        cleanup(r)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,181 @@
+"""
+RDB Parser Benchmark
+Generates RDB dumps of increasing size and measures how fast `RdbParser` reads
+them (MB/s and keys/s), how long `load_rdb` takes to publish the snapshot, and
+the process RSS afterwards.
+
+Dumps are assembled from the DUMP payloads of a few thousand synthetic template
+keys, repeated under new names, so multi-GB dumps are written without filling
+Redis. The templates are written to --db (⚠️ FLUSHED) and removed once dumped.
+An existing dump can be measured instead with --dump.
+
+Uses the REDIS_CONNECTION settings from main.py.
+
+Usage:
+    python scripts/benchmark_rdb_parser.py --keys 100000 1000000 10000000 --output rdb_results.json
+    python scripts/benchmark_rdb_parser.py --dump /backups/dump.rdb
+"""
+
+import argparse
+import json
+import os
+import resource
+import struct
+import sys
+import tempfile
+import time
+
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main  # noqa: E402
+from synthetic_keyspace import add_spec_arguments, populate, spec_from_args  # noqa: E402
+
+
+def encode_length(value):
+    """RDB length encoding (6-bit, 14-bit or 32-bit)."""
+    if value < 1 << 6:
+        return bytes([value])
+    if value < 1 << 14:
+        return bytes([0x40 | value >> 8, value & 0xFF])
+    return b"\x80" + struct.pack(">I", value)
+
+
+def encode_string(data):
+    return encode_length(len(data)) + data
+
+
+def dump_templates(spec, count, db):
+    """Write `count` keys of `spec` to `db` and return their (name, ttl, DUMP payload)."""
+    connection = dict(main.REDIS_CONNECTION, db=db)
+    raw = redis.Redis(**dict(connection, decode_responses=False))
+    raw.flushdb()
+    populate(connection, count, spec, progress=False)
+    templates = []
+    pipe = raw.pipeline(transaction=False)
+    names = []
+    for index in range(count):
+        name, _, ttl, _ = spec.key(index)
+        names.append((name, ttl))
+        pipe.dump(name)
+    for (name, ttl), payload in zip(names, pipe.execute()):
+        if payload is not None:
+            templates.append((name.encode(), ttl, payload))
+    raw.flushdb()
+    return templates
+
+
+def write_dump(path, templates, key_count, ctime=None):
+    """Write an RDB file of `key_count` keys cycling through `templates`.
+
+    A DUMP payload is the value's type byte and serialized value followed by a
+    2-byte RDB version and an 8-byte CRC; the key record is the type byte, the
+    key name, then the value. The file checksum is left 0 (not checked).
+    """
+    ctime = int(time.time()) if ctime is None else ctime
+    version = struct.unpack("<H", templates[0][2][-10:-8])[0]
+    expires = sum(1 for _, ttl, _ in templates if ttl) * key_count // len(templates)
+    with open(path, "wb") as out:
+        out.write(b"REDIS%04d" % version)
+        for key, value in ((b"redis-ver", b"benchmark"), (b"ctime", str(ctime).encode())):
+            out.write(b"\xfa" + encode_string(key) + encode_string(value))
+        out.write(b"\xfe" + encode_length(0))
+        out.write(b"\xfb" + encode_length(key_count) + encode_length(expires))
+        for index in range(key_count):
+            name, ttl, payload = templates[index % len(templates)]
+            if ttl:
+                out.write(b"\xfc" + struct.pack("<Q", (ctime + ttl) * 1000))
+            out.write(payload[:1] + encode_string(b"%s:%d" % (name, index)) + payload[1:-10])
+        out.write(b"\xff" + bytes(8))
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB on Linux
+
+
+def measure(path):
+    """Parse `path` on its own, then load it into a fresh scanner; return the results."""
+    file_bytes = os.path.getsize(path)
+    started = time.perf_counter()
+    keys = sum(1 for _ in main.RdbParser(path))
+    parse_seconds = time.perf_counter() - started
+
+    main.scanner = main.KeyspaceScanner(main.r)
+    started = time.perf_counter()
+    main.load_rdb(path, db=0)
+    load_seconds = time.perf_counter() - started
+    return {
+        "file_bytes": file_bytes,
+        "keys": keys,
+        "parse_seconds": round(parse_seconds, 3),
+        "parse_mb_per_second": round(file_bytes / parse_seconds / 1e6, 1),
+        "parse_keys_per_second": round(keys / parse_seconds),
+        "load_seconds": round(load_seconds, 3),
+        "load_keys_per_second": round(keys / load_seconds),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def report(label, run):
+    print(
+        f"  {label:<14} {run['file_bytes'] / 1e6:>10,.1f} MB {run['keys']:>12,} keys"
+        f"  parse {run['parse_mb_per_second']:>7,.1f} MB/s {run['parse_keys_per_second']:>10,} keys/s"
+        f"  load {run['load_seconds']:>8.2f}s  rss {run['rss_bytes'] / 1e6:>8,.0f} MB"
+    )
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark RDB parsing on generated dumps")
+    parser.add_argument("--keys", type=int, nargs="+", default=[100_000, 1_000_000],
+                        help="Dump sizes to generate (keys)")
+    parser.add_argument("--dump", help="Measure this existing dump instead of generating dumps")
+    parser.add_argument("--templates", type=int, default=5000, help="Distinct template keys dumped from Redis")
+    parser.add_argument("--db", type=int, default=15, help="Redis database to FLUSH and write templates to")
+    parser.add_argument("--dir", default=None, help="Directory for generated dumps (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated dumps")
+    parser.add_argument("--output", default=None, help="JSON results file")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic template keys")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    results = {"started_at": main.utc_timestamp(), "runs": []}
+    if args.dump:
+        run = measure(args.dump)
+        report(os.path.basename(args.dump), run)
+        results["runs"].append(dict(run, dump=args.dump))
+    else:
+        print(f"Dumping {args.templates:,} template keys from database {args.db}...")
+        templates = dump_templates(spec_from_args(args), args.templates, args.db)
+        directory = args.dir or tempfile.mkdtemp(prefix="rdb-benchmark-")
+        for key_count in args.keys:
+            path = os.path.join(directory, f"benchmark-{key_count}.rdb")
+            started = time.perf_counter()
+            write_dump(path, templates, key_count)
+            print(f"\n{key_count:,} keys (written in {time.perf_counter() - started:.1f}s)")
+            run = measure(path)
+            report("dump", run)
+            results["runs"].append(run)
+            if not args.keep:
+                os.remove(path)
+        if not args.keep and not args.dir:
+            os.rmdir(directory)
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
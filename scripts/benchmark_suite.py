@@ -0,0 +1,189 @@
+"""
+API Benchmark Suite
+Populates a dedicated Redis database with synthetic keyspaces of increasing size
+and measures the API against each one: /redis-keyspace (keys and aggregate
+modes), /redis-keyspace/counts and /redis-key/{key}. For every scenario it
+records throughput, latency percentiles, response bytes, the API process RSS and
+the Redis CPU time used, and writes everything to a JSON file so runs can be
+compared between versions.
+
+⚠️ The database given by --db is FLUSHED before every keyspace size.
+
+Requires httpx and uvicorn. Uses the REDIS_CONNECTION settings from main.py.
+
+Usage:
+    python scripts/benchmark_suite.py --sizes 10000 100000 1000000 --db 15 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import httpx
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main  # noqa: E402
+from benchmark_async_handlers import percentile, run_load, serve  # noqa: E402
+from synthetic_keyspace import add_spec_arguments, populate, spec_from_args  # noqa: E402
+
+
+def use_db(db):
+    """Point the API's clients, scanner and everything watching it at database `db`."""
+    main.REDIS_CONNECTION["db"] = db
+    main.r = redis.Redis(**main.REDIS_CONNECTION)
+    main.scanner = main.KeyspaceScanner(main.r)
+    main.notifier = main.KeyspaceNotifier(main.scanner)
+    main.response_cache = main.ResponseCache(main.scanner)
+    main.broadcaster = main.ChangeBroadcaster(main.scanner)
+    main.history = main.KeyspaceHistory(main.scanner)
+    main.analyzer = main.KeyAnalyzer(main.r)
+    return main.r
+
+
+def rss_bytes():
+    """Current resident set size of this process (which also runs the API)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB on Linux
+
+
+def redis_cpu_seconds(r):
+    info = r.info("cpu")
+    return info["used_cpu_sys"] + info["used_cpu_user"]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(r, base_url, paths, requests, concurrency):
+    """Load `paths` and return one scenario's results."""
+    response = httpx.get(base_url + paths[0], timeout=600)
+    asyncio.run(run_load(base_url, paths, concurrency, concurrency))  # Warm up
+
+    cpu_before = redis_cpu_seconds(r)
+    latencies, elapsed, errors = asyncio.run(run_load(base_url, paths, requests, concurrency))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            label: round(percentile(latencies, pct) * 1000, 3)
+            for label, pct in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))
+        },
+        "response_bytes": len(response.content),
+        "rss_bytes": rss_bytes(),
+        "redis_cpu_seconds": round(redis_cpu_seconds(r) - cpu_before, 3),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark the API against synthetic keyspaces")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Keyspace sizes to benchmark (keys)")
+    parser.add_argument("--db", type=int, default=15, help="Redis database to FLUSH and fill")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--keyspace-requests", type=int, default=20,
+                        help="Requests per full /redis-keyspace scenario (large responses)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--sample-keys", type=int, default=200, help="Keys used for /redis-key")
+    parser.add_argument("--port", type=int, default=8711, help="Local port for the API")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic keyspace")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to load keys")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    r = use_db(args.db)
+    results = {
+        "started_at": main.utc_timestamp(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "redis_version": r.info("server")["redis_version"],
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "runs": [],
+    }
+
+    server, thread = serve(main.app, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        for key_count in args.sizes:
+            print(f"\n{key_count:,} keys")
+            r.flushdb()
+            load_seconds = populate(main.REDIS_CONNECTION, key_count, spec, workers=args.workers)
+            print(f"  loaded in {load_seconds:.1f}s")
+
+            # The app's scanner is already running; the sweep in progress may have
+            # started before the load finished, so wait for the one after it
+            started = time.perf_counter()
+            target = main.scanner.status()["sweeps_completed"] + 2
+            main.scanner.request_sweep()
+            while main.scanner.status()["sweeps_completed"] < target:
+                time.sleep(0.1)
+                main.scanner.request_sweep()
+            sweep_wait = time.perf_counter() - started
+
+            sample = [spec.key(index)[0] for index in range(0, key_count, max(1, key_count // args.sample_keys))]
+            scenarios = {
+                "keyspace": (["/redis-keyspace"], args.keyspace_requests),
+                "keyspace_aggregate": (["/redis-keyspace?mode=aggregate&top=10"], args.requests),
+                "counts": (["/redis-keyspace/counts"], args.requests),
+                "key_detail": ([f"/redis-key/{name}" for name in sample], args.requests),
+            }
+            run = {
+                "keys": key_count,
+                "load_seconds": round(load_seconds, 3),
+                "load_keys_per_second": round(key_count / load_seconds, 1),
+                "sweep_seconds": main.scanner.status()["sweep_duration_seconds"],
+                "sweep_wait_seconds": round(sweep_wait, 3),
+                "redis_used_memory_bytes": r.info("memory")["used_memory"],
+                "scenarios": {},
+            }
+            for name, (paths, requests) in scenarios.items():
+                scenario = measure(r, base_url, paths, requests, args.concurrency)
+                run["scenarios"][name] = scenario
+                print(
+                    f"  {name:<20} {scenario['requests_per_second']:>9.1f} req/s"
+                    f"  p50 {scenario['latency_ms']['p50']:>8.2f} ms"
+                    f"  p99 {scenario['latency_ms']['p99']:>8.2f} ms"
+                    f"  {scenario['response_bytes']:>12,} B"
+                    f"  redis cpu {scenario['redis_cpu_seconds']:.2f}s"
+                )
+            run["peak_rss_bytes"] = peak_rss_bytes()
+            results["runs"].append(run)
+
+            # Write after every size so a long run still leaves partial results
+            with open(args.output, "w") as out:
+                json.dump(results, out, indent=2)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
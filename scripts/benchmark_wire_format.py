@@ -0,0 +1,106 @@
+"""
+Wire Format Benchmark
+Compares payload bytes and encode time of the /redis-keyspace encodings on
+synthetic keyspace snapshots: the dict-of-lists JSON document (std json and
+orjson), the columnar binary format, and their gzip/zstd compressed variants.
+
+No Redis connection is needed - snapshots are generated in memory.
+
+Usage:
+    python scripts/benchmark_wire_format.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main  # noqa: E402
+
+KEY_TYPES = ["hash", "string", "list", "set", "zset"]
+KEYSPACES = ["sample_bicycle", "demo", "session", "cache", "leaderboard"]
+SUBSPACES = ["customers", "orders", "inventory:bikes", "metrics", "services"]
+TTL_CHOICES = [-1, 86400 * 3, 3600 * 12, 1800, 120, 45]
+
+
+def make_snapshot(key_count, seed=42):
+    """Build a /redis-keyspace document with `key_count` realistic key records."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(key_count):
+        name = f"{rng.choice(KEYSPACES)}:{rng.choice(SUBSPACES)}:item_{i:08d}"
+        records.append({
+            "name": name,
+            "type": rng.choice(KEY_TYPES),
+            "ttl": rng.choice(TTL_CHOICES),
+            "size": rng.randint(56, 4096),
+        })
+    return {
+        "keyspaces": main.group_by_keyspace(records),
+        "metadata": {"total_keys": key_count, "timestamp": main.utc_timestamp(), "snapshot": {"version": 1}},
+    }
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def std_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark /redis-keyspace wire formats")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Key counts to benchmark")
+    args = parser.parse_args()
+
+    encoders = [("json (std)", std_json)]
+    if main.orjson is not None:
+        encoders.append(("json (orjson)", main.orjson.dumps))
+    encoders.append(("columnar", main.encode_columnar))
+
+    print("=" * 72)
+    print("Wire format benchmark")
+    if main.orjson is None:
+        print("  orjson not installed - skipping the orjson encoder")
+    if main.zstandard is None:
+        print("  zstandard not installed - skipping zstd compression")
+    print("=" * 72)
+
+    for key_count in args.sizes:
+        data = make_snapshot(key_count)
+        print(f"\n{key_count:,} keys")
+        print(f"  {'encoding':<24} {'bytes':>14} {'bytes/key':>10} {'encode ms':>11}")
+
+        for label, encoder in encoders:
+            body, elapsed = timed(encoder, data)
+            rows = [(label, body, elapsed)]
+
+            compressed, gzip_elapsed = timed(gzip.compress, body, main.GZIP_LEVEL)
+            rows.append((f"{label} + gzip", compressed, elapsed + gzip_elapsed))
+            if main.zstandard is not None:
+                compressor = main.zstandard.ZstdCompressor(level=main.ZSTD_LEVEL)
+                compressed, zstd_elapsed = timed(compressor.compress, body)
+                rows.append((f"{label} + zstd", compressed, elapsed + zstd_elapsed))
+
+            for row_label, row_body, row_elapsed in rows:
+                print(
+                    f"  {row_label:<24} {len(row_body):>14,} {len(row_body) / key_count:>10.1f}"
+                    f" {row_elapsed * 1000:>11.1f}"
+                )
+
+        # Round-trip check so the benchmark cannot silently measure a broken encoder
+        decoded = main.decode_columnar(main.encode_columnar(data))
+        assert sum(ks["total_count"] for ks in decoded["keyspaces"].values()) == key_count
+
+
+if __name__ == "__main__":
+    main_benchmark()
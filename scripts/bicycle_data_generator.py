@@ -1,26 +1,55 @@
 """
 Large Scale Redis Data Generator - Bicycle Store
-Creates 1000 keys in the sample_bicycle namespace for performance testing.
+Creates ~1000 keys (or --keys of them, up to millions) in the sample_bicycle
+namespace for performance testing, using the bulk loader: batched pipelines,
+one variadic command per key and optional worker processes.
+
+Usage:
+    python scripts/bicycle_data_generator.py --keys 1000000 --seed 7 --workers 4
 """
 
-import redis
+import argparse
+import bisect
 import json
-import random
+import os
+import sys
 from datetime import datetime, timedelta
 
+import redis
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_loader import add_loader_arguments, entity_rng, load  # noqa: E402
+
 # Redis connection - UPDATE THESE VALUES FOR YOUR REDIS INSTANCE
-r = redis.Redis(
+REDIS_CONNECTION = dict(
     host='your-redis-host.com',
     port=6379,
     decode_responses=True,
     username="your-username",
     password="your-password",
 )
+r = redis.Redis(**REDIS_CONNECTION)
 
 # Configuration
 KEYSPACE = "sample_bicycle"
 TOTAL_KEYS = 1000
 
+# Entities of the original data set, which wrote ~1378 keys plus 11 store
+# metrics (customers have a profile, preferences and usually a purchase
+# history). Counts are scaled to --keys.
+ENTITY_MIX = [
+    ("inventory", 400),
+    ("customers", 200),
+    ("orders", 250),
+    ("services", 100),
+    ("cache", 50),
+]
+KEYS_PER_MIX = 1378
+
+# Timestamps are relative to a fixed date so the same seed writes the same data
+REFERENCE_TIME = datetime(2024, 9, 1)
+
 # TTL ranges for varied visualization
 TTL_RANGES = [
     -1,          # No expiry
@@ -62,239 +91,211 @@ STORE_LOCATIONS = [
     "Mall Plaza", "City Center", "Riverside", "Hillcrest", "Lakewood"
 ]
 
-def create_bike_inventory():
-    """Create bicycle inventory data"""
-    print("Creating bicycle inventory...")
-    
-    for i in range(400):  # 400 bikes in inventory
-        bike_id = f"bike_{i+1:04d}"
-        
-        bike_key = f"{KEYSPACE}:inventory:bikes:{bike_id}"
-        bike_data = {
-            "brand": random.choice(BIKE_BRANDS),
-            "model": f"Model {random.choice(['X1', 'Pro', 'Elite', 'Sport', 'Classic', 'Advanced'])}",
-            "type": random.choice(BIKE_TYPES),
-            "color": random.choice(BIKE_COLORS),
-            "size": random.choice(BIKE_SIZES),
-            "price": random.randint(200, 5000),
-            "year": random.randint(2020, 2024),
-            "in_stock": str(random.choice([True, False])),
-            "stock_count": random.randint(0, 25),
-            "last_updated": datetime.now().isoformat(),
-            "supplier": f"Supplier_{random.randint(1, 10)}"
-        }
-        
-        r.hset(bike_key, mapping=bike_data)
-        
-        # Random TTL
-        ttl = random.choice(TTL_RANGES)
-        if ttl != -1:
-            r.expire(bike_key, ttl)
-
-def create_customer_data():
-    """Create customer data"""
-    print("Creating customer data...")
-    
-    for i in range(200):  # 200 customers
-        customer_id = f"cust_{i+1:04d}"
-        
-        # Customer profile (Hash)
-        profile_key = f"{KEYSPACE}:customers:{customer_id}:profile"
-        profile_data = {
-            "name": random.choice(CUSTOMER_NAMES),
-            "email": f"customer{i+1}@email.com",
-            "phone": f"+1{random.randint(1000000000, 9999999999)}",
-            "address": f"{random.randint(100, 9999)} {random.choice(['Main St', 'Oak Ave', 'Pine Rd', 'Elm Dr'])}",
-            "city": random.choice(["Springfield", "Riverside", "Franklin", "Georgetown", "Clinton"]),
-            "zip_code": f"{random.randint(10000, 99999)}",
-            "member_since": (datetime.now() - timedelta(days=random.randint(1, 1000))).isoformat(),
-            "loyalty_points": random.randint(0, 5000),
-            "total_spent": random.randint(0, 15000)
-        }
-        
-        r.hset(profile_key, mapping=profile_data)
-        ttl = random.choice(TTL_RANGES)
-        if ttl != -1:
-            r.expire(profile_key, ttl)
-        
-        # Customer purchase history (List)
-        history_key = f"{KEYSPACE}:customers:{customer_id}:purchases"
-        num_purchases = random.randint(0, 8)
-        for j in range(num_purchases):
-            purchase = f"bike_{random.randint(1, 400):04d}"
-            r.lpush(history_key, purchase)
-        
-        if num_purchases > 0:
-            ttl = random.choice(TTL_RANGES)
-            if ttl != -1:
-                r.expire(history_key, ttl)
-        
-        # Customer preferences (Set)
-        prefs_key = f"{KEYSPACE}:customers:{customer_id}:preferences"
-        preferred_types = random.sample(BIKE_TYPES, random.randint(1, 4))
-        for pref in preferred_types:
-            r.sadd(prefs_key, pref)
-        
-        ttl = random.choice(TTL_RANGES)
-        if ttl != -1:
-            r.expire(prefs_key, ttl)
-
-def create_order_data():
-    """Create order and transaction data"""
-    print("Creating order data...")
-    
-    for i in range(250):  # 250 orders
-        order_id = f"order_{i+1:05d}"
-        
-        # Order details (Hash)
-        order_key = f"{KEYSPACE}:orders:{order_id}"
-        order_data = {
-            "customer_id": f"cust_{random.randint(1, 200):04d}",
-            "bike_id": f"bike_{random.randint(1, 400):04d}",
-            "order_date": (datetime.now() - timedelta(days=random.randint(0, 180))).isoformat(),
-            "status": random.choice(["pending", "processing", "shipped", "delivered", "cancelled"]),
-            "total_amount": random.randint(200, 5000),
-            "payment_method": random.choice(["credit_card", "debit_card", "cash", "financing"]),
-            "store_location": random.choice(STORE_LOCATIONS),
-            "sales_rep": f"Rep_{random.randint(1, 15)}",
-            "shipping_address": f"{random.randint(100, 9999)} Delivery St",
-            "tracking_number": f"TRK{random.randint(100000000, 999999999)}"
-        }
-        
-        r.hset(order_key, mapping=order_data)
-        ttl = random.choice(TTL_RANGES)
-        if ttl != -1:
-            r.expire(order_key, ttl)
-
-def create_store_metrics():
-    """Create store performance and metrics data"""
-    print("Creating store metrics...")
-    
-    # Daily sales by location (Sorted Sets)
+def random_ttl(rng):
+    ttl = rng.choice(TTL_RANGES)
+    return None if ttl == -1 else ttl
+
+
+def bike_keys(rng, i, store):
+    """Bicycle inventory data"""
+    bike_key = f"{KEYSPACE}:inventory:bikes:bike_{i+1:04d}"
+    bike_data = {
+        "brand": rng.choice(BIKE_BRANDS),
+        "model": f"Model {rng.choice(['X1', 'Pro', 'Elite', 'Sport', 'Classic', 'Advanced'])}",
+        "type": rng.choice(BIKE_TYPES),
+        "color": rng.choice(BIKE_COLORS),
+        "size": rng.choice(BIKE_SIZES),
+        "price": rng.randint(200, 5000),
+        "year": rng.randint(2020, 2024),
+        "in_stock": str(rng.choice([True, False])),
+        "stock_count": rng.randint(0, 25),
+        "last_updated": REFERENCE_TIME.isoformat(),
+        "supplier": f"Supplier_{rng.randint(1, 10)}"
+    }
+    return [(bike_key, "hash", random_ttl(rng), bike_data)]
+
+
+def customer_keys(rng, i, store):
+    """Customer profile (hash), purchase history (list) and preferences (set)"""
+    customer_id = f"cust_{i+1:04d}"
+    profile_data = {
+        "name": rng.choice(CUSTOMER_NAMES),
+        "email": f"customer{i+1}@email.com",
+        "phone": f"+1{rng.randint(1000000000, 9999999999)}",
+        "address": f"{rng.randint(100, 9999)} {rng.choice(['Main St', 'Oak Ave', 'Pine Rd', 'Elm Dr'])}",
+        "city": rng.choice(["Springfield", "Riverside", "Franklin", "Georgetown", "Clinton"]),
+        "zip_code": f"{rng.randint(10000, 99999)}",
+        "member_since": (REFERENCE_TIME - timedelta(days=rng.randint(1, 1000))).isoformat(),
+        "loyalty_points": rng.randint(0, 5000),
+        "total_spent": rng.randint(0, 15000)
+    }
+    purchases = [f"bike_{rng.randint(1, store.counts['inventory']):04d}" for _ in range(rng.randint(0, 8))]
+    preferences = rng.sample(BIKE_TYPES, rng.randint(1, 4))
+    # Purchases are LPUSHed so the newest is first, as before; empty lists are skipped
+    return [
+        (f"{KEYSPACE}:customers:{customer_id}:profile", "hash", random_ttl(rng), profile_data),
+        (f"{KEYSPACE}:customers:{customer_id}:purchases", "list_lpush", random_ttl(rng), purchases),
+        (f"{KEYSPACE}:customers:{customer_id}:preferences", "set", random_ttl(rng), preferences),
+    ]
+
+
+def order_keys(rng, i, store):
+    """Order and transaction data"""
+    order_key = f"{KEYSPACE}:orders:order_{i+1:05d}"
+    order_data = {
+        "customer_id": f"cust_{rng.randint(1, store.counts['customers']):04d}",
+        "bike_id": f"bike_{rng.randint(1, store.counts['inventory']):04d}",
+        "order_date": (REFERENCE_TIME - timedelta(days=rng.randint(0, 180))).isoformat(),
+        "status": rng.choice(["pending", "processing", "shipped", "delivered", "cancelled"]),
+        "total_amount": rng.randint(200, 5000),
+        "payment_method": rng.choice(["credit_card", "debit_card", "cash", "financing"]),
+        "store_location": rng.choice(STORE_LOCATIONS),
+        "sales_rep": f"Rep_{rng.randint(1, 15)}",
+        "shipping_address": f"{rng.randint(100, 9999)} Delivery St",
+        "tracking_number": f"TRK{rng.randint(100000000, 999999999)}"
+    }
+    return [(order_key, "hash", random_ttl(rng), order_data)]
+
+
+def service_keys(rng, i, store):
+    """Service and maintenance records"""
+    service_key = f"{KEYSPACE}:services:service_{i+1:04d}"
+    service_data = {
+        "customer_id": f"cust_{rng.randint(1, store.counts['customers']):04d}",
+        "bike_model": f"{rng.choice(BIKE_BRANDS)} {rng.choice(['Pro', 'Elite'])}",
+        "service_type": rng.choice([
+            "tune_up", "brake_repair", "tire_replacement", "chain_service",
+            "gear_adjustment", "wheel_truing", "full_overhaul"
+        ]),
+        "service_date": (REFERENCE_TIME - timedelta(days=rng.randint(1, 90))).isoformat(),
+        "cost": rng.randint(25, 200),
+        "technician": f"Tech_{rng.randint(1, 8)}",
+        "parts_used": rng.choice([
+            "brake_pads", "chain", "cassette", "tires", "tubes", "cables"
+        ]),
+        "warranty_work": str(rng.choice([True, False])),
+        "next_service_due": (REFERENCE_TIME + timedelta(days=rng.randint(30, 365))).isoformat()
+    }
+    return [(service_key, "hash", random_ttl(rng), service_data)]
+
+
+def session_keys(rng, i, store):
+    """Session cache data (String/JSON with short TTLs)"""
+    session_key = f"{KEYSPACE}:cache:sessions:session_{i+1:06d}"
+    session_data = {
+        "user_id": f"cust_{rng.randint(1, store.counts['customers']):04d}",
+        "cart_items": [f"bike_{rng.randint(1, store.counts['inventory']):04d}" for _ in range(rng.randint(0, 3))],
+        "last_activity": REFERENCE_TIME.isoformat(),
+        "ip_address": f"192.168.{rng.randint(1, 255)}.{rng.randint(1, 255)}",
+        "user_agent": rng.choice([
+            "Chrome/91.0", "Firefox/89.0", "Safari/14.1", "Edge/91.0"
+        ])
+    }
+    # Sessions get short TTLs
+    return [(session_key, "string", rng.choice([120, 300, 600, 1800]), json.dumps(session_data))]
+
+
+def store_metric_keys(rng):
+    """Store performance and metrics data (Sorted Sets)"""
+    keys = []
+    # Daily sales by location
     for location in STORE_LOCATIONS:
         sales_key = f"{KEYSPACE}:metrics:daily_sales:{location.lower().replace(' ', '_')}"
-        
-        # Add sales data for random days
-        for i in range(random.randint(10, 30)):
-            date = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
-            sales_amount = random.randint(1000, 15000)
-            r.zadd(sales_key, {date: sales_amount})
-        
-        ttl = random.choice(TTL_RANGES)
-        if ttl != -1:
-            r.expire(sales_key, ttl)
-    
-    # Popular bike models (Sorted Set)
-    popular_key = f"{KEYSPACE}:metrics:popular_models"
-    for brand in BIKE_BRANDS[:10]:  # Top 10 brands
-        model_name = f"{brand} {random.choice(['Pro', 'Elite', 'Sport'])}"
-        sales_count = random.randint(5, 150)
-        r.zadd(popular_key, {model_name: sales_count})
-    
-    ttl = random.choice(TTL_RANGES)
-    if ttl != -1:
-        r.expire(popular_key, ttl)
-
-def create_maintenance_records():
-    """Create service and maintenance records"""
-    print("Creating maintenance records...")
-    
-    for i in range(100):  # 100 service records
-        service_id = f"service_{i+1:04d}"
-        
-        service_key = f"{KEYSPACE}:services:{service_id}"
-        service_data = {
-            "customer_id": f"cust_{random.randint(1, 200):04d}",
-            "bike_model": f"{random.choice(BIKE_BRANDS)} {random.choice(['Pro', 'Elite'])}",
-            "service_type": random.choice([
-                "tune_up", "brake_repair", "tire_replacement", "chain_service",
-                "gear_adjustment", "wheel_truing", "full_overhaul"
-            ]),
-            "service_date": (datetime.now() - timedelta(days=random.randint(1, 90))).isoformat(),
-            "cost": random.randint(25, 200),
-            "technician": f"Tech_{random.randint(1, 8)}",
-            "parts_used": random.choice([
-                "brake_pads", "chain", "cassette", "tires", "tubes", "cables"
-            ]),
-            "warranty_work": str(random.choice([True, False])),
-            "next_service_due": (datetime.now() + timedelta(days=random.randint(30, 365))).isoformat()
-        }
-        
-        r.hset(service_key, mapping=service_data)
-        ttl = random.choice(TTL_RANGES)
-        if ttl != -1:
-            r.expire(service_key, ttl)
-
-def create_cache_data():
-    """Create various cache and temporary data"""
-    print("Creating cache and session data...")
-    
-    # Session data (String/JSON with short TTLs)
-    for i in range(50):
-        session_id = f"session_{i+1:06d}"
-        session_key = f"{KEYSPACE}:cache:sessions:{session_id}"
-        
-        session_data = {
-            "user_id": f"cust_{random.randint(1, 200):04d}",
-            "cart_items": [f"bike_{random.randint(1, 400):04d}" for _ in range(random.randint(0, 3))],
-            "last_activity": datetime.now().isoformat(),
-            "ip_address": f"192.168.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            "user_agent": random.choice([
-                "Chrome/91.0", "Firefox/89.0", "Safari/14.1", "Edge/91.0"
-            ])
+        sales = {
+            (REFERENCE_TIME - timedelta(days=i)).strftime("%Y-%m-%d"): rng.randint(1000, 15000)
+            for i in range(rng.randint(10, 30))
         }
-        
-        r.set(session_key, json.dumps(session_data))
-        # Sessions get short TTLs
-        r.expire(session_key, random.choice([120, 300, 600, 1800]))
+        keys.append((sales_key, "zset", random_ttl(rng), sales))
+
+    # Popular bike models (Top 10 brands)
+    popular = {
+        f"{brand} {rng.choice(['Pro', 'Elite', 'Sport'])}": rng.randint(5, 150)
+        for brand in BIKE_BRANDS[:10]
+    }
+    keys.append((f"{KEYSPACE}:metrics:popular_models", "zset", random_ttl(rng), popular))
+    return keys
+
+
+ENTITY_KEYS = {
+    "inventory": bike_keys,
+    "customers": customer_keys,
+    "orders": order_keys,
+    "services": service_keys,
+    "cache": session_keys,
+}
+
+
+class BicycleStore:
+    """The bicycle store data set for ~`total_keys` keys.
+
+    Entity 0 holds the store metrics; the following entities are bikes,
+    customers, orders, services and sessions in ENTITY_MIX proportions.
+    """
+
+    def __init__(self, total_keys=TOTAL_KEYS, seed=42):
+        self.seed = seed
+        scale = total_keys / KEYS_PER_MIX
+        self.counts = {category: max(1, round(count * scale)) for category, count in ENTITY_MIX}
+        self.categories = [category for category, _ in ENTITY_MIX]
+        self.starts = []
+        start = 1
+        for category in self.categories:
+            self.starts.append(start)
+            start += self.counts[category]
+        self.entity_count = start
+
+    def keys_for(self, index):
+        """Keys of entity `index` for the bulk loader."""
+        rng = entity_rng(self.seed, index)
+        if index == 0:
+            return store_metric_keys(rng)
+        position = bisect.bisect_right(self.starts, index) - 1
+        category = self.categories[position]
+        return ENTITY_KEYS[category](rng, index - self.starts[position], self)
+
 
 def main():
-    """Generate 1000 bicycle store keys"""
+    """Generate the bicycle store keys"""
+    parser = argparse.ArgumentParser(description="Generate bicycle store data in Redis")
+    add_loader_arguments(parser, default_keys=TOTAL_KEYS)
+    args = parser.parse_args()
+
     print("=" * 60)
-    print("Redis Bicycle Store Data Generator - 1000 Keys")
+    print(f"Redis Bicycle Store Data Generator - ~{args.keys:,} Keys")
     print("=" * 60)
-    
+
     try:
         # Test connection
         r.ping()
         print("✓ Connected to Redis successfully")
-        
+
         # Generate data (no deletion - only addition)
-        create_bike_inventory()        # ~400 keys
-        create_customer_data()         # ~600 keys (profiles + purchases + preferences)
-        create_order_data()            # ~250 keys
-        create_store_metrics()         # ~20 keys
-        create_maintenance_records()   # ~100 keys
-        create_cache_data()            # ~50 keys
-        
+        store = BicycleStore(args.keys, args.seed)
+        written, elapsed = load(
+            REDIS_CONNECTION, store.keys_for, store.entity_count,
+            workers=args.workers, batch=args.batch, atomic=args.atomic,
+        )
+
         print("\n" + "=" * 60)
         print("Bicycle store data generation complete!")
         print("=" * 60)
-        
+
         # Show summary
-        total_keys = len(r.keys(f"{KEYSPACE}:*"))
-        print(f"Total keys in '{KEYSPACE}' namespace: {total_keys}")
-        
+        print(f"Keys written to '{KEYSPACE}' namespace: {written:,} in {elapsed:.1f}s "
+              f"({written / elapsed:,.0f} keys/s)")
+
         # Show breakdown by category
-        categories = {
-            "inventory": len(r.keys(f"{KEYSPACE}:inventory:*")),
-            "customers": len(r.keys(f"{KEYSPACE}:customers:*")),
-            "orders": len(r.keys(f"{KEYSPACE}:orders:*")),
-            "metrics": len(r.keys(f"{KEYSPACE}:metrics:*")),
-            "services": len(r.keys(f"{KEYSPACE}:services:*")),
-            "cache": len(r.keys(f"{KEYSPACE}:cache:*"))
-        }
-        
-        for category, count in categories.items():
-            if count > 0:
-                print(f"  {category}: {count} keys")
-        
+        for category, count in store.counts.items():
+            print(f"  {category}: {count:,} entities")
+        print(f"  metrics: {len(STORE_LOCATIONS) + 1} keys")
+
         print(f"\nNamespace: '{KEYSPACE}'")
+        print(f"Seed: {args.seed} (rerun with the same seed for the same data)")
         print("Keys have varied TTLs for animation demonstration")
         print("Ready for large-scale visualization testing!")
-        
+
     except Exception as e:
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,154 @@
+"""
+Bulk Redis Loader
+Shared by the data generator scripts. Keys are written with batched pipelines
+and one variadic command per key (HSET mapping, RPUSH/LPUSH/SADD/ZADD with all
+elements, SET ... EX), and very large loads can be split over several worker
+processes.
+
+A generator describes its data as `make_keys(index)`, returning the keys of
+entity `index` as (name, type, ttl, value) tuples. Because every entity is
+derived from its index (and the generator's seed), runs are reproducible and
+workers can each write a disjoint range of indexes.
+"""
+
+import itertools
+import multiprocessing
+import random
+import time
+
+import redis
+
+PIPELINE_BATCH = 5000        # Keys written per pipeline round trip
+WORKER_CHUNK = 50_000        # Entities handed to a worker process at a time
+
+
+def entity_rng(seed, index):
+    """Random generator for one entity, stable across runs and processes."""
+    return random.Random(seed * 1_000_003 + index)
+
+
+def write_key(pipe, name, key_type, ttl, value):
+    """Queue the commands creating one key: one variadic write plus its expiry.
+
+    `ttl` is in seconds (None or -1 for no expiry). Lists are written with
+    RPUSH, or LPUSH for the type "list_lpush" to keep newest-first order.
+    """
+    if ttl is not None and ttl < 0:
+        ttl = None
+    if key_type == "string":
+        pipe.set(name, value, ex=ttl)
+        return
+    if key_type == "hash":
+        pipe.hset(name, mapping=value)
+    elif key_type == "list":
+        pipe.rpush(name, *value)
+    elif key_type == "list_lpush":
+        pipe.lpush(name, *value)
+    elif key_type == "set":
+        pipe.sadd(name, *value)
+    elif key_type == "zset":
+        pipe.zadd(name, value)
+    else:
+        raise ValueError(f"Unsupported key type '{key_type}'")
+    if ttl:
+        pipe.expire(name, ttl)
+
+
+def write_keys(r, keys, batch=PIPELINE_BATCH, atomic=False):
+    """Write (name, type, ttl, value) keys from any iterable with batched pipelines.
+
+    With `atomic`, each pipeline is wrapped in MULTI/EXEC so no key is ever
+    visible without its TTL. Returns the number of keys written.
+    """
+    pipe = r.pipeline(transaction=atomic)
+    written = 0
+    queued = 0
+    for key in keys:
+        if key[1] != "string" and not key[3]:
+            continue  # Redis has no empty collections
+        write_key(pipe, *key)
+        queued += 1
+        if queued >= batch:
+            pipe.execute()
+            written += queued
+            queued = 0
+    pipe.execute()
+    return written + queued
+
+
+def load_range(connection, make_keys, start, stop, batch=PIPELINE_BATCH, atomic=False):
+    """Write the keys of entities start..stop-1; return the number of keys written."""
+    r = redis.Redis(**connection)
+    try:
+        return write_keys(r, itertools.chain.from_iterable(map(make_keys, range(start, stop))), batch, atomic)
+    finally:
+        r.close()
+
+
+def _load_task(task):
+    return load_range(*task)
+
+
+def load(connection, make_keys, count, workers=1, batch=PIPELINE_BATCH, atomic=False, progress=True):
+    """Write the keys of entities 0..count-1, in `workers` processes when > 1.
+
+    `make_keys` must be picklable for workers (a module-level function or a
+    method of a picklable object). Returns (keys written, seconds).
+    """
+    started = time.perf_counter()
+    if workers <= 1:
+        written = 0
+        step = max(batch, 100_000)
+        for start in range(0, count, step):
+            written += load_range(connection, make_keys, start, min(start + step, count), batch, atomic)
+            if progress and count > step:
+                report_progress(min(start + step, count), count, written, started)
+        return written, time.perf_counter() - started
+
+    tasks = [
+        (connection, make_keys, start, min(start + WORKER_CHUNK, count), batch, atomic)
+        for start in range(0, count, WORKER_CHUNK)
+    ]
+    written = 0
+    done = 0
+    with multiprocessing.Pool(workers) as pool:
+        for task, task_written in zip(tasks, pool.imap(_load_task, tasks)):
+            written += task_written
+            done += task[3] - task[2]
+            if progress:
+                report_progress(done, count, written, started)
+    return written, time.perf_counter() - started
+
+
+def report_progress(done, count, written, started):
+    rate = written / max(time.perf_counter() - started, 1e-9)
+    print(f"  {done:,} / {count:,} entities, {written:,} keys ({rate:,.0f} keys/s)")
+
+
+def add_loader_arguments(parser, default_keys):
+    """CLI options shared by the generators: size, seed and how to write."""
+    parser.add_argument("--keys", type=int, default=default_keys, help="Approximate number of keys to write")
+    parser.add_argument("--seed", type=int, default=42, help="Seed; the same seed writes the same data")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for very large loads")
+    parser.add_argument("--batch", type=int, default=PIPELINE_BATCH, help="Keys per pipeline")
+    parser.add_argument("--atomic", action="store_true",
+                        help="Wrap each pipeline in MULTI/EXEC so keys never appear without their TTL")
+
+
+def delete_matching(r, pattern, batch=1000):
+    """UNLINK every key matching `pattern` without blocking Redis on KEYS; returns the count."""
+    deleted = 0
+    names = []
+    for name in r.scan_iter(match=pattern, count=batch):
+        names.append(name)
+        if len(names) >= batch:
+            deleted += r.unlink(*names)
+            names = []
+    if names:
+        deleted += r.unlink(*names)
+    return deleted
+
+
+def count_matching(r, pattern, batch=1000):
+    """Count keys matching `pattern` with SCAN instead of KEYS."""
+    return sum(1 for _ in r.scan_iter(match=pattern, count=batch))
@@ -0,0 +1,134 @@
+"""
+Synthetic Keyspace Generator
+Fills Redis with a reproducible keyspace of any size (10k to 10M+ keys) for
+load testing: a configurable mix of types, TTLs, value sizes and key prefix
+depths, written with pipelined bulk writes.
+
+Key names look like `<keyspace>:<segment>:...:<id>`, with `--keyspaces` top-level
+keyspaces and between `--depth` min and max segments in total.
+
+Usage:
+    python scripts/synthetic_keyspace.py --keys 1000000 --mix string=40,hash=30,list=10,set=10,zset=10 --workers 4
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_loader import add_loader_arguments, entity_rng, load  # noqa: E402
+
+# Redis connection - UPDATE THESE VALUES FOR YOUR REDIS INSTANCE
+REDIS_CONNECTION = dict(
+    host='your-redis-host.com',
+    port=6379,
+    decode_responses=True,
+    username="your-username",
+    password="your-password",
+)
+
+DEFAULT_MIX = "string=40,hash=30,list=10,set=10,zset=10"
+SEGMENTS = ["users", "orders", "sessions", "cache", "inventory", "metrics", "events", "jobs"]
+TTL_CHOICES = [86400 * 3, 3600 * 12, 1800, 120, 45]   # Same buckets as the demo data
+TYPES = ["string", "hash", "list", "set", "zset"]      # The types main.py sizes
+
+
+def parse_mix(text):
+    """Parse "string=40,hash=30" into ([types], [weights])."""
+    types, weights = [], []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in TYPES:
+            raise ValueError(f"Unsupported type '{name}' in --mix")
+        types.append(name)
+        weights.append(float(weight or 1))
+    return types, weights
+
+
+def parse_range(text):
+    """Parse "16:512" (or "64") into an inclusive (low, high) pair."""
+    low, _, high = text.partition(":")
+    return int(low), int(high or low)
+
+
+class KeyspaceSpec:
+    """Shape of a synthetic keyspace; every key is derived from (seed, index)."""
+
+    def __init__(self, mix=DEFAULT_MIX, ttl_fraction=0.5, value_bytes="16:512",
+                 elements="1:20", depth="2:4", keyspaces=10, seed=42):
+        self.types, self.weights = parse_mix(mix)
+        self.ttl_fraction = ttl_fraction
+        self.value_bytes = parse_range(value_bytes)
+        self.elements = parse_range(elements)
+        self.depth = parse_range(depth)
+        self.keyspaces = [f"bench{i:02d}" for i in range(keyspaces)]
+        self.seed = seed
+
+    def key(self, index):
+        """Return (name, type, ttl or None, value) of key `index`."""
+        rng = entity_rng(self.seed, index)
+        segments = [rng.choice(self.keyspaces)]
+        for _ in range(rng.randint(*self.depth) - 2):
+            segments.append(rng.choice(SEGMENTS))
+        segments.append(f"{index:09d}")
+        name = ":".join(segments)
+
+        key_type = rng.choices(self.types, self.weights)[0]
+        ttl = rng.choice(TTL_CHOICES) if rng.random() < self.ttl_fraction else None
+        size = rng.randint(*self.value_bytes)
+        if key_type == "string":
+            value = "x" * size
+        else:
+            count = rng.randint(*self.elements)
+            element = "v" * max(1, size // count)
+            if key_type == "hash":
+                value = {f"f{i}": element for i in range(count)}
+            elif key_type == "zset":
+                value = {f"{element}{i}": i for i in range(count)}
+            else:
+                value = [f"{element}{i}" for i in range(count)]
+        return name, key_type, ttl, value
+
+    def keys_for(self, index):
+        """Keys of entity `index` for the bulk loader (one key per entity)."""
+        return [self.key(index)]
+
+
+def populate(connection, key_count, spec, workers=1, progress=True):
+    """Write keys 0..key_count-1 of `spec` with the bulk loader; return seconds taken."""
+    _, elapsed = load(connection, spec.keys_for, key_count, workers=workers, progress=progress)
+    return elapsed
+
+
+def add_spec_arguments(parser):
+    """CLI options describing a KeyspaceSpec (besides --seed), shared with the benchmark suite."""
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Type weights, e.g. string=40,hash=30")
+    parser.add_argument("--ttl-fraction", type=float, default=0.5, help="Fraction of keys with a TTL")
+    parser.add_argument("--value-bytes", default="16:512", help="Approximate value size range in bytes")
+    parser.add_argument("--elements", default="1:20", help="Element count range for collections")
+    parser.add_argument("--depth", default="2:4", help="Key name segment count range")
+    parser.add_argument("--keyspaces", type=int, default=10, help="Number of top-level keyspaces")
+
+
+def spec_from_args(args):
+    return KeyspaceSpec(args.mix, args.ttl_fraction, args.value_bytes, args.elements,
+                        args.depth, args.keyspaces, args.seed)
+
+
+def main_generate():
+    parser = argparse.ArgumentParser(description="Fill Redis with a synthetic keyspace")
+    add_loader_arguments(parser, default_keys=100_000)
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"Writing {args.keys:,} synthetic keys...")
+    written, elapsed = load(
+        REDIS_CONNECTION, spec_from_args(args).keys_for, args.keys,
+        workers=args.workers, batch=args.batch, atomic=args.atomic,
+    )
+    print(f"✓ Wrote {written:,} keys in {elapsed:.1f}s ({written / elapsed:,.0f} keys/s)")
+
+
+if __name__ == "__main__":
+    main_generate()
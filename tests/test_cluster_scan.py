@@ -0,0 +1,122 @@
+import time
+from unittest import mock
+
+import pytest
+import redis
+from redis.cluster import RedisCluster
+
+import main
+
+
+class Node:
+    def __init__(self, name):
+        self.name = name
+
+
+class Shard(redis.Redis):
+    """A primary's client; SCAN fails while `failing` is set."""
+
+    failing = False
+
+    def scan(self, *args, **kwargs):
+        if self.failing:
+            raise redis.ConnectionError("shard is down")
+        return super().scan(*args, **kwargs)
+
+
+@pytest.fixture
+def shards(redis_server):
+    # One database per primary stands in for the keys each node owns
+    shards = {
+        f"127.0.0.1:{7000 + db}": Shard(port=redis_server, db=db, decode_responses=True)
+        for db in (1, 2, 3)
+    }
+    for shard in shards.values():
+        shard.flushdb()
+    yield shards
+    for shard in shards.values():
+        shard.close()
+
+
+@pytest.fixture
+def cluster(shards):
+    nodes = [Node(name) for name in shards]
+    cluster = mock.MagicMock(spec=RedisCluster)
+    cluster.get_primaries.return_value = nodes
+    cluster.get_redis_connection.side_effect = lambda node: shards[node.name]
+    cluster.nodes_manager = mock.Mock()
+    return cluster
+
+
+def fill(shards, counts):
+    for (name, shard), count in zip(shards.items(), counts):
+        for i in range(count):
+            shard.set(f"{name}:{i}", "x" * i)
+
+
+def test_shard_clients_are_the_primaries(cluster, shards):
+    assert main.get_shard_clients(cluster) == list(shards.items())
+
+
+def test_sweep_merges_every_shard(cluster, shards):
+    fill(shards, [1, 40, 7])
+    scanner = main.KeyspaceScanner(cluster, count=5)
+
+    # One SCAN call per shard per step: the small shard wraps first, but nothing
+    # is published until every shard has
+    steps = 1
+    while not scanner.step(batches=1):
+        steps += 1
+        assert scanner.version == 0
+    assert steps > 1
+
+    records, _, _ = scanner.snapshot()
+    assert len(records) == 48
+    assert {record["name"].rsplit(":", 1)[0] for record in records} == set(shards)
+    nodes = {node["node"]: node for node in scanner.status()["nodes"]}
+    assert {name: node["keys"] for name, node in nodes.items()} == dict(zip(shards, [1, 40, 7]))
+    assert all(node["complete"] for node in nodes.values())
+    scanner.stop()
+
+
+def test_failing_shard_keeps_published_snapshot(cluster, shards):
+    fill(shards, [3, 3, 3])
+    scanner = main.KeyspaceScanner(cluster)
+    scanner.sweep()
+    version = scanner.version
+
+    name = list(shards)[1]
+    shards[name].set("late", "x")
+    shards[name].failing = True
+    with pytest.raises(redis.ConnectionError):
+        scanner.step()
+    assert scanner.version == version
+    assert scanner.key_count() == 9
+    scanner.stop()
+
+
+def test_scanner_recovers_from_failing_shard(cluster, shards):
+    fill(shards, [3, 3, 3])
+    name = list(shards)[2]
+    shards[name].failing = True
+    scanner = main.KeyspaceScanner(cluster)
+    scanner.sweep_interval = 0.05
+    errors = main.redis_errors_total._series.get("scanner", 0)
+
+    scanner.start()
+    try:
+        deadline = time.monotonic() + 5
+        while main.redis_errors_total._series.get("scanner", 0) < errors + 2:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        # The failed sweep is dropped and the primaries are rediscovered
+        assert scanner.version == 0
+        assert cluster.nodes_manager.initialize.called
+
+        shards[name].failing = False
+        while scanner.key_count() < 9:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        assert all(node["complete"] for node in scanner.status()["nodes"])
+    finally:
+        scanner.stop()
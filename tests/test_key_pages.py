@@ -0,0 +1,68 @@
+import main
+
+
+def test_every_collection_page_fits_the_byte_cap(client):
+    big = "x" * main.KEY_ELEMENT_MAX_BYTES
+    count = 2 * main.KEY_VALUE_MAX_BYTES // main.KEY_ELEMENT_MAX_BYTES
+    client.sadd("set", *[f"{i}{big}" for i in range(count)])
+    client.zadd("zset", {f"{i}{big}": i for i in range(count)})
+    client.hset("hash", mapping={f"{i}{big}": big for i in range(count)})
+    client.rpush("list", *[f"{i}{big}" for i in range(count)])
+
+    replies = {
+        "set": client.sscan("set", count=count),
+        "zset": client.zscan("zset", count=count),
+        "hash": client.hscan("hash", count=count),
+        "list": client.lrange("list", 0, count - 1),
+    }
+    for key_type, reply in replies.items():
+        value, next_cursor, truncated = main.finish_value_page(key_type, reply, count, 0)
+        elements = value.items() if key_type == "hash" else value
+        page_bytes = sum(
+            len(part) for element in elements
+            for part in (element if isinstance(element, tuple) else (element,)) if isinstance(part, str)
+        )
+        assert 0 < page_bytes <= main.KEY_VALUE_MAX_BYTES, key_type
+        assert truncated, key_type
+        if key_type == "list":
+            assert next_cursor == len(value)
+
+    # Hash field names are capped like values
+    value, _, _ = main.finish_value_page("hash", (0, {"f" * 5000: "v"}), 1, 0)
+    assert [len(field) for field in value] == [main.KEY_ELEMENT_MAX_BYTES + 1]
+
+
+def test_json_over_the_cap_is_refused():
+    value, next_cursor, truncated = main.finish_value_page("ReJSON-RL", [0, 10 ** 6], None, 0)
+    assert "pass a path" in value and truncated and next_cursor == 0
+
+    text = "[" + ",".join(["1"] * main.KEY_VALUE_MAX_BYTES) + "]"
+    value, _, truncated = main.finish_value_page("ReJSON-RL", [1, text], None, 0)
+    assert "pass a path" in value and truncated
+
+    assert main.finish_value_page("ReJSON-RL", [1, '{"a": 1}'], None, 0) == ('{"a": 1}', 0, False)
+
+
+def test_batch_stops_adding_values_at_the_byte_budget(client, redis_server, monkeypatch):
+    import asyncio
+
+    import redis.asyncio
+
+    names = [f"blob:{i}" for i in range(6)]
+    for name in names:
+        client.set(name, "x" * main.KEY_VALUE_MAX_BYTES)
+    monkeypatch.setattr(main, "KEY_BATCH_MAX_BYTES", 3 * main.KEY_VALUE_MAX_BYTES + 100)
+
+    async def fetch():
+        monkeypatch.setattr(main, "ar", redis.asyncio.Redis(port=redis_server, decode_responses=True))
+        try:
+            return await main.get_multiple_key_data(names)
+        finally:
+            await main.ar.aclose()
+
+    data = asyncio.run(fetch())
+    assert [record["key"] for record in data["keys"]] == names
+    assert [record["value"] is not None for record in data["keys"]] == [True] * 3 + [False] * 3
+    assert data["metadata"]["omitted"] == names[3:]
+    assert all(record["page"]["truncated"] for record in data["keys"][3:])
+    assert data["keys"][3]["length"] == main.KEY_VALUE_MAX_BYTES
@@ -0,0 +1,59 @@
+import random
+
+import main
+
+
+def record(name, ttl=-1, size=10):
+    return {"name": name, "type": "string", "ttl": ttl, "size": size}
+
+
+def summary(layout):
+    return [
+        (keyspace["name"], keyspace["x"], [key["name"] for key in keyspace["keys"]],
+         list(keyspace["sizes"]), keyspace["runs"])
+        for keyspace in layout.keyspaces
+    ], layout.total_keys
+
+
+def test_patched_layout_matches_rebuild():
+    rng = random.Random(3)
+    ttls = [-1, 86400 * 2, 7200, 120, 10]
+    records = {
+        name: record(name, rng.choice(ttls), rng.randint(1, 500))
+        for name in (f"{prefix}:{i}" for prefix in ("a", "b", "c") for i in range(200))
+    }
+    layout = main.KeyspaceLayout(list(records.values()), 1)
+
+    for version in range(2, 12):
+        changes = {"added": [], "removed": [], "changed": []}
+        for name in rng.sample(sorted(records), 30):
+            if rng.random() < 0.5:
+                del records[name]
+                changes["removed"].append(name)
+            else:
+                records[name] = record(name, rng.choice(ttls), rng.randint(1, 500))
+                changes["changed"].append(records[name])
+        for i in range(20):
+            # New keys, sometimes in a keyspace of their own
+            name = f"{rng.choice(['a', 'b', 'new' + str(version)])}:x{version}-{i}"
+            records[name] = record(name, rng.choice(ttls), rng.randint(1, 500))
+            changes["added"].append(records[name])
+        layout = layout.patched(changes, version)
+        assert layout.version == version
+        assert summary(layout) == summary(main.KeyspaceLayout(list(records.values()), version))
+
+    # Patching never modifies the layout it was made from
+    older = main.KeyspaceLayout([record("a:1"), record("b:1")], 1)
+    before = summary(older)
+    older.patched({"added": [record("0:1")], "removed": ["b:1"], "changed": []}, 2)
+    assert summary(older) == before
+
+
+def test_emptied_keyspace_is_dropped():
+    layout = main.KeyspaceLayout([record("a:1"), record("b:1"), record("c:1")], 1)
+    layout = layout.patched({"added": [], "removed": ["b:1"], "changed": []}, 2)
+    assert [(keyspace["name"], keyspace["x"]) for keyspace in layout.keyspaces] == [
+        ("a", 0),
+        ("c", main.LAYOUT_KEYS_PER_ROW * main.LAYOUT_KEY_SPACING + main.LAYOUT_KEYSPACE_SPACING),
+    ]
+    assert layout.total_keys == 2
@@ -0,0 +1,280 @@
+import time
+
+import main
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def names(records):
+    return sorted(record["name"] if isinstance(record, dict) else record for record in records)
+
+
+def test_sweep_publishes_first_version(client, scanner):
+    client.set("users:1", "alice")
+    client.hset("orders:1", mapping={"total": 10})
+    scanner.sweep()
+
+    records, keyspaces, _ = scanner.snapshot()
+    assert scanner.version == 1
+    assert names(records) == ["orders:1", "users:1"]
+    assert sorted(keyspaces) == ["orders", "users"]
+
+
+def test_apply_events_updates_index(client, scanner):
+    client.set("users:1", "alice")
+    scanner.sweep()
+    notifier = main.KeyspaceNotifier(scanner)
+
+    client.set("users:2", "bob")
+    client.hset("orders:1", mapping={"total": 10})
+    notifier.apply_events({"users:2": "set", "orders:1": "hset"}, client)
+    assert names(scanner.snapshot()[0]) == ["orders:1", "users:1", "users:2"]
+
+    client.delete("users:1")
+    notifier.apply_events({"users:1": "del"}, client)
+    assert names(scanner.snapshot()[0]) == ["orders:1", "users:2"]
+    assert notifier.keys_refreshed == 2
+    assert notifier.keys_removed == 1
+
+
+def test_apply_events_drops_keys_gone_before_refresh(client, scanner):
+    client.set("users:1", "alice")
+    scanner.sweep()
+    notifier = main.KeyspaceNotifier(scanner)
+
+    # The key was deleted again before the batch was applied
+    client.delete("users:1")
+    notifier.apply_events({"users:1": "set"}, client)
+    assert scanner.key_count() == 0
+
+
+def test_write_events_drop_cached_size(client, scanner):
+    client.hset("orders:1", mapping={"note": "x"})
+    scanner.sweep()
+    notifier = main.KeyspaceNotifier(scanner)
+
+    # Same field count, bigger value: only the event says the size is stale
+    client.hset("orders:1", "note", "x" * 1000)
+    notifier.apply_events({"orders:1": "hset"}, client)
+    record = scanner.snapshot()[0][0]
+    assert record["size"] == client.memory_usage("orders:1")
+
+    # An expiry change keeps the value, so the cached size is reused
+    reused = main.size_stats["reused"]
+    client.expire("orders:1", 100)
+    notifier.apply_events({"orders:1": "expire"}, client)
+    assert main.size_stats["reused"] == reused + 1
+    assert scanner.snapshot()[0][0]["ttl"] > 0
+
+
+def test_notifier_follows_keyspace_events(client, scanner):
+    scanner.sweep()
+    notifier = main.KeyspaceNotifier(scanner)
+    notifier.start()
+    try:
+        assert wait_for(lambda: notifier._threads and client.pubsub_numpat() > 0)
+        client.set("users:1", "alice")
+        client.rpush("queue:1", "job")
+        assert wait_for(lambda: scanner.key_count() == 2)
+
+        client.delete("users:1")
+        assert wait_for(lambda: scanner.key_count() == 1)
+        assert names(scanner.snapshot()[0]) == ["queue:1"]
+        assert notifier.events_received >= 3
+    finally:
+        notifier.stop()
+
+
+def test_expire_due_publishes_removals(client, scanner):
+    client.set("session:1", "x", ex=100)
+    client.set("session:2", "y")
+    scanner.sweep()
+    version = scanner.version
+
+    assert scanner.expire_due(now=time.time() + 200) == 1
+    assert scanner.version == version + 1
+    assert scanner.delta(version) == (version + 1, {"added": [], "removed": ["session:1"], "changed": []})
+
+
+def test_delta_merges_versions(client, scanner):
+    client.set("users:1", "alice")
+    scanner.sweep()
+    start = scanner.version
+    notifier = main.KeyspaceNotifier(scanner)
+
+    client.set("users:2", "bob")
+    notifier.apply_events({"users:2": "set"}, client)
+    client.set("users:2", "b" * 500)
+    notifier.apply_events({"users:2": "set"}, client)
+    client.set("users:1", "a" * 500)
+    notifier.apply_events({"users:1": "set"}, client)
+    assert scanner.version == start + 3
+
+    version, changes = scanner.delta(start)
+    assert version == start + 3
+    # Added then changed is still an addition, with the latest record
+    assert names(changes["added"]) == ["users:2"]
+    assert changes["added"][0]["size"] == client.memory_usage("users:2")
+    assert names(changes["changed"]) == ["users:1"]
+    assert changes["removed"] == []
+
+    # A key added and removed since `since` cancels out
+    client.set("tmp:1", "x")
+    notifier.apply_events({"tmp:1": "set"}, client)
+    client.delete("tmp:1")
+    notifier.apply_events({"tmp:1": "del"}, client)
+    _, changes = scanner.delta(start + 3)
+    assert changes == {"added": [], "removed": [], "changed": []}
+
+
+def test_delta_needs_snapshot_outside_history(client, scanner):
+    client.set("users:0", "x")
+    scanner.sweep()
+    version = scanner.version
+    assert scanner.delta(version) == (version, {"added": [], "removed": [], "changed": []})
+    assert scanner.delta(version + 1) == (version, None)
+
+    notifier = main.KeyspaceNotifier(scanner)
+    for i in range(1, main.DELTA_HISTORY_SIZE + 2):
+        client.set(f"users:{i}", "x")
+        notifier.apply_events({f"users:{i}": "set"}, client)
+    latest = scanner.version
+    assert scanner.delta(version)[1] is None
+    _, changes = scanner.delta(latest - main.DELTA_HISTORY_SIZE)
+    assert len(changes["added"]) == main.DELTA_HISTORY_SIZE
+
+
+def test_unchanged_sweep_keeps_version(client, scanner):
+    client.set("users:1", "alice")
+    scanner.sweep()
+    version = scanner.version
+    scanner.sweep()
+    assert scanner.version == version
+
+    client.set("users:2", "bob")
+    scanner.sweep()
+    assert scanner.version == version + 1
+    assert names(scanner.delta(version)[1]["added"]) == ["users:2"]
+
+
+def test_delta_endpoint(client, scanner, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    client.set("users:1", "alice")
+    scanner.sweep()
+    monkeypatch.setattr(main, "scanner", scanner)
+    api = TestClient(main.app)  # No lifespan: the test drives the scanner itself
+    version = scanner.version
+
+    client.set("users:2", "bob")
+    main.KeyspaceNotifier(scanner).apply_events({"users:2": "set"}, client)
+    data = api.get(f"/redis-keyspace/delta?since={version}").json()
+    assert (data["version"], data["since"], data["full"]) == (version + 1, version, False)
+    assert [(record["name"], record["keyspace"]) for record in data["added"]] == [("users:2", "users")]
+
+    # A version the history does not cover is answered with the full document
+    data = api.get(f"/redis-keyspace/delta?since={version + 5}").json()
+    assert data["full"] is True
+    assert data["metadata"]["total_keys"] == 2
+
+
+def test_response_version_matches_records(client, scanner, monkeypatch):
+    client.set("users:1", "alice")
+    scanner.sweep()
+    monkeypatch.setattr(main, "scanner", scanner)
+    version = scanner.version
+    snapshot = scanner.snapshot
+
+    def snapshot_then_publish():
+        result = snapshot()
+        client.set("users:2", "bob")
+        main.KeyspaceNotifier(scanner).apply_events({"users:2": "set"}, client)
+        return result
+
+    # A publish between reading the records and the metadata must not retag them
+    monkeypatch.setattr(scanner, "snapshot", snapshot_then_publish)
+    data = main.get_keyspace_data()
+    assert scanner.version == version + 1
+    assert data["metadata"]["snapshot"]["version"] == version
+    assert data["metadata"]["total_keys"] == 1
+
+
+def test_history_is_bounded_by_changed_keys(client, scanner, monkeypatch):
+    monkeypatch.setattr(main, "DELTA_HISTORY_MAX_RECORDS", 2)
+    client.mset({"users:1": "a", "users:2": "b"})
+    scanner.sweep()
+    # The first version holds every key; a client at 0 gets the full snapshot
+    assert scanner.delta(0) == (1, None)
+
+    notifier = main.KeyspaceNotifier(scanner)
+    for i in range(3, 6):
+        client.set(f"users:{i}", "x")
+        notifier.apply_events({f"users:{i}": "set"}, client)
+    assert scanner.delta(1) == (4, None)
+    assert names(scanner.delta(2)[1]["added"]) == ["users:4", "users:5"]
+
+    # A diff over the bound clears the history
+    client.mset({f"orders:{i}": "x" for i in range(4)})
+    scanner.sweep()
+    assert scanner.version == 5
+    assert scanner.delta(4) == (5, None)
+    assert scanner._history_records == 0
+
+
+def test_metadata_pool_is_created_once(client, scanner, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(main, "METADATA_CHUNK_SIZE", 2)
+    monkeypatch.setattr(main, "METADATA_CONCURRENCY", 4)
+    client.mset({f"users:{i}": "x" for i in range(20)})
+    main.shutdown_metadata_executor()
+    with ThreadPoolExecutor(8) as callers:
+        results = list(callers.map(lambda _: main.fetch_key_metadata(
+            [f"users:{i}" for i in range(20)], client), range(8)))
+    assert all(len(entries) == 20 for entries in results)
+    pool = main.metadata_executor
+    assert pool is not None and main.get_metadata_executor() is pool
+
+    main.shutdown_metadata_executor()
+    assert main.metadata_executor is None and pool._shutdown
+
+
+def test_sweep_without_info_falls_back_to_ttl(redis_server, client):
+    import redis
+
+    class NoInfo(redis.Redis):
+        def info(self, *args, **kwargs):
+            raise redis.ResponseError("unknown command 'INFO'")
+
+    restricted = NoInfo(port=redis_server, decode_responses=True)
+    client.set("session:1", "x", ex=100)
+    scanner = main.KeyspaceScanner(restricted)
+    scanner.sweep()
+    assert main.has_pexpiretime(restricted) is False
+    assert 0 < scanner.snapshot()[0][0]["ttl"] <= 100
+    restricted.close()
+
+
+def test_aggregates_come_from_the_index(client, scanner, monkeypatch):
+    client.set("users:1", "alice", ex=100)
+    client.set("users:2", "b" * 300)
+    client.hset("orders:1", mapping={"total": 10})
+    scanner.sweep()
+    monkeypatch.setattr(main, "scanner", scanner)
+
+    data = main.get_keyspace_aggregates(top=1)
+    assert scanner._records is None  # No per-key records were built
+    assert data["metadata"]["total_keys"] == 3
+    assert data["metadata"]["snapshot"]["version"] == scanner.version
+    users = data["keyspaces"]["users"]
+    assert (users["total_count"], users["types"]) == (2, {"string": 2})
+    assert users["largest"] == [{"name": "users:2", "size": client.memory_usage("users:2")}]
+    assert [key["name"] for key in users["expiring_soonest"]] == ["users:1"]
+    assert data["keyspaces"]["orders"]["types"] == {"hash": 1}
@@ -0,0 +1,25 @@
+import redis
+
+import main
+
+
+class Expiring(redis.Redis):
+    """RANDOMKEY finds nothing, as when the sampled keys expire in the meantime."""
+
+    def pipeline(self, *args, **kwargs):
+        pipe = super().pipeline(*args, **kwargs)
+        pipe.execute = lambda: [None] * len(pipe.command_stack)
+        return pipe
+
+
+def test_exact_only_when_every_shard_is_counted(client, redis_server):
+    client.mset({"users:1": 1, "orders:1": 1})
+    estimate, low, high, taken, population, exact = main.estimate_prefix_count(client, "users")
+    assert (estimate, low, high, taken, population, exact) == (1, 1, 1, 0, 2, True)
+
+    client.mset({f"users:{i}": 1 for i in range(2, 100)})
+    shard = Expiring(port=redis_server, decode_responses=True)
+    estimate, low, high, taken, population, exact = main.estimate_prefix_count(shard, "users", samples=10)
+    assert taken == 0 and not exact
+    assert low == 0 and high == population
+    shard.close()
@@ -0,0 +1,112 @@
+import struct
+import time
+
+import main
+
+
+def length(value):
+    if value < 1 << 6:
+        return bytes([value])
+    if value < 1 << 14:
+        return bytes([0x40 | value >> 8, value & 0xFF])
+    return b"\x80" + struct.pack(">I", value)
+
+
+def string(data):
+    return length(len(data)) + data
+
+
+def listpack(*items):
+    """A listpack of short strings, as Redis serializes it."""
+    body = b""
+    for item in items:
+        entry = bytes([0x80 | len(item)]) + item
+        body += entry + bytes([len(entry)])
+    blob = struct.pack("<IH", 6 + len(body) + 1, len(items)) + body + b"\xff"
+    return string(blob)
+
+
+def write_dump(path, records, ctime=None):
+    """Write an RDB v12 file with one database holding `records` (type byte, name, payload)."""
+    ctime = int(time.time()) if ctime is None else ctime
+    data = b"REDIS0012" + b"\xfa" + string(b"ctime") + string(str(ctime).encode())
+    data += b"\xfe\x00"
+    for value_type, name, payload in records:
+        data += bytes([value_type]) + string(name) + payload
+    path.write_bytes(data + b"\xff" + bytes(8))
+    return str(path)
+
+
+# Redis 7.4 hashes with field expiries
+HASH_METADATA = struct.pack("<Q", 1_900_000_000_000) + length(2) + (
+    length(0) + string(b"f1") + string(b"v1") + length(5000) + string(b"f2") + string(b"v2")
+)
+HASH_METADATA_PRE_GA = length(2) + (
+    length(0) + string(b"f1") + string(b"v1") + length(1_900_000_000) + string(b"f2") + string(b"v2")
+)
+HASH_LISTPACK_EX = struct.pack("<Q", 1_900_000_000_000) + listpack(b"f1", b"v1", b"0", b"f2", b"v2", b"9")
+HASH_LISTPACK_EX_PRE_GA = listpack(b"f1", b"v1", b"0")
+
+
+def test_hashes_with_field_expiries(tmp_path):
+    path = write_dump(tmp_path / "dump.rdb", [
+        (24, b"h:metadata", HASH_METADATA),
+        (22, b"h:metadata-pre-ga", HASH_METADATA_PRE_GA),
+        (25, b"h:listpack-ex", HASH_LISTPACK_EX),
+        (23, b"h:listpack-ex-pre-ga", HASH_LISTPACK_EX_PRE_GA),
+        (0, b"after", string(b"value")),
+    ])
+    parser = main.RdbParser(path)
+    keys = {name: (key_type, count) for _, name, key_type, _, _, count in parser}
+    assert keys == {
+        "h:metadata": ("hash", 2),
+        "h:metadata-pre-ga": ("hash", 2),
+        "h:listpack-ex": ("hash", 2),
+        "h:listpack-ex-pre-ga": ("hash", 1),
+        "after": ("string", 5),
+    }
+    assert parser.stopped is None
+
+
+def test_unknown_type_stops_with_keys_read_so_far(tmp_path, monkeypatch):
+    path = write_dump(tmp_path / "dump.rdb", [
+        (0, b"first", string(b"value")),
+        (40, b"future", b"\x01\x02\x03"),
+        (0, b"unreachable", string(b"value")),
+    ])
+    parser = main.RdbParser(path)
+    assert [name for _, name, _, _, _, _ in parser] == ["first"]
+    assert "future" in parser.stopped
+
+    monkeypatch.setattr(main, "scanner", main.KeyspaceScanner(None))
+    assert main.load_rdb(path, db=0) == 1
+    assert "Unsupported RDB value type 40" in main.scanner.status()["load_error"]
+
+
+def test_failed_load_is_reported(tmp_path, monkeypatch):
+    path = tmp_path / "dump.rdb"
+    path.write_bytes(b"not a dump")
+    monkeypatch.setattr(main, "scanner", main.KeyspaceScanner(None))
+    monkeypatch.setattr(main, "RDB_PATH", str(path))
+
+    main.load_rdb_in_background()
+    status = main.scanner.status()
+    assert status["load_error"] == f"ValueError: {path} is not an RDB file"
+    assert not status["complete"]
+
+
+def test_static_scanner_does_not_track_touched_keys(tmp_path, monkeypatch):
+    path = write_dump(tmp_path / "dump.rdb", [
+        (0, name.encode(), string(b"value")) for name in ("a", "b", "c")
+    ])
+    monkeypatch.setattr(main, "scanner", main.KeyspaceScanner(None))
+    main.load_rdb(path, db=0)
+    scanner = main.scanner
+
+    # No sweep ever runs, so nothing needs to remember these changes
+    scanner.apply_changes([dict(scanner._index["a"], size=99)], ["b"])
+    scanner._index["c"]["expires_at"] = time.time() - 1
+    scanner._expiry_heap.append((scanner._index["c"]["expires_at"], "c"))
+    assert scanner.expire_due() == 1
+    assert scanner.key_count() == 1
+    assert scanner._touched == {}
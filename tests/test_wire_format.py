@@ -0,0 +1,54 @@
+import pytest
+
+import main
+
+
+def document(keyspaces):
+    return {
+        "keyspaces": {
+            name: {"keys": records, "total_count": len(records),
+                   "total_size": sum(record["size"] for record in records)}
+            for name, records in keyspaces.items()
+        },
+        "metadata": {"snapshot": {"version": 1}},
+    }
+
+
+def test_columnar_round_trip_keeps_large_ttls():
+    data = document({"users": [
+        {"name": "users:1", "type": "string", "ttl": 3_000_000_000, "size": 5 << 32},
+        {"name": "users:2", "type": "hash", "ttl": -1, "size": 10},
+    ]})
+    decoded = main.decode_columnar(main.encode_columnar(data))
+    assert decoded["keyspaces"]["users"]["keys"] == [
+        {"name": "users:1", "type": "string", "ttl": 3_000_000_000, "size": 0xFFFFFFFF},
+        {"name": "users:2", "type": "hash", "ttl": -1, "size": 10},
+    ]
+
+
+def test_columnar_range_errors():
+    long_name = "k" * 70_000
+    with pytest.raises(main.ColumnarRangeError, match="65535"):
+        main.encode_columnar(document({long_name: [
+            {"name": long_name + ":1", "type": "string", "ttl": -1, "size": 1},
+        ]}))
+
+    records = [{"name": f"k:{i}", "type": f"module-{i}", "ttl": -1, "size": 1} for i in range(300)]
+    with pytest.raises(main.ColumnarRangeError, match="300 key types"):
+        main.encode_columnar(document({"k": records}))
+
+
+def test_columnar_endpoint_with_long_ttl(client, scanner, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    client.set("users:1", "alice")
+    client.expire("users:1", 3_000_000_000)
+    scanner.sweep()
+    monkeypatch.setattr(main, "scanner", scanner)
+    monkeypatch.setattr(main, "response_cache", main.ResponseCache(scanner))
+    api = TestClient(main.app)
+
+    response = api.get("/redis-keyspace?format=columnar")
+    assert response.status_code == 200
+    record = main.decode_columnar(response.content)["keyspaces"]["users"]["keys"][0]
+    assert record["ttl"] > 2 ** 31